@@ -0,0 +1,205 @@
+"""Benchmarks of the load -> serialize -> render pipeline.
+
+    python benchmarks/bench.py run --output current.json
+    python benchmarks/bench.py compare baseline.json current.json
+
+run measures, on synthetic banks of each size, with and without images:
+load (Exam.from_csv, rows/s), copy (Exam.copy, copies/s), assignment
+(SerializeExam.assignment with shuffling, copies/s), build_item
+(PDFDoc._build_item, items/s) and print (Exam.print, pages/s). Every
+stage is timed, then run again under tracemalloc for its peak memory.
+compare exits with 1 if any rate is slower than the baseline by more
+than the tolerance.
+"""
+import argparse
+import gc
+import json
+from io import BytesIO
+from pathlib import Path
+import platform
+import re
+import sys
+from tempfile import TemporaryDirectory
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import exam2pdf  # noqa: E402
+from exam2pdf.exam import SerializeExam  # noqa: E402
+from exam2pdf.export import MemorySink  # noqa: E402
+from exam2pdf.rlwrapper import PDFDoc  # noqa: E402
+from exam2pdf.synthetic import load_bank, write_bank  # noqa: E402
+from exam2pdf.utility import Item, ItemLevel  # noqa: E402
+
+SIZES = (1000, 10000, 100000)
+
+
+def measure(function: Callable[[], int]) -> Dict[str, float]:
+    """Run function, returning the units of work done, twice: timed,
+    then traced for the peak memory.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    units = function()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "units": units,
+        "seconds": seconds,
+        "rate": units / seconds if seconds else float("inf"),
+        "peak_kib": peak / 1024,
+    }
+
+
+def page_count(data: bytes) -> int:
+    match = re.search(rb"/Count (\d+) /Kids", data)
+    return int(match.group(1)) if match else 0
+
+
+def run_size(
+    folder: Path, n_questions: int, images: bool, copies: int, render_questions: int
+) -> Iterator[tuple]:
+    bank = write_bank(
+        folder / "bank.csv",
+        n_questions,
+        images=0.25 if images else 0.0,
+        answer_images=0.05 if images else 0.0,
+    )
+
+    def load() -> int:
+        return len(load_bank(bank).questions)
+
+    exam = load_bank(bank)
+    yield "load", "rows/s", measure(load)
+
+    def copy() -> int:
+        for _ in range(copies):
+            exam.copy()
+        return copies
+
+    yield "copy", "copies/s", measure(copy)
+
+    def assignment() -> int:
+        serial = SerializeExam(exam, shuffle_item=True, shuffle_sub=True, seed=1)
+        for _ in range(copies):
+            for _item in serial.assignment():
+                pass
+        return copies
+
+    yield "assignment", "copies/s", measure(assignment)
+
+    small_exam = exam2pdf.Exam(*exam.questions[:render_questions])
+    items = [
+        Item(ItemLevel.top, question.text, question.image)
+        for question in small_exam.questions
+    ]
+
+    def build_item() -> int:
+        doc = PDFDoc(BytesIO())
+        for item in items:
+            doc._build_item(item)
+        return len(items)
+
+    yield "build_item", "items/s", measure(build_item)
+
+    def print_exam() -> int:
+        sink = MemorySink()
+        small_exam.print(Path("exam.pdf"), sink=sink)
+        return page_count(sink.files[Path("exam.pdf")])
+
+    yield "print", "pages/s", measure(print_exam)
+
+
+def run(arguments) -> Dict:
+    results = {}
+    for n_questions in arguments.sizes:
+        for images in (False, True):
+            with TemporaryDirectory() as folder:
+                for stage, unit, result in run_size(
+                    Path(folder),
+                    n_questions,
+                    images,
+                    arguments.copies,
+                    arguments.render_questions,
+                ):
+                    name = f"{stage}/{n_questions}/{'images' if images else 'text'}"
+                    results[name] = dict(result, unit=unit)
+                    print(
+                        f"{name:28} {result['rate']:12.1f} {unit:9} "
+                        f"{result['peak_kib']:10.0f} KiB",
+                        flush=True,
+                    )
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Print rate and peak memory changes; return the names slower than
+    baseline by more than tolerance.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        base = baseline["results"][name]
+        change = result["rate"] / base["rate"] - 1
+        memory_change = result["peak_kib"] / max(base["peak_kib"], 1) - 1
+        slower = change < -tolerance
+        if slower:
+            regressions.append(name)
+        print(
+            f"{name:28} {result['rate']:12.1f} {result['unit']:9} "
+            f"{change:+8.1%} speed {memory_change:+8.1%} memory"
+            f"{'  REGRESSION' if slower else ''}"
+        )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    run_parser.add_argument(
+        "--copies", type=int, default=5, help="copies for copy and assignment"
+    )
+    run_parser.add_argument(
+        "--render-questions",
+        type=int,
+        default=500,
+        help="questions for build_item and print",
+    )
+    run_parser.add_argument("--output", type=Path, help="save results as json")
+    run_parser.add_argument("--baseline", type=Path, help="compare with a baseline")
+    run_parser.add_argument("--tolerance", type=float, default=0.1)
+
+    compare_parser = commands.add_parser("compare", help="compare two runs")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--tolerance", type=float, default=0.1)
+
+    arguments = parser.parse_args(argv)
+    if arguments.command == "run":
+        current = run(arguments)
+        if arguments.output is not None:
+            arguments.output.write_text(json.dumps(current, indent=2))
+    else:
+        current = json.loads(arguments.current.read_text())
+    if arguments.baseline is None:
+        return 0
+    baseline = json.loads(arguments.baseline.read_text())
+    return 1 if compare(baseline, current, arguments.tolerance) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Import time of exam2pdf, each import in a fresh interpreter.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --max-ms 120
+
+Prints the median wall time of each statement, and the heavy modules it
+loaded. Exits with 1 if a statement loads a module it must not, or, with
+--max-ms, if its median is slower.
+"""
+
+import argparse
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+from typing import List, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY = ("reportlab", "chardet", "numpy", "PIL", "cProfile")
+
+# statement, heavy modules it must not load
+STATEMENTS: Sequence[Tuple[str, Sequence[str]]] = (
+    ("import exam2pdf", HEAVY),
+    ("from exam2pdf import Question", HEAVY),
+    ("from exam2pdf import Exam", HEAVY),
+    ("from exam2pdf.synthetic import load_bank", HEAVY),
+    ("from exam2pdf.rlwrapper import PDFDoc", ()),
+)
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(seconds, ",".join(heavy))
+"""
+
+
+def measure(statement: str, repeat: int) -> Tuple[List[float], List[str]]:
+    """Seconds of each run of statement, and the heavy modules loaded.
+    """
+    timings = []
+    heavy: List[str] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY)],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        timings.append(float(output[0]))
+        heavy = output[1].split(",") if len(output) > 1 else []
+    return timings, heavy
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--max-ms", type=float, help="slowest median allowed")
+    arguments = parser.parse_args(argv)
+
+    failed = False
+    for statement, forbidden in STATEMENTS:
+        timings, heavy = measure(statement, arguments.repeat)
+        median = statistics.median(timings) * 1000
+        loaded = set(heavy) & set(forbidden)
+        slow = arguments.max_ms is not None and forbidden and median > arguments.max_ms
+        failed |= bool(loaded or slow)
+        print(
+            f"{statement:45} {median:8.1f} ms  {','.join(heavy) or '-'}"
+            f"{'  LOADS ' + ','.join(sorted(loaded)) if loaded else ''}"
+            f"{'  SLOW' if slow else ''}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from importlib import import_module
+
 from .question import (
     Answer,
     Answer,
@@ -6,9 +8,19 @@ from .question import (
     Question,
     TrueFalseQuest,
 )
-from .exam import Exam
 from .utility import Exam2pdfException
 
+# name: module, imported on first access, so that loading and validating
+# banks does not wait for the printing stack
+_LAZY = {
+    "Exam": "exam",
+    "Sink": "export",
+    "DirectorySink": "export",
+    "MemorySink": "export",
+    "ZipSink": "export",
+    "TarSink": "export",
+}
+
 __all__ = [
     "Exam",
     "Answer",
@@ -18,7 +30,24 @@ __all__ = [
     "Question",
     "TrueFalseQuest",
     "Exam2pdfException",
+    "Sink",
+    "DirectorySink",
+    "MemorySink",
+    "ZipSink",
+    "TarSink",
 ]
 
 __version_info__ = (0, 2)
 __version__ = ".".join(map(str, __version_info__))
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
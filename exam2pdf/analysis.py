@@ -0,0 +1,67 @@
+from collections import namedtuple
+from typing import Optional
+
+import numpy as np
+
+from .exam import Exam
+from .grading import Grades, BLANK, INVALID
+
+# One element, or row, for each original question: difficulty is the
+# proportion of right answers (p-value), discrimination the point-biserial
+# correlation between the item and the rest of the score, distractors
+# how many students chose each original answer, blank and invalid how many
+# students left the question blank or marked it invalidly.
+ItemAnalysis = namedtuple(
+    "ItemAnalysis", ["difficulty", "discrimination", "distractors", "blank", "invalid"]
+)
+
+
+def analyze(grades: Grades, n_answers: Optional[int] = None) -> ItemAnalysis:
+    """Item analysis over the whole response matrix of grades, with array
+    operations only. n_answers, the width of distractors, defaults to the
+    highest answer index chosen plus one.
+    """
+    right = grades.right.astype(np.float64)
+    choices = grades.original_choices.astype(np.int64)
+    n_students, n_questions = right.shape
+
+    difficulty = right.mean(axis=0) if n_students else np.full(n_questions, np.nan)
+
+    # point-biserial against the rest score, to not count the item itself
+    rest = right.sum(axis=1)[:, None] - right
+    right_deviation = right - difficulty
+    rest_deviation = rest - rest.mean(axis=0)
+    covariance = (right_deviation * rest_deviation).mean(axis=0)
+    deviations = right.std(axis=0) * rest.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discrimination = np.where(deviations > 0, covariance / deviations, np.nan)
+
+    if n_answers is None:
+        n_answers = int(choices.max(initial=-1)) + 1
+    # columns: INVALID, BLANK, then the answers
+    width = n_answers + 2
+    offset = np.clip(choices, INVALID, n_answers - 1) - INVALID
+    counts = np.bincount(
+        (np.arange(n_questions) * width + offset).ravel(),
+        minlength=n_questions * width,
+    ).reshape(n_questions, width)
+
+    return ItemAnalysis(
+        difficulty,
+        discrimination,
+        counts[:, 2:],
+        counts[:, BLANK - INVALID],
+        counts[:, 0],
+    )
+
+
+def update_levels(exam: Exam, analysis: ItemAnalysis, n_levels: int = 5) -> None:
+    """Write back the difficulty in Question.level, from 1 (easy) to
+    n_levels (hard). Questions without a correct answer, or never
+    answered, keep their level.
+    """
+    difficulty = analysis.difficulty
+    levels = np.clip(np.floor((1 - difficulty) * n_levels) + 1, 1, n_levels)
+    for question, level, value in zip(exam.questions, levels, difficulty):
+        if question.correct_index is not None and not np.isnan(value):
+            question.level = int(level)
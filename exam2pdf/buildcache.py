@@ -0,0 +1,100 @@
+from enum import Enum
+from functools import lru_cache
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+# bump when the meaning of a content hash changes
+CACHE_FORMAT = 1
+
+
+def content_hash(*parts: Any) -> str:
+    """Hash of everything that affects an output file: parts are nested
+    tuples, lists and dicts of scalars, Enum and Path values; a Path to a
+    file is hashed by its content, so a changed image changes the hash.
+    """
+    from . import __version__
+
+    digest = hashlib.sha256(f"{CACHE_FORMAT}/{__version__}".encode())
+    _update(digest, parts)
+    return digest.hexdigest()
+
+
+def _update(digest: "hashlib._Hash", value: Any) -> None:
+    if isinstance(value, (list, tuple)):
+        digest.update(f"[{len(value)}".encode())
+        for element in value:
+            _update(digest, element)
+    elif isinstance(value, dict):
+        _update(digest, sorted(value.items(), key=lambda item: str(item[0])))
+    elif isinstance(value, Path):
+        if value.is_file():
+            status = value.stat()
+            data = _file_digest(str(value), status.st_mtime_ns, status.st_size)
+        else:
+            data = str(value)
+        _update_bytes(digest, b"P" + data.encode())
+    elif isinstance(value, Enum):
+        _update_bytes(digest, f"E{type(value).__name__}.{value.name}".encode())
+    else:
+        _update_bytes(digest, f"{type(value).__name__}:{value!r}".encode())
+
+
+def _update_bytes(digest: "hashlib._Hash", data: bytes) -> None:
+    # length prefixed, so that parts cannot run into each other
+    digest.update(f"{len(data)}:".encode())
+    digest.update(data)
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(file_name: str, modified: int, size: int) -> str:
+    """Content hash of a file, computed again only if its modification
+    time or size change.
+    """
+    with open(file_name, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class BuildCache:
+    """Content hashes of the files of earlier builds in destination,
+    saved as json in file_path: a file still there, with the size it was
+    built with, and whose hash is unchanged needs no building.
+    """
+
+    def __init__(self, file_path: Path, destination: Path):
+        self._file_path = file_path
+        self._destination = destination
+        self._files: Dict[str, Dict[str, Any]] = {}
+        try:
+            cache = json.loads(file_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return
+        if cache.get("format") == CACHE_FORMAT:
+            self._files = cache.get("files", {})
+
+    def lookup(self, file_name: Path, digest: str) -> Optional[Dict[str, Any]]:
+        """The entry of file_name, bytes and pages of each copy, if it is
+        up to date with digest, else None.
+        """
+        entry = self._files.get(str(file_name))
+        if entry is None or entry["hash"] != digest:
+            return None
+        try:
+            size = (self._destination / file_name).stat().st_size
+        except FileNotFoundError:
+            return None
+        return entry if size == entry["bytes"] else None
+
+    def add(
+        self, file_name: Path, digest: str, size: int, pages: Sequence[int] = ()
+    ) -> None:
+        self._files[str(file_name)] = {
+            "hash": digest,
+            "bytes": size,
+            "pages": list(pages),
+        }
+
+    def save(self) -> None:
+        cache = {"format": CACHE_FORMAT, "files": self._files}
+        self._file_path.write_text(json.dumps(cache, indent=2), encoding="utf-8")
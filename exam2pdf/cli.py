@@ -0,0 +1,278 @@
+"""exam2pdf command line: print the exams described in a manifest.
+
+A manifest, json or toml, has optional defaults and a list of exams:
+
+    [defaults]
+    destination = "out"
+    n_copies = 30
+    questions_shuffle = true
+
+    [[exam]]
+    bank = "physics.csv"
+    selector = ["question", "subject", "image", "level", "A", "Ai", "B", "Bi"]
+    exam_file = "physics.pdf"
+    correction_file = "physics_correction.pdf"
+    seed = 7
+
+Paths are relative to the manifest. Every other key is an Exam.print
+argument.
+"""
+
+import argparse
+from collections import OrderedDict
+import json
+import multiprocessing
+from pathlib import Path
+import sys
+import threading
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .exam import Exam
+from .utility import Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+# manifest key: Exam.print argument, for paths
+PATH_OPTIONS = {
+    "exam_file": "exam_file_name",
+    "correction_file": "correction_file_name",
+    "answer_sheet_file": "answer_sheet_file_name",
+    "answer_key_file": "answer_key_file",
+    "build_report": "build_report",
+    "build_cache": "build_cache",
+    "journal": "journal",
+    "archive": "archive",
+}
+PRINT_OPTIONS = {
+    "n_copies",
+    "seed",
+    "questions_shuffle",
+    "answers_shuffle",
+    "merge",
+    "duplex",
+    "heading",
+    "footer",
+    "correction_layout",
+    "compress_level",
+    "qr_code",
+    "invariant",
+    "pipeline",
+}
+BANK_OPTIONS = {"bank", "selector", "csv", "destination"}
+# manifest key: type of its value, if not a bool; paths are str
+OPTION_TYPES = {
+    "n_copies": int,
+    "seed": int,
+    "compress_level": int,
+    "heading": str,
+    "footer": str,
+    "correction_layout": str,
+    "bank": str,
+    "selector": list,
+    "csv": dict,
+    "destination": str,
+    **{key: str for key in PATH_OPTIONS},
+}
+
+# banks kept parsed, the least recently used are dropped first
+BANKS_CACHED = 32
+
+# bank path, selector, csv options: Exam
+BankKey = Tuple[str, Tuple[str, ...], Tuple[Tuple[str, Any], ...]]
+# bank key: modification time and size of the file, Exam
+_banks: "OrderedDict[BankKey, Tuple[Tuple[int, int], Exam]]" = OrderedDict()
+# services load banks from many threads
+_banks_lock = threading.Lock()
+
+
+def load_manifest(file_path: Path) -> List[Dict[str, Any]]:
+    """Jobs of a json or toml manifest, with defaults applied and paths
+    resolved against the manifest folder.
+    """
+    try:
+        if file_path.suffix.lower() == ".toml":
+            manifest = _load_toml(file_path)
+        else:
+            manifest = json.loads(file_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        message = _("manifest file not found: ") + str(file_path)
+        raise Exam2pdfException(message)
+    except ValueError as error:
+        message = _("invalid manifest: ") + f"{file_path}: {error}"
+        raise Exam2pdfException(message)
+
+    defaults = manifest.get("defaults", {})
+    exams = manifest.get("exam", manifest.get("exams", []))
+    if not exams:
+        message = _("no exam in manifest: ") + str(file_path)
+        raise Exam2pdfException(message)
+    return [make_job(dict(defaults, **exam), file_path.parent) for exam in exams]
+
+
+def _load_toml(file_path: Path) -> Dict[str, Any]:
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            message = _("toml manifests need Python 3.11 or tomli")
+            raise Exam2pdfException(message)
+    with file_path.open("rb") as manifest_file:
+        return tomllib.load(manifest_file)
+
+
+def make_job(exam: Dict[str, Any], folder: Path) -> Dict[str, Any]:
+    """Job of a manifest exam: the bank key and Exam.print arguments.
+    """
+    unknown = set(exam) - PRINT_OPTIONS - BANK_OPTIONS - set(PATH_OPTIONS)
+    if unknown:
+        message = _("unknown manifest keys: ") + ", ".join(sorted(unknown))
+        raise Exam2pdfException(message)
+    if "bank" not in exam:
+        message = _("exam without bank in manifest")
+        raise Exam2pdfException(message)
+    for key, value in exam.items():
+        expected = OPTION_TYPES.get(key, bool)
+        if key == "seed" and value is None:
+            continue
+        if isinstance(value, bool) != (expected is bool) or not isinstance(
+            value, expected
+        ):
+            message = _("invalid manifest value: ") + f"{key} = {value!r}"
+            raise Exam2pdfException(message)
+    bank = folder / exam["bank"]
+    options = {key: exam[key] for key in PRINT_OPTIONS if key in exam}
+    for key, argument in PATH_OPTIONS.items():
+        if key in exam:
+            options[argument] = Path(exam[key])
+    options.setdefault("exam_file_name", Path(bank.stem + ".pdf"))
+    options["destination"] = folder / exam.get("destination", ".")
+    return {
+        "bank": (
+            str(bank),
+            tuple(exam.get("selector", ())),
+            tuple(sorted(exam.get("csv", {}).items())),
+        ),
+        "options": options,
+    }
+
+
+def load_bank(key: BankKey) -> Exam:
+    """Parse a bank once per process, while it is among the BANKS_CACHED
+    used last and its file is not changed.
+    """
+    file_path, selector, csv_options = key
+    cache_key = (str(Path(file_path).resolve()), selector, csv_options)
+    try:
+        stat = Path(file_path).stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = (0, 0)  # reported by from_csv
+    with _banks_lock:
+        if cache_key in _banks and _banks[cache_key][0] == stamp:
+            _banks.move_to_end(cache_key)
+            return _banks[cache_key][1]
+    exam = Exam()
+    exam.attribute_selector = selector
+    exam.from_csv(Path(file_path), **dict(csv_options))
+    with _banks_lock:
+        _banks[cache_key] = (stamp, exam)
+        _banks.move_to_end(cache_key)
+        while len(_banks) > BANKS_CACHED:
+            _banks.popitem(last=False)
+    return exam
+
+
+def run_job(job: Dict[str, Any]) -> Tuple[str, float, Optional[str]]:
+    """Print a job: its name, the seconds it took and the error, if any.
+    """
+    options = dict(job["options"])
+    name = str(options["destination"] / options["exam_file_name"])
+    start = perf_counter()
+    try:
+        options["destination"].mkdir(parents=True, exist_ok=True)
+        load_bank(job["bank"]).print(**options)
+    except Exam2pdfException as error:
+        return name, perf_counter() - start, str(error)
+    except Exception as error:
+        # one job failing must not stop the others, nor the report
+        return name, perf_counter() - start, f"{type(error).__name__}: {error}"
+    return name, perf_counter() - start, None
+
+
+def run_jobs(
+    jobs: Sequence[Dict[str, Any]], n_jobs: int = 1, quiet: bool = False
+) -> List[Tuple[str, float, Optional[str]]]:
+    """Run jobs on a pool of n_jobs processes, reporting progress. Where
+    processes fork, banks are parsed before the pool starts, and shared.
+    """
+    results = []
+    if n_jobs <= 1:
+        outcomes = map(run_job, jobs)
+        pool = None
+    else:
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            for job in jobs:
+                try:
+                    load_bank(job["bank"])
+                except Exception:
+                    pass  # reported by the job
+        else:
+            context = multiprocessing.get_context()
+        pool = context.Pool(n_jobs)
+        outcomes = pool.imap_unordered(run_job, jobs)
+    try:
+        for number, (name, seconds, error) in enumerate(outcomes, 1):
+            results.append((name, seconds, error))
+            if not quiet:
+                status = _("error: ") + error if error else f"{seconds:.2f} s"
+                print(f"[{number}/{len(jobs)}] {name} {status}", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="exam2pdf",
+        description=__doc__.splitlines()[0],
+        epilog=__doc__.split("\n", 2)[2],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("manifest", type=Path, help="json or toml manifest")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="exams printed in parallel"
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress")
+    parser.add_argument("--report", type=Path, help="save timings as json")
+    arguments = parser.parse_args(argv)
+
+    start = perf_counter()
+    try:
+        jobs = load_manifest(arguments.manifest)
+    except Exam2pdfException as error:
+        print(error, file=sys.stderr)
+        return 2
+    results = run_jobs(jobs, arguments.jobs, arguments.quiet)
+    seconds = perf_counter() - start
+    failed = sum(1 for _1, _2, error in results if error)
+    if not arguments.quiet:
+        print(
+            _("{} exams in {:.2f} s, {} failed").format(len(results), seconds, failed),
+            file=sys.stderr,
+        )
+    if arguments.report is not None:
+        report = {
+            "seconds": seconds,
+            "jobs": [
+                {"exam": name, "seconds": job_seconds, "error": error}
+                for name, job_seconds, error in results
+            ],
+        }
+        arguments.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 1 if failed else 0
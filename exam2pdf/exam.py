@@ -1,19 +1,64 @@
 from __future__ import annotations
 
+from array import array
+from contextlib import ExitStack
 import csv
+from functools import partial
+from io import BytesIO
+import os
 from pathlib import Path
 import random
 from tempfile import TemporaryFile
-from typing import Tuple, List, Iterable, Any, Mapping, Generator, Dict, Optional
-
-from .export import RLInterface
-from .question import Question, TrueFalseQuest
-from .utility import ItemLevel, Item, Exam2pdfException, set_i18n, guess_encoding
+from typing import (
+    Tuple,
+    List,
+    Iterable,
+    Any,
+    Mapping,
+    Generator,
+    Dict,
+    Optional,
+    BinaryIO,
+    Iterator,
+    Callable,
+)
 
+from .buildcache import BuildCache, content_hash
+from .export import (
+    RLInterface,
+    RLMergedInterface,
+    RLTableInterface,
+    RLAnswerSheetInterface,
+    Sink,
+    DirectorySink,
+    archive_sink,
+    AnswerKeyWriter,
+    key_writer_type,
+)
+from .journal import Journal
+from .metrics import Metrics, NO_METRICS, PROFILE_ENV
+from .pipeline import BackgroundWriter, background
+from .plan import Plan, copy_file_name, make_plan, questions_hash
+from .sheet import SheetLayout
+from .question import Question, TrueFalseQuest, LETTER_A
+from .utility import (
+    ItemLevel,
+    Item,
+    AnswerKey,
+    Exam2pdfException,
+    set_i18n,
+    guess_encoding,
+    copy_seed,
+    encode_answer_key,
+)
 
 _ = set_i18n().gettext
 ngettext = set_i18n().ngettext
 
+# copies shuffled ahead of layout, and files waiting to be written, when
+# pipelined
+PIPELINE_DEPTH = 2
+
 
 class Exam:
     """Exam is a sequence of Questions managed as a whole.
@@ -95,23 +140,49 @@ class Exam:
                 iterator = iter(data)
                 quest.load_sequentially(iterator)
 
-    def from_csv(self, file_path: Path, **kwargs: Any):
-        """Read from csv file a series of questions.
+    def from_csv(self, file_path: Path, metrics: Metrics = NO_METRICS, **kwargs: Any):
+        """Read from csv file a series of questions. Encoding detection and
+        parsing are timed in metrics, if given.
         """
-        encoding = guess_encoding(file_path)
+        with metrics.stage("encoding"):
+            encoding = guess_encoding(file_path)
 
-        with file_path.open(encoding=encoding) as csv_file:
-            reader = csv.DictReader(csv_file, **kwargs)
-            rows: List[Dict[str, str]] = [row for row in reader]
+        with metrics.stage("parsing"):
+            with file_path.open(encoding=encoding) as csv_file:
+                reader = csv.DictReader(csv_file, **kwargs)
+                rows: List[Dict[str, str]] = [row for row in reader]
 
-        self.load(rows)
-        self.add_path_parent(file_path)
+            self.load(rows)
+            self.add_path_parent(file_path)
 
     def copy(self) -> Exam:
         questions = (question.copy() for question in self.questions)
         new_exam = Exam(*questions)
         return new_exam
 
+    def plan(
+        self,
+        exam_file_name: Path,
+        n_copies: int = 1,
+        seed: Optional[int] = None,
+        questions_shuffle: bool = False,
+        answers_shuffle: bool = False,
+        copies: Optional[Iterable[int]] = None,
+    ) -> Plan:
+        """Plan the copies print would print with the same arguments,
+        without printing them (see make_plan): with a seed, print(plan=...)
+        gives the same files.
+        """
+        return make_plan(
+            self.questions,
+            exam_file_name,
+            n_copies,
+            seed,
+            questions_shuffle,
+            answers_shuffle,
+            copies,
+        )
+
     def print(
         self,
         exam_file_name: Path,
@@ -122,68 +193,685 @@ class Exam:
         n_copies: int = 1,
         heading: str = "",
         footer: str = "",
+        merge: bool = False,
+        sink: Optional[Sink] = None,
+        archive: Optional[Path] = None,
+        compress_level: Optional[int] = None,
+        correction_layout: str = "list",
+        seed: Optional[int] = None,
+        answer_key_file: Optional[Path] = None,
+        qr_code: bool = False,
+        answer_sheet_file_name: Optional[Path] = None,
+        metrics: Optional[Metrics] = None,
+        build_report: Optional[Path] = None,
+        profile_dir: Optional[Path] = None,
+        build_cache: Optional[Path] = None,
+        invariant: bool = False,
+        journal: Optional[Path] = None,
+        plan: Optional[Plan] = None,
+        pipeline: bool = False,
         **kwargs,
     ) -> None:
-        """Print in PDF all the questions and correction
+        """Print in PDF all the questions and correction. If merge is True,
+        all the copies are printed in exam_file_name, each one starting
+        on a new page (an odd one with duplex=True). Files are saved in
+        destination, unless a sink is given: then they are delivered to it
+        by name, without touching the file system. With archive, a zip or
+        tar file in destination, files are streamed into it.
+        correction_layout is "list", a list of options for each copy, or
+        "table", a dense table with a row for each copy.
+        With seed, every copy is shuffled reproducibly. With answer_key_file,
+        a .csv or .jsonl file in destination, the answer key of each copy
+        is written in it as soon as the copy is shuffled. With qr_code,
+        every page is stamped with a QR code of the answer key of its copy
+        (see encode_answer_key). With answer_sheet_file_name, an optical
+        answer sheet for each copy is printed in it (see SheetLayout).
+        Stages are timed in metrics, if given; with build_report, a .json
+        file in destination, timings, pages and sizes are saved in it.
+        With profile_dir, or the EXAM2PDF_PROFILE environment variable set
+        to a directory, every stage is profiled in it (see Profiler); the
+        variable is ignored when metrics are given.
+        With build_cache, a .json file in destination, the content hash of
+        every file built is saved in it, and files whose hash is unchanged
+        since the last build, and that are still in destination, are not
+        built again: use it with seed, or every copy changes.
+        With invariant, pdfs and archives have fixed dates and document
+        IDs: the same input gives the same bytes.
+        With journal, a .jsonl file in destination, every copy delivered is
+        recorded in it with its answer key: run again after a crash, the
+        same print skips the copies recorded, whose files are still there,
+        and the correction still covers all of them (see Journal).
+        With plan, copies are arranged as planned instead of shuffled:
+        exam_file_name must be the planned one, n_copies, seed and shuffling
+        come from plan, and only the copies in plan are printed, a slice if
+        so loaded (see load_plan); the correction and answer sheets cover
+        them, numbered as planned.
+        With pipeline, copies are shuffled in a thread ahead of layout, and
+        files written in another one behind it, through bounded queues:
+        the layout of a copy overlaps the writing of the one before. Files
+        are the same. Profiled prints run in sequence, stage by stage.
+        """
+        self._check_outputs(sink, archive, build_cache, journal, merge)
+        self._check_correction_layout(correction_layout)
+
+        if plan is not None:
+            self._check_plan(plan)
+            # the files of the copies are the ones recorded in the plan
+            if exam_file_name != plan.exam_file_name:
+                message = _("plan of another exam file: ") + str(plan.exam_file_name)
+                raise Exam2pdfException(message)
+            n_copies, seed = plan.n_copies, plan.seed
+            questions_shuffle = plan.questions_shuffle
+            answers_shuffle = plan.answers_shuffle
+
+        self._check_images()
+        layout = None
+        if answer_sheet_file_name is not None:
+            layout = self.sheet_layout(n_copies)
+        if sink is None or answer_key_file is not None or build_report is not None:
+            self._check_write_permission(destination)
+        if metrics is not None and profile_dir is not None:
+            message = _("metrics and profile_dir are mutually exclusive")
+            raise Exam2pdfException(message)
+        if metrics is None and profile_dir is None and os.environ.get(PROFILE_ENV):
+            profile_dir = Path(os.environ[PROFILE_ENV])
+        profiler = None
+        if profile_dir is not None:
+            from .profiling import Profiler
+
+            metrics = profiler = Profiler(profile_dir)
+            pipeline = False
+        if metrics is None:
+            metrics = NO_METRICS if build_report is None else Metrics()
+
+        with ExitStack() as stack:
+            if profiler is not None:
+                stack.callback(profiler.close)
+            if sink is None:
+                if archive is None:
+                    sink = DirectorySink(destination)
+                else:
+                    sink = archive_sink(
+                        destination / archive, compress_level, invariant
+                    )
+                    stack.enter_context(sink)
+            cache = None
+            if build_cache is not None:
+                cache = BuildCache(destination / build_cache, destination)
+                stack.callback(cache.save)
+
+            copies_journal = None
+            if journal is not None:
+                copies_journal = Journal(
+                    destination / journal,
+                    self._journal_job(
+                        exam_file_name,
+                        n_copies,
+                        seed,
+                        questions_shuffle,
+                        answers_shuffle,
+                    ),
+                )
+                stack.callback(copies_journal.close)
+
+            key_writer = self._open_key_writer(stack, destination, answer_key_file)
+
+            questions_serialized = SerializeExam(
+                self,
+                shuffle_item=questions_shuffle,
+                shuffle_sub=answers_shuffle,
+                to_be_shown=("subject", "text"),
+                seed=seed,
+                key_writer=key_writer,
+                metrics=metrics,
+                total_copies=n_copies,
+            )
+
+            heading = exam_file_name.name if heading == "" else heading
+
+            copies: Iterable = self._serialized_copies(
+                questions_serialized,
+                heading,
+                n_copies,
+                qr_code,
+                {} if copies_journal is None else copies_journal.delivered(destination),
+                None if plan is None else plan.keys,
+            )
+            writer = None
+            if pipeline:
+                # the items of a copy are made in the thread shuffling it
+                copies = background(
+                    (
+                        (number, copy_heading, list(items), copy_qr_code, key)
+                        for number, copy_heading, items, copy_qr_code, key in copies
+                    ),
+                    PIPELINE_DEPTH,
+                )
+                writer = stack.enter_context(BackgroundWriter(PIPELINE_DEPTH))
+            # an error in layout or writing must stop the shuffling, now
+            stack.callback(copies.close)
+            if merge:
+                merged: Iterable = (copy[1:4] for copy in copies)
+                digest = None
+                if cache is not None:
+                    merged = [
+                        (copy_heading, list(items), copy_qr_code)
+                        for copy_heading, items, copy_qr_code in merged
+                    ]
+                    digest = self._content_hash(
+                        metrics, merged, footer, invariant, kwargs
+                    )
+                if not self._up_to_date(cache, exam_file_name, digest, metrics):
+                    buffer = BytesIO()
+                    interface = RLMergedInterface(
+                        (
+                            (copy_heading, iter(items), copy_qr_code)
+                            for copy_heading, items, copy_qr_code in merged
+                        ),
+                        buffer,
+                        footer=footer,
+                        metrics=metrics,
+                        invariant=invariant,
+                        **kwargs,
+                    )
+                    self._deliver(
+                        interface,
+                        buffer,
+                        sink,
+                        exam_file_name,
+                        metrics,
+                        cache,
+                        digest,
+                        writer,
+                    )
+            else:
+                for number, copy_heading, items, copy_qr_code, answer_key in copies:
+                    file_name = self._copy_file_name(exam_file_name, number, n_copies)
+                    digest = None
+                    if cache is not None:
+                        items = list(items)
+                        digest = self._content_hash(
+                            metrics,
+                            items,
+                            copy_heading,
+                            footer,
+                            copy_qr_code,
+                            invariant,
+                            kwargs,
+                        )
+                    if not self._up_to_date(cache, file_name, digest, metrics):
+                        buffer = BytesIO()
+                        interface = RLInterface(
+                            iter(items),
+                            buffer,
+                            heading=copy_heading,
+                            footer=footer,
+                            qr_code=copy_qr_code,
+                            metrics=metrics,
+                            invariant=invariant,
+                            **kwargs,
+                        )
+                        self._deliver(
+                            interface,
+                            buffer,
+                            sink,
+                            file_name,
+                            metrics,
+                            cache,
+                            digest,
+                            writer,
+                        )
+                    if copies_journal is not None:
+                        # recorded once written, by the writer if any
+                        self._submit(
+                            writer,
+                            partial(
+                                copies_journal.record, number, file_name, answer_key
+                            ),
+                        )
+
+            if layout is not None:
+                self._deliver_answer_sheets(
+                    layout,
+                    [
+                        (f"{heading} {number}/{n_copies}", number)
+                        for number in questions_serialized.copy_numbers
+                    ],
+                    sink,
+                    answer_sheet_file_name,
+                    metrics,
+                    invariant,
+                    cache,
+                    writer,
+                )
+
+            if correction_file_name is not None:
+                self._deliver_correction(
+                    questions_serialized,
+                    correction_layout,
+                    sink,
+                    correction_file_name,
+                    heading,
+                    footer,
+                    metrics,
+                    invariant,
+                    cache,
+                    writer,
+                )
+
+        if build_report is not None:
+            metrics.save(destination / build_report)
+
+    def print_correction(
+        self,
+        plan: Plan,
+        correction_file_name: Optional[Path],
+        destination: Path = Path(),
+        heading: str = "",
+        footer: str = "",
+        correction_layout: str = "list",
+        answer_key_file: Optional[Path] = None,
+        invariant: bool = False,
+    ) -> None:
+        """Print only the correction of the copies in plan, if
+        correction_file_name is not None, and their answer keys in
+        answer_key_file, if given, without printing the copies again: e.g.
+        when slices of them were printed elsewhere (see exam2pdf.shard).
+        Arguments as in print.
+        """
+        self._check_correction_layout(correction_layout)
+        self._check_plan(plan)
+        self._check_write_permission(destination)
+
+        with ExitStack() as stack:
+            key_writer = self._open_key_writer(stack, destination, answer_key_file)
+            questions_serialized = SerializeExam(
+                self,
+                to_be_shown=("subject", "text"),
+                key_writer=key_writer,
+                total_copies=plan.n_copies,
+            )
+            for number in sorted(plan.keys):
+                questions_serialized.restore(plan.keys[number], number)
+
+        if correction_file_name is None:
+            return
+        heading = plan.exam_file_name.name if heading == "" else heading
+        self._deliver_correction(
+            questions_serialized,
+            correction_layout,
+            DirectorySink(destination),
+            correction_file_name,
+            heading,
+            footer,
+            NO_METRICS,
+            invariant,
+        )
+
+    @staticmethod
+    def _check_outputs(
+        sink: Optional[Sink],
+        archive: Optional[Path],
+        build_cache: Optional[Path],
+        journal: Optional[Path],
+        merge: bool,
+    ) -> None:
+        if sink is not None and archive is not None:
+            message = _("sink and archive are mutually exclusive")
+            raise Exam2pdfException(message)
+        if build_cache is not None and (sink is not None or archive is not None):
+            message = _("build_cache needs files saved in destination")
+            raise Exam2pdfException(message)
+        if journal is not None and (sink is not None or archive is not None or merge):
+            message = _("journal needs copies saved in destination one by one")
+            raise Exam2pdfException(message)
+
+    @staticmethod
+    def _check_correction_layout(correction_layout: str) -> None:
+        if correction_layout not in ("list", "table"):
+            message = _("unknown correction layout: ") + correction_layout
+            raise Exam2pdfException(message)
+
+    def _check_plan(self, plan: Plan) -> None:
+        if plan.questions != questions_hash(self.questions):
+            message = _("plan of different questions")
+            raise Exam2pdfException(message)
+
+    @staticmethod
+    def _open_key_writer(
+        stack: ExitStack, destination: Path, answer_key_file: Optional[Path]
+    ) -> Optional[AnswerKeyWriter]:
+        """Writer of answer keys in answer_key_file, if not None, closed
+        with stack.
+        """
+        if answer_key_file is None:
+            return None
+        writer_type = key_writer_type(answer_key_file)
+        key_file = (destination / answer_key_file).open(
+            "w", newline="", encoding="utf-8"
+        )
+        return writer_type(stack.enter_context(key_file))
+
+    @classmethod
+    def _deliver_correction(
+        cls,
+        questions_serialized: SerializeExam,
+        correction_layout: str,
+        sink: Sink,
+        correction_file_name: Path,
+        heading: str,
+        footer: str,
+        metrics: Metrics,
+        invariant: bool,
+        cache: Optional[BuildCache] = None,
+        writer: Optional[BackgroundWriter] = None,
+    ) -> None:
+        """Print the correction of the copies in questions_serialized, unless
+        up to date in cache, and deliver it as in _deliver.
+        """
+        lines = cls._correction_lines(questions_serialized, correction_layout)
+        digest = None
+        if cache is not None:
+            lines = list(lines)
+            digest = cls._content_hash(
+                metrics, correction_layout, lines, heading, footer, invariant
+            )
+        if cls._up_to_date(cache, correction_file_name, digest, metrics):
+            return
+        buffer = BytesIO()
+        interface = cls._correction_interface(
+            questions_serialized,
+            correction_layout,
+            lines,
+            buffer,
+            heading,
+            footer,
+            metrics,
+            invariant,
+        )
+        cls._deliver(
+            interface,
+            buffer,
+            sink,
+            correction_file_name,
+            metrics,
+            cache,
+            digest,
+            writer,
+        )
+
+    @classmethod
+    def _deliver_answer_sheets(
+        cls,
+        layout: SheetLayout,
+        sheets: List[Tuple[str, int]],
+        sink: Sink,
+        answer_sheet_file_name: Path,
+        metrics: Metrics,
+        invariant: bool,
+        cache: Optional[BuildCache] = None,
+        writer: Optional[BackgroundWriter] = None,
+    ) -> None:
+        """Print the answer sheets, heading and copy number of each, unless
+        up to date in cache, and deliver them as in _deliver.
+        """
+        digest = None
+        if cache is not None:
+            digest = cls._content_hash(metrics, vars(layout), sheets, invariant)
+        if cls._up_to_date(cache, answer_sheet_file_name, digest, metrics):
+            return
+        buffer = BytesIO()
+        interface = RLAnswerSheetInterface(
+            layout, iter(sheets), buffer, metrics=metrics, invariant=invariant
+        )
+        cls._deliver(
+            interface,
+            buffer,
+            sink,
+            answer_sheet_file_name,
+            metrics,
+            cache,
+            digest,
+            writer,
+        )
+
+    @staticmethod
+    def _correction_lines(
+        questions_serialized: SerializeExam, correction_layout: str
+    ) -> Iterable:
+        if correction_layout == "table":
+            return questions_serialized.correction_rows()
+        return questions_serialized.correction()
+
+    @staticmethod
+    def _correction_interface(
+        questions_serialized: SerializeExam,
+        correction_layout: str,
+        lines: Iterable,
+        buffer: BytesIO,
+        heading: str,
+        footer: str,
+        metrics: Metrics,
+        invariant: bool,
+    ) -> RLInterface:
+        if correction_layout == "table":
+            return RLTableInterface(
+                questions_serialized.correction_header(),
+                iter(lines),
+                buffer,
+                heading=heading,
+                footer=footer,
+                metrics=metrics,
+                invariant=invariant,
+            )
+        return RLInterface(
+            iter(lines),
+            buffer,
+            heading=heading,
+            footer=footer,
+            top_item_bullet_type="A",
+            sub_item_bullet_type="1",
+            metrics=metrics,
+            invariant=invariant,
+        )
+
+    def sheet_layout(self, n_copies: int = 1) -> SheetLayout:
+        """Layout of the answer sheets of n_copies copies of this exam.
+        """
+        n_answers = max(
+            (len(question.answers) for question in self.questions), default=1
+        )
+        return SheetLayout(len(self.questions), n_answers, len(str(n_copies)))
+
+    def _journal_job(
+        self,
+        exam_file_name: Path,
+        n_copies: int,
+        seed: Optional[int],
+        questions_shuffle: bool,
+        answers_shuffle: bool,
+    ) -> Dict[str, Any]:
+        """What a journal must match to be resumed: the arguments that
+        decide the copies and their files, and the questions.
+        """
+        return {
+            "exam_file_name": str(exam_file_name),
+            "n_copies": n_copies,
+            "seed": seed,
+            "questions_shuffle": questions_shuffle,
+            "answers_shuffle": answers_shuffle,
+            "questions": questions_hash(self.questions),
+        }
+
+    @staticmethod
+    def _serialized_copies(
+        questions_serialized: SerializeExam,
+        heading: str,
+        n_copies: int,
+        qr_code: bool,
+        restored: Optional[Mapping[int, AnswerKey]] = None,
+        planned: Optional[Mapping[int, AnswerKey]] = None,
+    ) -> Generator[
+        Tuple[int, str, Iterator[Item], Optional[str], AnswerKey], None, None
+    ]:
+        """Shuffle copies one at a time: number, heading, items, QR code
+        data, None if not qr_code, and answer key. Copies in restored are not
+        shuffled, nor yielded: their answer key is taken as it is. With
+        planned, only its copies are arranged, as their answer key says.
+        """
+        restored = {} if restored is None else restored
+        numbers = range(1, n_copies + 1) if planned is None else sorted(planned)
+        for number in numbers:
+            if number in restored:
+                questions_serialized.restore(restored[number], number)
+                continue
+            if planned is None:
+                items = questions_serialized.assignment()
+            else:
+                items = questions_serialized.apply(planned[number], number)
+            answer_key = questions_serialized.last_answer_key
+            qr_data = encode_answer_key(number, answer_key) if qr_code else None
+            yield number, f"{heading} {number}/{n_copies}", items, qr_data, answer_key
+
+    def write_pdf(
+        self,
+        stream: BinaryIO,
+        answers_shuffle: bool = False,
+        questions_shuffle: bool = False,
+        heading: str = "",
+        footer: str = "",
+        seed: Optional[int] = None,
+        **kwargs,
+    ) -> None:
+        """Print one copy in PDF to a writable binary stream.
         """
         questions_serialized = SerializeExam(
             self,
             shuffle_item=questions_shuffle,
             shuffle_sub=answers_shuffle,
             to_be_shown=("subject", "text"),
+            seed=seed,
         )
 
-        self._check_io(destination)
+        self._check_images()
+
+        interface = RLInterface(
+            questions_serialized.assignment(),
+            stream,
+            heading=heading,
+            footer=footer,
+            **kwargs,
+        )
+        self._build(interface)
 
-        heading = exam_file_name.name if heading == "" else heading
+    def pdf_bytes(self, **kwargs) -> bytes:
+        """Print one copy in PDF and return it; kwargs as in write_pdf.
+        """
+        buffer = BytesIO()
+        self.write_pdf(buffer, **kwargs)
+        return buffer.getvalue()
 
-        for number in range(1, n_copies + 1):
-            if n_copies > 1:
-                file_name = (
-                    exam_file_name.parent
-                    / f"{exam_file_name.stem}_{number}_{n_copies}{exam_file_name.suffix}"
-                )
-            else:
-                file_name = exam_file_name
+    _copy_file_name = staticmethod(copy_file_name)
 
-            interface = RLInterface(
-                questions_serialized.assignment(),
+    @classmethod
+    def _deliver(
+        cls,
+        interface: RLInterface,
+        buffer: BytesIO,
+        sink: Sink,
+        file_name: Path,
+        metrics: Metrics,
+        cache: Optional[BuildCache] = None,
+        digest: Optional[str] = None,
+        writer: Optional[BackgroundWriter] = None,
+    ) -> None:
+        """Build interface in buffer, then write it in sink as file_name,
+        recording its digest in cache, if given; with writer, writing is
+        left to it.
+        """
+        cls._build(interface)
+        cls._submit(
+            writer,
+            partial(
+                cls._write,
+                sink,
                 file_name,
-                destination=destination,
-                heading=f"{heading} {number}/{n_copies}",
-                footer=footer,
-                **kwargs,
-            )
-            try:
-                interface.build()
-            except:
-                message = _("Error in building ReportLab interface")
-                raise Exam2pdfException(message)
+                buffer.getvalue(),
+                interface.page_counts,
+                metrics,
+                cache,
+                digest,
+            ),
+        )
 
-        if correction_file_name is not None:
-            interface = RLInterface(
-                questions_serialized.correction(),
-                correction_file_name,
-                destination=destination,
-                heading=heading,
-                footer=footer,
-                top_item_bullet_type="A",
-                sub_item_bullet_type="1",
-            )
-            try:
-                interface.build()
-            except:
-                message = _("Error in building ReportLab interface")
-                raise Exam2pdfException(message)
+    @staticmethod
+    def _write(
+        sink: Sink,
+        file_name: Path,
+        data: bytes,
+        page_counts: Tuple[int, ...],
+        metrics: Metrics,
+        cache: Optional[BuildCache],
+        digest: Optional[str],
+    ) -> None:
+        with metrics.stage("writing"):
+            sink.write(file_name, data)
+        metrics.add_file(file_name, len(data), page_counts)
+        if cache is not None and digest is not None:
+            cache.add(file_name, digest, len(data), page_counts)
 
-    def answers_shuffle(self):
+    @staticmethod
+    def _submit(
+        writer: Optional[BackgroundWriter], function: Callable[[], None]
+    ) -> None:
+        if writer is None:
+            function()
+        else:
+            writer.submit(function)
+
+    @staticmethod
+    def _content_hash(metrics: Metrics, *parts: Any) -> str:
+        with metrics.stage("hashing"):
+            return content_hash(*parts)
+
+    @staticmethod
+    def _up_to_date(
+        cache: Optional[BuildCache],
+        file_name: Path,
+        digest: Optional[str],
+        metrics: Metrics,
+    ) -> bool:
+        """True if file_name is in cache, up to date with digest: then it
+        is reported in metrics as it was built.
+        """
+        if cache is None or digest is None:
+            return False
+        entry = cache.lookup(file_name, digest)
+        if entry is None:
+            return False
+        metrics.add_file(file_name, entry["bytes"], entry["pages"])
+        return True
+
+    @staticmethod
+    def _build(interface: RLInterface) -> None:
+        try:
+            interface.build()
+        except:
+            message = _("Error in building ReportLab interface")
+            raise Exam2pdfException(message)
+
+    def answers_shuffle(self, random_generator: Optional[random.Random] = None):
         for question in self.questions:
-            question.shuffle()
+            question.shuffle(random_generator)
 
-    def questions_shuffle(self):
-        random.shuffle(self._questions)
+    def questions_shuffle(self, random_generator: Optional[random.Random] = None):
+        if random_generator is None:
+            random.shuffle(self._questions)
+        else:
+            random_generator.shuffle(self._questions)
 
-    def _check_io(self, destination: Path) -> None:
+    @staticmethod
+    def _check_write_permission(destination: Path) -> None:
         try:
             with TemporaryFile(dir=str(destination)) as fp:
                 fp.write(b"")
@@ -191,16 +879,22 @@ class Exam:
             message = _("you do not have write permission in ") + str(destination)
             raise Exam2pdfException(message)
 
-        for question in self._questions:
-            image: Path = question.image
-            if image != Path() and not image.is_file():
+    def _check_images(self) -> None:
+        for image in self._images():
+            if not image.is_file():
                 message = _("image file not found: ") + str(image)
                 raise Exam2pdfException(message)
+
+    def _images(self) -> List[Path]:
+        """Image files of questions and answers, each once, in order.
+        """
+        images: Dict[Path, None] = {}
+        for question in self._questions:
+            images[question.image] = None
             for answer in question.answers:
-                image = answer.image
-                if image != Path() and not image.is_file():
-                    message = _("image file not found: ") + str(image)
-                    raise Exam2pdfException(message)
+                images[answer.image] = None
+        images.pop(Path(), None)
+        return list(images)
 
     def __str__(self) -> str:
         output: List[str] = []
@@ -211,7 +905,12 @@ class Exam:
 
 class SerializeExam:
     """Serialize questions, made of text and image, and
-    answers, made of text and image.
+    answers, made of text and image. Only a compact AnswerKey of
+    each copy is kept, for the correction, and is handed to key_writer,
+    if any, as soon as the copy is shuffled. With a seed, each copy is
+    shuffled with its own copy_seed, otherwise with global random.
+    Copies are numbered from 1, unless given a number; total_copies, if
+    given, is the total the correction counts them out of.
     """
 
     def __init__(
@@ -220,44 +919,215 @@ class SerializeExam:
         shuffle_item: bool = False,
         shuffle_sub: bool = False,
         to_be_shown: Tuple[str, ...] = ("text",),
+        seed: Optional[int] = None,
+        key_writer: Optional[AnswerKeyWriter] = None,
+        metrics: Metrics = NO_METRICS,
+        total_copies: Optional[int] = None,
     ):
         self._exam: Exam = exam
         self._shuffle_item: bool = shuffle_item
         self._shuffle_sub: bool = shuffle_sub
-        self._exams_sequence: List[Exam] = []
+        self._answer_keys: List[AnswerKey] = []
+        self._copy_numbers: List[int] = []
+        self._total_copies: Optional[int] = total_copies
         self._correction_top_text: str = _("checker")
         self._to_be_shown: Tuple[str, ...] = to_be_shown
+        self._seed: Optional[int] = seed
+        self._key_writer: Optional[AnswerKeyWriter] = key_writer
+        self._metrics: Metrics = metrics
+
+    def assignment(self) -> Iterator[Item]:
+        """Shuffle the next copy, then return its items: the answer key
+        is available before the items are consumed.
+        """
+        with self._metrics.stage("shuffling"):
+            exam = self._get_a_shuffled_copy()
+        return self._items(exam)
+
+    def apply(
+        self, answer_key: AnswerKey, copy_number: Optional[int] = None
+    ) -> Iterator[Item]:
+        """Items of a copy arranged as answer_key says, from a plan or an
+        earlier run, instead of shuffled: the answer key is recorded as
+        if the copy was shuffled now.
+        """
+        self.restore(answer_key, copy_number)
+        return self._key_items(answer_key)
 
-    def assignment(self) -> Generator[Item, None, None]:
-        exam = self._get_a_shuffled_copy()
+    def _items(self, exam: Exam) -> Generator[Item, None, None]:
         for question in exam.questions:
-            text_shown = [
-                str(getattr(question, name, ""))
-                for name in self._to_be_shown
-                if str(getattr(question, name, "")) != ""
-            ]
-            yield Item(ItemLevel.top, " - ".join(text_shown), question.image)
+            yield self._top_item(question)
             for answer in question.answers:
                 yield Item(ItemLevel.sub, answer.text, answer.image)
 
+    def _key_items(self, answer_key: AnswerKey) -> Generator[Item, None, None]:
+        questions = self._exam.questions
+        answer_indexes = iter(answer_key.answers)
+        for index in answer_key.order:
+            question = questions[index]
+            yield self._top_item(question)
+            for _1 in question.answers:
+                answer = question.answers[next(answer_indexes)]
+                yield Item(ItemLevel.sub, answer.text, answer.image)
+
+    def _top_item(self, question: Question) -> Item:
+        text_shown = [
+            str(getattr(question, name, ""))
+            for name in self._to_be_shown
+            if str(getattr(question, name, "")) != ""
+        ]
+        return Item(ItemLevel.top, " - ".join(text_shown), question.image)
+
+    def restore(self, answer_key: AnswerKey, copy_number: Optional[int] = None) -> None:
+        """Take answer_key as the one of the next copy, or of copy_number,
+        shuffled by an earlier run, instead of shuffling it; key_writer
+        gets it too.
+        """
+        copy_number = self._next_copy_number() if copy_number is None else copy_number
+        self._answer_keys.append(answer_key)
+        self._copy_numbers.append(copy_number)
+        self._write_key(copy_number, answer_key)
+
+    def _next_copy_number(self) -> int:
+        return self._copy_numbers[-1] + 1 if self._copy_numbers else 1
+
+    @property
+    def copy_numbers(self) -> Tuple[int, ...]:
+        """Number of each copy, in the order of answer_keys.
+        """
+        return tuple(self._copy_numbers)
+
+    def correct_options(self, answer_key: AnswerKey) -> Tuple[str, ...]:
+        """The correct option of each question of a copy, as in the
+        correction.
+        """
+        return tuple(self._correct_options(answer_key, self._exam.questions))
+
+    @property
+    def answer_keys(self) -> Tuple[AnswerKey, ...]:
+        return tuple(self._answer_keys)
+
+    @property
+    def last_answer_key(self) -> Optional[AnswerKey]:
+        """Answer key of the copy shuffled last, None if no one yet.
+        """
+        return self._answer_keys[-1] if self._answer_keys else None
+
+    def key_records(
+        self,
+    ) -> Generator[Tuple[int, array, Tuple[Tuple[int, ...], ...], array], None, None]:
+        """For each copy: copy number, original index of each question,
+        original index of each answer grouped by question, index of the
+        correct answer in the copy.
+        """
+        questions = self._exam.questions
+        for copy_number, answer_key in zip(self._copy_numbers, self._answer_keys):
+            answers = self._split_answers(answer_key, questions)
+            yield copy_number, answer_key.order, answers, answer_key.correct
+
     def correction(self) -> Generator[Item, None, None]:
-        total_copies = len(self._exams_sequence)
-        for copy_number, exam in enumerate(self._exams_sequence, 1):
-            if exam.questions != ():
+        total_copies = self._total_copies or len(self._answer_keys)
+        questions = self._exam.questions
+        for copy_number, answer_key in zip(self._copy_numbers, self._answer_keys):
+            if len(answer_key.order) != 0:
                 top_text = f"{self._correction_top_text} {copy_number}/{total_copies}"
                 yield Item(ItemLevel.top, top_text, Path("."))
-            for question in exam.questions:
-                yield Item(ItemLevel.sub, f"{question.correct_option}", Path("."))
+            for option in self._correct_options(answer_key, questions):
+                yield Item(ItemLevel.sub, option, Path("."))
+
+    def correction_header(self) -> Tuple[str, ...]:
+        """Header of correction_rows: the label column, then the
+        question numbers.
+        """
+        n_questions = len(self._exam.questions)
+        numbers = (str(number) for number in range(1, n_questions + 1))
+        return (self._correction_top_text, *numbers)
+
+    def correction_rows(self) -> Generator[Tuple[str, ...], None, None]:
+        """One row per copy: the copy number, then the correct options.
+        """
+        total_copies = self._total_copies or len(self._answer_keys)
+        questions = self._exam.questions
+        for copy_number, answer_key in zip(self._copy_numbers, self._answer_keys):
+            options = self._correct_options(answer_key, questions)
+            yield (f"{copy_number}/{total_copies}", *options)
+
+    def _correct_options(
+        self, answer_key: AnswerKey, questions: Tuple[Question, ...]
+    ) -> Generator[str, None, None]:
+        for index, correct in zip(answer_key.order, answer_key.correct):
+            yield self._correct_option(questions[index], correct)
+
+    @staticmethod
+    def _correct_option(question: Question, correct: int) -> str:
+        """The correct option of a shuffled question: as in
+        Question.correct_option, but correct is the shuffled index.
+        """
+        if correct < 0:
+            return f"{None}"
+        if isinstance(question, TrueFalseQuest):
+            return f"{question.correct_option}"
+        return chr(ord(LETTER_A) + correct)
 
     def _get_a_shuffled_copy(self) -> Exam:
         exam = self._exam.copy()
+        original_index = {id(question): i for i, question in enumerate(exam.questions)}
+        copy_number = self._next_copy_number()
+        if self._seed is None:
+            seed = None
+            random_generator = None
+        else:
+            seed = copy_seed(self._seed, copy_number)
+            random_generator = random.Random(seed)
 
         if self._shuffle_item:
-            exam.questions_shuffle()
+            exam.questions_shuffle(random_generator)
 
         if self._shuffle_sub:
-            exam.answers_shuffle()
+            exam.answers_shuffle(random_generator)
 
-        self._exams_sequence.append(exam)
+        answer_key = self._answer_key(exam, original_index, seed)
+        self._answer_keys.append(answer_key)
+        self._copy_numbers.append(copy_number)
+        self._write_key(copy_number, answer_key)
 
         return exam
+
+    def _write_key(self, copy_number: int, answer_key: AnswerKey) -> None:
+        if self._key_writer is not None:
+            questions = self._exam.questions
+            self._key_writer.write(
+                copy_number,
+                answer_key,
+                self._split_answers(answer_key, questions),
+                tuple(self._correct_options(answer_key, questions)),
+            )
+
+    @staticmethod
+    def _split_answers(
+        answer_key: AnswerKey, questions: Tuple[Question, ...]
+    ) -> Tuple[Tuple[int, ...], ...]:
+        """The original index of each answer, grouped by question.
+        """
+        answers = iter(answer_key.answers)
+        return tuple(
+            tuple(next(answers) for _1 in questions[index].answers)
+            for index in answer_key.order
+        )
+
+    def _answer_key(
+        self, exam: Exam, original_index: Dict[int, int], seed: Optional[int]
+    ) -> AnswerKey:
+        questions = self._exam.questions
+        order = array("I")
+        answers = array("B")
+        correct = array("b")
+        for question in exam.questions:
+            index = original_index[id(question)]
+            original_answers = questions[index].answers
+            answer_index = {id(answer): i for i, answer in enumerate(original_answers)}
+            order.append(index)
+            answers.extend(answer_index[id(answer)] for answer in question.answers)
+            correct_index = question.correct_index
+            correct.append(-1 if correct_index is None else correct_index)
+        return AnswerKey(order, answers, correct, seed)
@@ -1,31 +1,405 @@
+import csv
+import gzip
+from io import BytesIO
+import json
+import os
 from pathlib import Path
-from typing import Iterator
-from .rlwrapper import PDFDoc
-from .utility import ItemLevel, Item
+import tarfile
+import time
+from typing import (
+    Iterator,
+    List,
+    Tuple,
+    Union,
+    BinaryIO,
+    Dict,
+    Optional,
+    Sequence,
+    TextIO,
+    Type,
+)
+import zipfile
+from .metrics import Metrics, NO_METRICS
+from .sheet import SheetLayout
+from .utility import ItemLevel, Item, AnswerKey, Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+
+class Sink:
+    """Where the pdf files are delivered, as bytes, one per file name.
+    Subclasses override write and, if they hold resources, close.
+    """
+
+    def write(self, name: Path, data: bytes) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class DirectorySink(Sink):
+    """Save each pdf in destination folder, atomically: it is written in
+    a temporary file, then renamed, so a file is either complete or not
+    there, even if the run is stopped halfway.
+    """
+
+    def __init__(self, destination: Path = Path(".")):
+        self._destination = destination
+
+    def write(self, name: Path, data: bytes) -> None:
+        file_path = self._destination / name
+        temporary = file_path.with_name(f".{file_path.name}.tmp")
+        try:
+            with temporary.open("wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, file_path)
+        except BaseException:
+            if temporary.exists():
+                temporary.unlink()
+            raise
+
+
+class MemorySink(Sink):
+    """Keep each pdf in memory, in files attribute.
+    """
+
+    def __init__(self):
+        self.files: Dict[Path, bytes] = {}
+
+    def write(self, name: Path, data: bytes) -> None:
+        self.files[name] = data
+
+
+# date of archive members with invariant, the earliest a zip can have,
+# and the same as a timestamp
+INVARIANT_DATE = (1980, 1, 1, 0, 0, 0)
+INVARIANT_MTIME = 315532800
+
+
+class ZipSink(Sink):
+    """Stream each pdf in a zip archive as soon as it is delivered: only
+    one file at a time is kept in memory. With invariant, members are
+    dated INVARIANT_DATE, not now.
+    """
+
+    def __init__(
+        self,
+        archive: Union[Path, BinaryIO],
+        compress_level: Optional[int] = None,
+        invariant: bool = False,
+    ):
+        self._archive = zipfile.ZipFile(
+            archive,
+            "w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=compress_level,
+        )
+        self._invariant = invariant
+
+    def write(self, name: Path, data: bytes) -> None:
+        if self._invariant:
+            info = zipfile.ZipInfo(name.as_posix(), INVARIANT_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._archive.writestr(info, data)
+        else:
+            self._archive.writestr(name.as_posix(), data)
+
+    def close(self) -> None:
+        self._archive.close()
+
+
+class TarSink(Sink):
+    """Stream each pdf in a tar archive, compressed with compression
+    ("", "gz", "bz2" or "xz"), as soon as it is delivered. With
+    invariant, members are dated INVARIANT_DATE, not now, and so is a gz
+    header.
+    """
+
+    def __init__(
+        self,
+        archive: Path,
+        compression: str = "",
+        compress_level: Optional[int] = None,
+        invariant: bool = False,
+    ):
+        options = {}
+        if compression and compress_level is not None:
+            key = "preset" if compression == "xz" else "compresslevel"
+            options[key] = compress_level
+        self._invariant = invariant
+        # closed after the archive: tarfile leaves a given fileobj open
+        self._streams: List[BinaryIO] = []
+        if invariant and compression == "gz":
+            # tarfile dates the gz header now
+            stream = archive.open("wb")
+            gz_stream = gzip.GzipFile(
+                filename="",
+                mode="wb",
+                fileobj=stream,
+                mtime=INVARIANT_MTIME,
+                **options,
+            )
+            self._streams = [gz_stream, stream]
+            self._archive = tarfile.open(fileobj=gz_stream, mode="w")
+        else:
+            self._archive = tarfile.open(str(archive), f"w:{compression}", **options)
+
+    def write(self, name: Path, data: bytes) -> None:
+        info = tarfile.TarInfo(name.as_posix())
+        info.size = len(data)
+        info.mtime = INVARIANT_MTIME if self._invariant else int(time.time())
+        self._archive.addfile(info, BytesIO(data))
+
+    def close(self) -> None:
+        self._archive.close()
+        for stream in self._streams:
+            stream.close()
+
+
+def archive_sink(
+    archive: Path, compress_level: Optional[int] = None, invariant: bool = False
+) -> Sink:
+    """Return the archive Sink matching archive suffix: .zip, .tar,
+    .tar.gz (.tgz), .tar.bz2 or .tar.xz.
+    """
+    name = archive.name.lower()
+    if name.endswith(".zip"):
+        return ZipSink(archive, compress_level, invariant)
+    tar_suffixes = (
+        (".tar", ""),
+        (".tar.gz", "gz"),
+        (".tgz", "gz"),
+        (".tar.bz2", "bz2"),
+        (".tar.xz", "xz"),
+    )
+    for suffix, compression in tar_suffixes:
+        if name.endswith(suffix):
+            return TarSink(archive, compression, compress_level, invariant)
+    message = _("unknown archive format: ") + str(archive)
+    raise Exam2pdfException(message)
+
+
+class AnswerKeyWriter:
+    """Write the answer key of each copy to a text stream, one copy at a
+    time, as soon as it is shuffled. Indexes refer to the original exam
+    and start from 0.
+    """
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+
+    def write(
+        self,
+        copy_number: int,
+        answer_key: AnswerKey,
+        answers: Sequence[Sequence[int]],
+        options: Sequence[str],
+    ) -> None:
+        raise NotImplementedError
+
+
+class CsvKeyWriter(AnswerKeyWriter):
+    """One row for each question of each copy; the original indexes of
+    the answers are separated by space.
+    """
+
+    fields = ("copy", "seed", "position", "question", "answers", "correct", "option")
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self._writer = csv.writer(stream)
+        self._writer.writerow(self.fields)
+
+    def write(
+        self,
+        copy_number: int,
+        answer_key: AnswerKey,
+        answers: Sequence[Sequence[int]],
+        options: Sequence[str],
+    ) -> None:
+        seed = "" if answer_key.seed is None else answer_key.seed
+        self._writer.writerows(
+            (
+                copy_number,
+                seed,
+                position,
+                question,
+                " ".join(map(str, question_answers)),
+                correct,
+                option,
+            )
+            for position, (question, question_answers, correct, option) in enumerate(
+                zip(answer_key.order, answers, answer_key.correct, options)
+            )
+        )
+
+
+class JsonlKeyWriter(AnswerKeyWriter):
+    """One json object for each copy.
+    """
+
+    def write(
+        self,
+        copy_number: int,
+        answer_key: AnswerKey,
+        answers: Sequence[Sequence[int]],
+        options: Sequence[str],
+    ) -> None:
+        record = {
+            "copy": copy_number,
+            "seed": answer_key.seed,
+            "questions": answer_key.order.tolist(),
+            "answers": [list(question_answers) for question_answers in answers],
+            "correct": answer_key.correct.tolist(),
+            "options": list(options),
+        }
+        self._stream.write(json.dumps(record) + "\n")
+
+
+def key_writer_type(file_name: Path) -> Type[AnswerKeyWriter]:
+    """Return the AnswerKeyWriter matching file_name suffix: .csv or .jsonl.
+    """
+    writers = {".csv": CsvKeyWriter, ".jsonl": JsonlKeyWriter}
+    try:
+        return writers[file_name.suffix.lower()]
+    except KeyError:
+        message = _("unknown answer key format: ") + str(file_name)
+        raise Exam2pdfException(message)
 
 
 class RLInterface:
-    def __init__(self, input_generator: Iterator[Item], output_file: Path, **kwargs):
+    def __init__(
+        self,
+        input_generator: Iterator[Item],
+        output_file: Union[Path, BinaryIO],
+        **kwargs
+    ):
         """This class print a two nesting level series of items in pdf.
+        output_file is a path, relative to destination, or a writable
+        binary stream.
         """
-        file_name: Path = kwargs.get("destination", Path(".")) / output_file
+        file_name: Union[Path, BinaryIO] = (
+            kwargs.get("destination", Path(".")) / output_file
+            if isinstance(output_file, Path)
+            else output_file
+        )
+        # ReportLab is imported on the first pdf, not with the sinks
+        from .rlwrapper import PDFDoc
+
         self._input = input_generator
+        self._metrics: Metrics = kwargs.get("metrics", NO_METRICS)
         page_heading: str = kwargs.get("heading", "")
         page_footer: str = kwargs.get("footer", "")
         self._doc = PDFDoc(
             file_name, page_heading=page_heading, page_footer=page_footer, **kwargs
         )
 
+    @property
+    def page_counts(self) -> Tuple[int, ...]:
+        """Pages of each copy, once built.
+        """
+        return self._doc.page_counts
+
     def build(self) -> None:
+        with self._metrics.stage("flowables"):
+            self._add_items(self._input)
+        self._doc.build()
+
+    def _add_items(self, input_generator: Iterator[Item]) -> None:
+        from .rlwrapper import prefetched
+
+        input_generator = prefetched(input_generator)
         try:
-            item = next(self._input)
+            item = next(input_generator)
             assert item.item_level == ItemLevel.top, "The first ItemLevel must be top"
             self._doc.add_item(item)
             while True:
-                item = next(self._input)
+                item = next(input_generator)
                 if item.item_level == ItemLevel.top:
                     self._doc.add_item(item)
                 else:
                     self._doc.add_sub_item(item)
         except StopIteration:
-            self._doc.build()
+            pass
+
+
+class RLMergedInterface(RLInterface):
+    def __init__(
+        self,
+        copies: Iterator[Tuple[str, Iterator[Item], Optional[str]]],
+        output_file: Union[Path, BinaryIO],
+        **kwargs
+    ):
+        """This class print many copies, each one a two nesting level
+        series of items with its own heading and QR code data, if not
+        None, in a single pdf.
+        """
+        super().__init__(iter(()), output_file, **kwargs)
+        self._copies = copies
+
+    def build(self) -> None:
+        for heading, input_generator, qr_code in self._copies:
+            with self._metrics.stage("flowables"):
+                self._doc.new_copy(heading, qr_code)
+                self._add_items(input_generator)
+        self._doc.build()
+
+
+class RLTableInterface(RLInterface):
+    def __init__(
+        self,
+        header: Sequence[str],
+        rows: Iterator[Sequence[str]],
+        output_file: Union[Path, BinaryIO],
+        **kwargs
+    ):
+        """This class print rows, as a dense table, in pdf.
+        """
+        super().__init__(iter(()), output_file, **kwargs)
+        self._header = header
+        self._rows = rows
+
+    def build(self) -> None:
+        with self._metrics.stage("flowables"):
+            self._doc.add_table(self._header, self._rows)
+        self._doc.build()
+
+
+class RLAnswerSheetInterface:
+    def __init__(
+        self,
+        layout: SheetLayout,
+        copies: Iterator[Tuple[str, int]],
+        output_file: Union[Path, BinaryIO],
+        **kwargs
+    ):
+        """This class print an answer sheet for each copy, given its
+        heading and number, in pdf.
+        """
+        file_name: Union[Path, BinaryIO] = (
+            kwargs.get("destination", Path(".")) / output_file
+            if isinstance(output_file, Path)
+            else output_file
+        )
+        from .rlwrapper import AnswerSheetDoc
+
+        self._copies = copies
+        self._doc = AnswerSheetDoc(file_name, layout, **kwargs)
+
+    @property
+    def page_counts(self) -> Tuple[int, ...]:
+        return self._doc.page_counts
+
+    def build(self) -> None:
+        for heading, copy_number in self._copies:
+            self._doc.add_sheet(heading, copy_number)
+        self._doc.build()
@@ -0,0 +1,296 @@
+from collections import namedtuple, defaultdict
+import csv
+import json
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .question import LETTER_A
+from .utility import Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+BLANK = -1
+INVALID = -2  # more than one option marked, or unreadable
+
+# students: id of each student, copies: copy number of each student,
+# choices: the option chosen for each question as printed in the copy
+# (0 is A), BLANK or INVALID.
+Responses = namedtuple("Responses", ["students", "copies", "choices"])
+
+# One row for each student. scores, n_right, n_wrong, n_blank are
+# totals; original_choices is the original answer index chosen for each
+# original question (BLANK or INVALID if none), right tells whether the
+# original question is answered correctly.
+Grades = namedtuple(
+    "Grades",
+    [
+        "students",
+        "copies",
+        "scores",
+        "n_right",
+        "n_wrong",
+        "n_blank",
+        "original_choices",
+        "right",
+    ],
+)
+
+
+# copy number, order, answers grouped by question, correct
+KeyRecord = Tuple[int, Sequence[int], Sequence[Sequence[int]], Sequence[int]]
+
+
+class KeyArrays:
+    """Answer keys, as written by Exam.print answer_key_file, of all the
+    copies as NumPy arrays with one row per copy:
+    order is the original index of each question, answers the original
+    index of each option (-1 padded), correct the index of the correct
+    option in the copy (-1 if none).
+    """
+
+    def __init__(
+        self,
+        copies: np.ndarray,
+        order: np.ndarray,
+        answers: np.ndarray,
+        correct: np.ndarray,
+    ):
+        self.copies = copies
+        self.order = order
+        self.answers = answers
+        self.correct = correct
+        self._row_of_copy = np.full(int(copies.max(initial=0)) + 1, -1, np.int64)
+        self._row_of_copy[copies] = np.arange(len(copies))
+
+    @property
+    def n_questions(self) -> int:
+        return self.order.shape[1]
+
+    @classmethod
+    def from_records(cls, records: Iterable[KeyRecord]) -> "KeyArrays":
+        """Build from (copy number, order, answers grouped by question,
+        correct) records.
+        """
+        records = list(records)
+        if not records:
+            message = _("no answer key found")
+            raise Exam2pdfException(message)
+        n_questions = len(records[0][1])
+        if any(len(record[1]) != n_questions for record in records):
+            message = _("answer keys with different number of questions")
+            raise Exam2pdfException(message)
+        max_answers = max(
+            (len(answers) for record in records for answers in record[2]), default=0
+        )
+        n_copies = len(records)
+        copies = np.empty(n_copies, np.int64)
+        order = np.empty((n_copies, n_questions), np.int32)
+        answers = np.full((n_copies, n_questions, max(max_answers, 1)), -1, np.int16)
+        correct = np.empty((n_copies, n_questions), np.int16)
+        for row, (copy_number, copy_order, copy_answers, copy_correct) in enumerate(
+            records
+        ):
+            copies[row] = copy_number
+            order[row] = copy_order
+            correct[row] = copy_correct
+            for position, question_answers in enumerate(copy_answers):
+                answers[row, position, : len(question_answers)] = question_answers
+        return cls(copies, order, answers, correct)
+
+    @classmethod
+    def load(cls, file_path: Path) -> "KeyArrays":
+        """Load an answer key file written by Exam.print: .jsonl or .csv.
+        """
+        try:
+            with file_path.open(newline="", encoding="utf-8") as key_file:
+                if file_path.suffix.lower() == ".jsonl":
+                    return cls.from_records(_jsonl_records(key_file))
+                if file_path.suffix.lower() == ".csv":
+                    return cls.from_records(_csv_records(key_file))
+        except FileNotFoundError:
+            message = _("answer key file not found: ") + str(file_path)
+            raise Exam2pdfException(message)
+        message = _("unknown answer key format: ") + str(file_path)
+        raise Exam2pdfException(message)
+
+    def rows(self, copies: np.ndarray) -> np.ndarray:
+        """Row of each of the given copy numbers.
+        """
+        valid = (copies >= 0) & (copies < len(self._row_of_copy))
+        rows = np.full(len(copies), -1, np.int64)
+        rows[valid] = self._row_of_copy[copies[valid]]
+        if (rows < 0).any():
+            unknown = copies[rows < 0][0]
+            message = _("no answer key for copy ") + str(unknown)
+            raise Exam2pdfException(message)
+        return rows
+
+
+def _jsonl_records(key_file):
+    for line in key_file:
+        if line.strip():
+            record = json.loads(line)
+            yield (
+                record["copy"],
+                record["questions"],
+                record["answers"],
+                record["correct"],
+            )
+
+
+def _csv_records(key_file):
+    copies = defaultdict(list)
+    for row in csv.DictReader(key_file):
+        copies[int(row["copy"])].append(row)
+    for copy_number, rows in copies.items():
+        rows.sort(key=lambda row: int(row["position"]))
+        yield (
+            copy_number,
+            [int(row["question"]) for row in rows],
+            [[int(index) for index in row["answers"].split()] for row in rows],
+            [int(row["correct"]) for row in rows],
+        )
+
+
+def parse_choice(text: str) -> int:
+    """Option index of a response: letters from A, blank if empty,
+    INVALID if more than one letter or not a letter.
+    """
+    text = text.strip().upper()
+    if text in ("", "-"):
+        return BLANK
+    if len(text) == 1 and text.isalpha():
+        return ord(text) - ord(LETTER_A)
+    return INVALID
+
+
+def load_responses(file_path: Path) -> Responses:
+    """Load a csv file with columns student, copy, then the response for
+    each question as printed in the copy.
+    """
+    students: List[str] = []
+    copies: List[int] = []
+    choices: List[List[int]] = []
+    try:
+        with file_path.open(newline="", encoding="utf-8") as responses_file:
+            reader = csv.reader(responses_file)
+            next(reader, None)  # header
+            for row in reader:
+                if not row:
+                    continue
+                students.append(row[0])
+                copies.append(int(row[1]))
+                choices.append([parse_choice(text) for text in row[2:]])
+    except FileNotFoundError:
+        message = _("responses file not found: ") + str(file_path)
+        raise Exam2pdfException(message)
+    return Responses(students, np.array(copies, np.int64), _to_matrix(choices))
+
+
+def save_responses(responses: Responses, file_path: Path) -> None:
+    """Save responses as load_responses reads them: a letter for each
+    choice, empty if blank, * if invalid.
+    """
+    n_questions = responses.choices.shape[1]
+    with file_path.open("w", newline="", encoding="utf-8") as responses_file:
+        writer = csv.writer(responses_file)
+        writer.writerow(("student", "copy", *range(1, n_questions + 1)))
+        for student, copy_number, choices in zip(
+            responses.students, responses.copies.tolist(), responses.choices.tolist()
+        ):
+            writer.writerow((student, copy_number, *map(_choice_text, choices)))
+
+
+def _choice_text(choice: int) -> str:
+    if choice == BLANK:
+        return ""
+    if choice < 0:
+        return "*"
+    return chr(ord(LETTER_A) + choice)
+
+
+def _to_matrix(choices: List[List[int]]) -> np.ndarray:
+    n_questions = max((len(row) for row in choices), default=0)
+    matrix = np.full((len(choices), n_questions), BLANK, np.int16)
+    for row, row_choices in enumerate(choices):
+        matrix[row, : len(row_choices)] = row_choices
+    return matrix
+
+
+def grade(
+    keys: KeyArrays,
+    responses: Responses,
+    right: float = 1.0,
+    wrong: float = 0.0,
+    blank: float = 0.0,
+) -> Grades:
+    """Score every student in one pass: right, wrong and blank are the
+    points for each answer of that kind (a penalty is negative). Invalid
+    responses are wrong.
+    """
+    choices = responses.choices
+    n_students, n_questions = choices.shape
+    if n_questions > keys.n_questions:
+        message = _("more responses than questions: ") + str(n_questions)
+        raise Exam2pdfException(message)
+    if n_questions < keys.n_questions:
+        padding = np.full((n_students, keys.n_questions - n_questions), BLANK)
+        choices = np.hstack([choices, padding.astype(choices.dtype)])
+        n_questions = keys.n_questions
+
+    rows = keys.rows(responses.copies)
+    correct = keys.correct[rows]
+    max_answers = keys.answers.shape[2]
+
+    is_blank = choices == BLANK
+    in_range = (choices >= 0) & (choices < max_answers)
+    is_right = in_range & (choices == correct) & (correct >= 0)
+    is_wrong = ~is_blank & ~is_right
+
+    n_right = is_right.sum(axis=1)
+    n_wrong = is_wrong.sum(axis=1)
+    n_blank = is_blank.sum(axis=1)
+    scores = right * n_right + wrong * n_wrong + blank * n_blank
+
+    # back to the original questions and answers
+    positions = np.arange(n_questions) * max_answers
+    flat_answers = keys.answers.reshape(len(keys.copies), -1)
+    chosen = flat_answers[rows[:, None], positions + np.where(in_range, choices, 0)]
+    is_valid = in_range & (chosen >= 0)
+    chosen = np.where(is_valid, chosen, np.where(is_blank, BLANK, INVALID))
+    order = keys.order[rows]
+    original_choices = np.empty_like(chosen)
+    np.put_along_axis(original_choices, order, chosen, axis=1)
+    original_right = np.empty_like(is_right)
+    np.put_along_axis(original_right, order, is_right, axis=1)
+
+    return Grades(
+        responses.students,
+        responses.copies,
+        scores,
+        n_right,
+        n_wrong,
+        n_blank,
+        original_choices,
+        original_right,
+    )
+
+
+def save_grades(grades: Grades, file_path: Path) -> None:
+    """Save student, copy, score and totals in a csv file.
+    """
+    with file_path.open("w", newline="", encoding="utf-8") as grades_file:
+        writer = csv.writer(grades_file)
+        writer.writerow(("student", "copy", "score", "right", "wrong", "blank"))
+        writer.writerows(
+            zip(
+                grades.students,
+                grades.copies.tolist(),
+                grades.scores.tolist(),
+                grades.n_right.tolist(),
+                grades.n_wrong.tolist(),
+                grades.n_blank.tolist(),
+            )
+        )
@@ -0,0 +1,88 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, TextIO
+
+from .utility import (
+    AnswerKey,
+    Exam2pdfException,
+    decode_answer_key,
+    encode_answer_key,
+    set_i18n,
+)
+
+_ = set_i18n().gettext
+
+
+class Journal:
+    """Checkpoints of a batch print, in a json lines file: a header with
+    the job, then a line for each copy delivered, with its file name and
+    answer key (see encode_answer_key). Every line is on disk before the
+    next copy starts, so a run stopped at any point can be resumed.
+
+    Raises:
+        Exam2pdfException: if file_path journals a different job.
+    """
+
+    def __init__(self, file_path: Path, job: Dict[str, Any]):
+        self._file_path = file_path
+        # copy number: file name, answer key
+        self._copies: Dict[int, Any] = {}
+        header = {"journal": 1, "job": job}
+        if file_path.exists():
+            self._load(header)
+            self._file: TextIO = file_path.open("a", encoding="utf-8")
+        else:
+            self._file = file_path.open("w", encoding="utf-8")
+            self._write(header)
+
+    def _load(self, header: Dict[str, Any]) -> None:
+        lines = self._file_path.read_bytes().splitlines(keepends=True)
+        try:
+            first = json.loads(lines[0])
+        except (IndexError, ValueError):
+            first = None
+        if first != json.loads(json.dumps(header)):
+            message = _("journal of a different print: ") + str(self._file_path)
+            raise Exam2pdfException(message)
+        end = len(lines[0])
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+                _copy_number, answer_key = decode_answer_key(record["key"])
+            except (ValueError, KeyError, Exam2pdfException):
+                break
+            if not line.endswith(b"\n"):
+                break
+            self._copies[record["copy"]] = (Path(record["file"]), answer_key)
+            end += len(line)
+        # drop the line being written when the run stopped, if any
+        os.truncate(self._file_path, end)
+
+    def delivered(self, destination: Path) -> Dict[int, AnswerKey]:
+        """Copy number: answer key, of the copies delivered by an earlier
+        run whose files are still in destination.
+        """
+        return {
+            copy_number: answer_key
+            for copy_number, (file_name, answer_key) in self._copies.items()
+            if (destination / file_name).exists()
+        }
+
+    def record(self, copy_number: int, file_name: Path, answer_key: AnswerKey) -> None:
+        self._copies[copy_number] = (file_name, answer_key)
+        self._write(
+            {
+                "copy": copy_number,
+                "file": str(file_name),
+                "key": encode_answer_key(copy_number, answer_key),
+            }
+        )
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
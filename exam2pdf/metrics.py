@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+import json
+from pathlib import Path
+import threading
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+# environment variable: directory to profile builds in (see profiling)
+PROFILE_ENV = "EXAM2PDF_PROFILE"
+
+# stage name, elapsed seconds
+StageCallback = Callable[[str, float], None]
+
+
+class Metrics:
+    """Time spent in each stage of a build, and what was built. Stages
+    may nest: seconds is the time spent in a stage, children included,
+    self_seconds the time not spent in nested stages. If given, callback
+    is called at the end of every stage. Stages may run in many threads:
+    each one nests its own.
+    """
+
+    def __init__(self, callback: Optional[StageCallback] = None):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.files: List[Dict] = []
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start = perf_counter()
+
+    @property
+    def _children_seconds(self) -> List[float]:
+        """Seconds spent in nested stages, for each stage running in this
+        thread.
+        """
+        try:
+            return self._local.children_seconds
+        except AttributeError:
+            self._local.children_seconds = []
+            return self._local.children_seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        children_seconds = self._children_seconds
+        children_seconds.append(0.0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            seconds = perf_counter() - start
+            nested_seconds = children_seconds.pop()
+            if children_seconds:
+                children_seconds[-1] += seconds
+            self.add(name, seconds, seconds - nested_seconds)
+
+    def add(self, name: str, seconds: float, self_seconds: float) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "self_seconds": 0.0}
+            )
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            stage["self_seconds"] += self_seconds
+        if self._callback is not None:
+            self._callback(name, seconds)
+
+    def add_file(self, name: Path, size: int, pages: Sequence[int] = ()) -> None:
+        """Record an output file: its size in bytes and the pages of
+        each copy in it.
+        """
+        with self._lock:
+            self.files.append({"name": str(name), "bytes": size, "pages": list(pages)})
+
+    def report(self) -> Dict:
+        return {
+            "seconds": perf_counter() - self._start,
+            "stages": self.stages,
+            "files": self.files,
+        }
+
+    def save(self, file_path: Path) -> None:
+        """Save the report in a json file.
+        """
+        file_path.write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+
+
+class _NoMetrics(Metrics):
+    """Metrics that records nothing, for when no one asks for them.
+    """
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        yield
+
+    def add(self, name: str, seconds: float, self_seconds: float) -> None:
+        pass
+
+    def add_file(self, name: Path, size: int, pages: Sequence[int] = ()) -> None:
+        pass
+
+
+NO_METRICS = _NoMetrics()
@@ -0,0 +1,120 @@
+"""Stages of a print running side by side in threads, linked by bounded
+queues: copies are shuffled ahead of layout, and written behind it, so
+that the disk, or a sink, never stalls the layout of the next copy.
+"""
+
+from queue import Empty, Full, Queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+# seconds between checks that the other end of a queue is still there
+_POLL = 0.1
+
+
+def background(iterable: Iterable[Any], depth: int = 2) -> Iterator[Any]:
+    """Iterate iterable in a thread, at most depth items ahead of the
+    consumer; errors are raised to the consumer, in their place. The
+    thread stops when the consumer does.
+    """
+    queue: Queue = Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not _put(queue, (item, None), stop):
+                    return
+        except BaseException as error:
+            _put(queue, (done, error), stop)
+        else:
+            _put(queue, (done, None), stop)
+
+    thread = threading.Thread(target=produce, name="exam2pdf-producer", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        # the producer may be waiting for room: make it, and drop the items
+        while True:
+            try:
+                queue.get_nowait()
+            except Empty:
+                break
+        thread.join()
+
+
+def _put(queue: Queue, item: Any, stop: threading.Event) -> bool:
+    """Put item in queue, waiting for room unless stop is set: False if
+    it was, or is once put.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=_POLL)
+            return not stop.is_set()
+        except Full:
+            pass
+    return False
+
+
+class BackgroundWriter:
+    """Run the functions submitted, in order, in a thread, with at most
+    depth of them waiting: submit blocks when the writer is behind. The
+    first error is raised by the next submit, or by close; after it, the
+    functions still waiting are dropped.
+    """
+
+    def __init__(self, depth: int = 2):
+        self._queue: Queue = Queue(maxsize=depth)
+        self._errors: List[BaseException] = []
+        self._thread = threading.Thread(
+            target=self._run, name="exam2pdf-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            function = self._queue.get()
+            if function is None:
+                return
+            if not self._errors:
+                try:
+                    function()
+                except BaseException as error:
+                    self._errors.append(error)
+
+    def submit(self, function: Callable[[], None]) -> None:
+        self._raise()
+        while True:
+            try:
+                self._queue.put(function, timeout=_POLL)
+                return
+            except Full:
+                self._raise()
+
+    def _raise(self) -> None:
+        if self._errors:
+            raise self._errors[0]
+
+    def close(self) -> None:
+        """Wait for the functions submitted to be run.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        self._raise()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, exc_type: Optional[type], *args: Any) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if exc_type is None:
+            self._raise()
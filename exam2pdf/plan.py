@@ -0,0 +1,249 @@
+"""Plans: the answer key and file of every copy of an exam, computed
+without printing, saved in a json lines file, then printed in full or as
+a slice (see Exam.print).
+"""
+
+from array import array
+from collections import namedtuple
+import json
+from pathlib import Path
+import random
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .buildcache import content_hash
+from .question import Question, TrueFalseQuest
+from .utility import (
+    AnswerKey,
+    Exam2pdfException,
+    copy_seed,
+    decode_answer_key,
+    encode_answer_key,
+    set_i18n,
+)
+
+_ = set_i18n().gettext
+
+PLAN_FORMAT = 1
+
+# keys maps copy number to answer key: every copy, or a slice of them;
+# questions is the questions_hash of the exam planned
+Plan = namedtuple(
+    "Plan",
+    [
+        "exam_file_name",
+        "n_copies",
+        "seed",
+        "questions_shuffle",
+        "answers_shuffle",
+        "questions",
+        "keys",
+    ],
+)
+
+
+def questions_hash(questions: Sequence[Question]) -> str:
+    """Hash of questions and answers, in order, with the correct answer
+    of each question and the booleans of True/False answers: answer keys
+    refer to them by index, and record which one is correct.
+    """
+    return content_hash(
+        [
+            (
+                question.text,
+                [answer.text for answer in question.answers],
+                question.correct_index,
+                [getattr(answer, "boolean", None) for answer in question.answers],
+            )
+            for question in questions
+        ]
+    )
+
+
+def copy_file_name(exam_file_name: Path, number: int, n_copies: int) -> Path:
+    if n_copies > 1:
+        return (
+            exam_file_name.parent
+            / f"{exam_file_name.stem}_{number}_{n_copies}{exam_file_name.suffix}"
+        )
+    return exam_file_name
+
+
+def make_plan(
+    questions: Sequence[Question],
+    exam_file_name: Path,
+    n_copies: int = 1,
+    seed: Optional[int] = None,
+    questions_shuffle: bool = False,
+    answers_shuffle: bool = False,
+    copies: Optional[Iterable[int]] = None,
+) -> Plan:
+    """Plan n_copies copies of questions, or only the copy numbers in
+    copies, shuffled as Exam.print shuffles them with the same arguments:
+    with a seed, a plan and a print give the same copies. Only indexes are
+    shuffled, no question is copied.
+    """
+    # number of answers, original index of the correct one, None if no
+    # one, and whether a True/False question puts its second answer first
+    shapes = [_shape(question) for question in questions]
+    numbers = range(1, n_copies + 1) if copies is None else copies
+    keys = {}
+    for number in numbers:
+        if not 1 <= number <= n_copies:
+            message = _("copy out of plan: ") + str(number)
+            raise Exam2pdfException(message)
+        keys[number] = _plan_copy(
+            shapes, number, seed, questions_shuffle, answers_shuffle
+        )
+    return Plan(
+        exam_file_name,
+        n_copies,
+        seed,
+        questions_shuffle,
+        answers_shuffle,
+        questions_hash(questions),
+        keys,
+    )
+
+
+def _shape(question: Question) -> Tuple[int, Optional[int], Optional[bool]]:
+    answers = question.answers
+    if isinstance(question, TrueFalseQuest):
+        swap = len(answers) > 1 and bool(answers[1].boolean)
+        return len(answers), question.correct_index, swap
+    return len(answers), question.correct_index, None
+
+
+def _plan_copy(
+    shapes: List[Tuple[int, Optional[int], Optional[bool]]],
+    number: int,
+    seed: Optional[int],
+    questions_shuffle: bool,
+    answers_shuffle: bool,
+) -> AnswerKey:
+    """The answer key of a copy: random numbers are drawn in the same
+    order as Exam.questions_shuffle, then Exam.answers_shuffle, draw them.
+    """
+    if seed is None:
+        getrandbits = random.getrandbits
+        key_seed = None
+    else:
+        key_seed = copy_seed(seed, number)
+        getrandbits = random.Random(key_seed).getrandbits
+
+    order = list(range(len(shapes)))
+    if questions_shuffle:
+        _shuffle(order, getrandbits)
+    answers = array("B")
+    correct = array("b")
+    for index in order:
+        n_answers, correct_index, swap = shapes[index]
+        permutation = list(range(n_answers))
+        if answers_shuffle:
+            if swap is None:
+                if correct_index is not None:
+                    _shuffle(permutation, getrandbits)
+            elif swap:
+                permutation.reverse()
+        answers.extend(permutation)
+        correct.append(
+            -1 if correct_index is None else permutation.index(correct_index)
+        )
+    return AnswerKey(array("I", order), answers, correct, key_seed)
+
+
+def _shuffle(values: List[int], getrandbits: Callable[[int], int]) -> None:
+    """random.Random.shuffle, drawing the same numbers, without its
+    per-call overhead: most questions have few answers.
+    """
+    for i in range(len(values) - 1, 0, -1):
+        n = i + 1
+        k = n.bit_length()
+        j = getrandbits(k)
+        while j >= n:
+            j = getrandbits(k)
+        values[i], values[j] = values[j], values[i]
+
+
+def save_plan(plan: Plan, file_path: Path) -> None:
+    """Save plan as json lines: a header, then, for each copy planned,
+    its number, file name and answer key (see encode_answer_key).
+    """
+    header = {
+        "plan": PLAN_FORMAT,
+        "exam_file_name": str(plan.exam_file_name),
+        "n_copies": plan.n_copies,
+        "seed": plan.seed,
+        "questions_shuffle": plan.questions_shuffle,
+        "answers_shuffle": plan.answers_shuffle,
+        "questions": plan.questions,
+    }
+    with file_path.open("w", encoding="utf-8") as plan_file:
+        plan_file.write(json.dumps(header) + "\n")
+        for number in sorted(plan.keys):
+            record = {
+                "copy": number,
+                "file": str(copy_file_name(plan.exam_file_name, number, plan.n_copies)),
+                "key": encode_answer_key(number, plan.keys[number]),
+            }
+            plan_file.write(json.dumps(record) + "\n")
+
+
+def load_plan(file_path: Path, copies: Optional[Iterable[int]] = None) -> Plan:
+    """Load a plan saved by save_plan, all of it, or only the copy
+    numbers in copies, e.g. a range.
+
+    Raises:
+        Exam2pdfException: if file_path is not a plan.
+    """
+    wanted = None if copies is None else set(copies)
+    keys: Dict[int, AnswerKey] = {}
+    try:
+        with file_path.open(encoding="utf-8") as plan_file:
+            header: Dict[str, Any] = json.loads(next(plan_file))
+            if header.get("plan") != PLAN_FORMAT:
+                raise ValueError(header)
+            for line in plan_file:
+                record = json.loads(line)
+                if wanted is None or record["copy"] in wanted:
+                    _number, keys[record["copy"]] = decode_answer_key(record["key"])
+    except FileNotFoundError:
+        message = _("plan file not found: ") + str(file_path)
+        raise Exam2pdfException(message)
+    except (StopIteration, ValueError, KeyError):
+        message = _("invalid plan file: ") + str(file_path)
+        raise Exam2pdfException(message)
+    return Plan(
+        Path(header["exam_file_name"]),
+        header["n_copies"],
+        header["seed"],
+        header["questions_shuffle"],
+        header["answers_shuffle"],
+        header["questions"],
+        keys,
+    )
+
+
+def merge_plans(plans: Iterable[Plan]) -> Plan:
+    """One plan of the copies of plans, slices of the same plan, e.g.
+    saved by workers printing one slice each.
+
+    Raises:
+        Exam2pdfException: if plans are not slices of the same plan, or
+            give a copy different answer keys.
+    """
+    merged: Optional[Plan] = None
+    keys: Dict[int, AnswerKey] = {}
+    for plan in plans:
+        if merged is None:
+            merged = plan
+        elif plan[:-1] != merged[:-1]:
+            message = _("slices of different plans")
+            raise Exam2pdfException(message)
+        for number, answer_key in plan.keys.items():
+            if keys.setdefault(number, answer_key) != answer_key:
+                message = _("copy planned twice, differently: ") + str(number)
+                raise Exam2pdfException(message)
+    if merged is None:
+        message = _("no plan to merge")
+        raise Exam2pdfException(message)
+    return merged._replace(keys=keys)
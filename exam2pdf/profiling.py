@@ -0,0 +1,105 @@
+from contextlib import contextmanager
+import cProfile
+from pathlib import Path
+import tracemalloc
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .metrics import Metrics, StageCallback, PROFILE_ENV  # noqa: F401
+
+
+class Profiler(Metrics):
+    """Metrics that also profile every stage, with cProfile and
+    tracemalloc. On close, for each stage, directory gets <stage>.pstats,
+    to be read with pstats or snakeviz, and <stage>.txt, the memory
+    allocated by all its calls and the top lines by memory allocated in
+    its first call: snapshots are too slow to be taken at every call.
+    Stages may nest: cProfile is handed over to the inner stage and back,
+    so a .pstats has only the time not spent in nested stages, while
+    allocations of nested stages are counted in the outer one too.
+    Profiling slows down the build: timings are not comparable with plain
+    Metrics ones.
+    """
+
+    def __init__(
+        self, directory: Path, top: int = 25, callback: Optional[StageCallback] = None
+    ):
+        super().__init__(callback)
+        self._directory = directory
+        self._top = top
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._running: List[cProfile.Profile] = []
+        # file name and line number: bytes and blocks allocated, first call
+        self._allocations: Dict[str, Dict[Tuple[str, int], List[int]]] = {}
+        # bytes allocated and not freed: all calls, largest call
+        self._net: Dict[str, List[int]] = {}
+        self._tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        if self._running:
+            self._running[-1].disable()
+        first = name not in self._net
+        net = self._net.setdefault(name, [0, 0])
+        before = tracemalloc.take_snapshot() if first else None
+        traced = tracemalloc.get_traced_memory()[0]
+        self._running.append(profile)
+        try:
+            with super().stage(name):
+                profile.enable()
+                try:
+                    yield
+                finally:
+                    profile.disable()
+        finally:
+            self._running.pop()
+            size = tracemalloc.get_traced_memory()[0] - traced
+            net[0] += size
+            net[1] = max(net[1], size)
+            if before is not None:
+                self._add_allocations(name, before, tracemalloc.take_snapshot())
+            if self._running:
+                self._running[-1].enable()
+
+    def _add_allocations(
+        self, name: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot
+    ) -> None:
+        allocations = self._allocations.setdefault(name, {})
+        for difference in after.compare_to(before, "lineno"):
+            if difference.size_diff <= 0:
+                continue
+            frame = difference.traceback[0]
+            total = allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+            total[0] += difference.size_diff
+            total[1] += difference.count_diff
+
+    def close(self) -> None:
+        """Stop tracing, if started here, and write the profiles.
+        """
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        self._directory.mkdir(parents=True, exist_ok=True)
+        for name, profile in self._profiles.items():
+            profile.dump_stats(str(self._directory / f"{name}.pstats"))
+            lines = sorted(
+                self._allocations.get(name, {}).items(),
+                key=lambda item: item[1][0],
+                reverse=True,
+            )[: self._top]
+            size, largest = self._net.get(name, [0, 0])
+            text = [
+                f"{name}: {size / 1024:.1f} KiB allocated and not freed, "
+                f"{largest / 1024:.1f} KiB in the largest call",
+                f"Top {self._top} lines by memory allocated in the first {name}",
+            ]
+            text.extend(
+                f"{file_name}:{line_number}: {size / 1024:.1f} KiB, {count} blocks"
+                for (file_name, line_number), (size, count) in lines
+            )
+            (self._directory / f"{name}.txt").write_text(
+                "\n".join(text) + "\n", encoding="utf-8"
+            )
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from random import shuffle
+from random import shuffle, Random
 from typing import Tuple, Iterator, Any, Optional, List, Iterable, Callable, Union
 
 from .utility import safe_int, Exam2pdfException, set_i18n
@@ -257,11 +257,14 @@ class Question:
         except IndexError as index_error:
             raise ValueError(f"no answer with letter {value}") from index_error
 
-    def shuffle(self) -> None:
-        """Shuffle the answers.
+    def shuffle(self, random_generator: Optional[Random] = None) -> None:
+        """Shuffle the answers, with random_generator if given.
         """
         if self._correct_answer:
-            shuffle(self._answers)
+            if random_generator is None:
+                shuffle(self._answers)
+            else:
+                random_generator.shuffle(self._answers)
             pointer = self._answers.index(self._correct_answer)
             self._correct_index = pointer
             self._correct_option = chr(ord(LETTER_A) + pointer)
@@ -443,7 +446,9 @@ class TrueFalseQuest(Question):
             raise
         return attributes
 
-    def shuffle(self):
+    def shuffle(self, random_generator: Optional[Random] = None) -> None:
+        """True answer goes first.
+        """
         try:
             if self.answers[1].boolean:
                 correct_answer = self.correct_answer
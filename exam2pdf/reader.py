@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .grading import BLANK, INVALID, Responses
+from .sheet import MM, SheetLayout
+from .utility import Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+SCAN_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+
+def load_scan(file_path: Path) -> np.ndarray:
+    """Darkness of each pixel of a scanned page, from 0 (white) to 1
+    (black), one row for each pixel row.
+    """
+    try:
+        with Image.open(file_path) as image:
+            gray = np.asarray(image.convert("L"), dtype=np.float32)
+    except OSError:
+        message = _("cannot read the scan: ") + str(file_path)
+        raise Exam2pdfException(message)
+    return 1 - gray / 255
+
+
+def find_marks(darkness: np.ndarray, layout: SheetLayout) -> np.ndarray:
+    """Centre, as (column, row), of the registration marks: the centroid
+    of the dark pixels in each corner of the page, in the order of
+    layout.marks.
+    """
+    n_rows, n_columns = darkness.shape
+    page_width, page_height = layout.page_size
+    # a little more than the marks, far enough from the rest of the sheet
+    corner = layout.mark_margin + layout.mark_size + 3 * MM
+    window = int(corner * n_columns / page_width), int(corner * n_rows / page_height)
+    marks = np.empty((len(layout.marks), 2))
+    for index, (x, y) in enumerate(layout.marks):
+        left = 0 if x < page_width / 2 else n_columns - window[0]
+        top = 0 if y > page_height / 2 else n_rows - window[1]
+        rows, columns = np.nonzero(
+            darkness[top : top + window[1], left : left + window[0]] > 0.5
+        )
+        if len(rows) == 0:
+            message = _("registration mark not found")
+            raise Exam2pdfException(message)
+        marks[index] = left + columns.mean(), top + rows.mean()
+    return marks
+
+
+def page_to_scan(layout: SheetLayout, marks: np.ndarray) -> np.ndarray:
+    """Affine transform, fitted on the registration marks, from page
+    points (x, y, 1) to scan pixels (column, row).
+    """
+    points = np.hstack([np.array(layout.marks), np.ones((len(layout.marks), 1))])
+    transform, *_1 = np.linalg.lstsq(points, marks, rcond=None)
+    return transform
+
+
+def _sample(
+    darkness: np.ndarray, centres: np.ndarray, transform: np.ndarray, radius: float
+) -> np.ndarray:
+    """Mean darkness inside a disc of radius points around each of the
+    centres, in page points, in one gather.
+    """
+    scale = np.sqrt(abs(np.linalg.det(transform[:2])))
+    pixel_radius = max(radius * scale, 1.0)
+    steps = np.arange(-int(pixel_radius), int(pixel_radius) + 1)
+    offset_columns, offset_rows = np.meshgrid(steps, steps)
+    inside = offset_columns**2 + offset_rows**2 <= pixel_radius**2
+    offsets = np.stack([offset_columns[inside], offset_rows[inside]], axis=1)
+
+    points = np.hstack([centres, np.ones((len(centres), 1))]) @ transform
+    pixels = np.rint(points[:, None, :] + offsets[None, :, :]).astype(np.int64)
+    columns = np.clip(pixels[..., 0], 0, darkness.shape[1] - 1)
+    rows = np.clip(pixels[..., 1], 0, darkness.shape[0] - 1)
+    return darkness[rows, columns].mean(axis=1)
+
+
+def read_sheet(
+    file_path: Path, layout: SheetLayout, threshold: float = 0.5
+) -> Tuple[int, np.ndarray]:
+    """Copy number and choices (as in Responses) of a scanned answer
+    sheet. A bubble is marked if its inner part is darker than
+    threshold.
+
+    Raises:
+        Exam2pdfException: if the scan cannot be read, registration marks
+        are not found or the copy number is not marked properly.
+    """
+    darkness = load_scan(file_path)
+    transform = page_to_scan(layout, find_marks(darkness, layout))
+    # the inner part only: not the outline, nor the letter, if thick
+    radius = layout.bubble_radius * 0.6
+
+    id_centres = np.array(layout.id_bubbles).reshape(-1, 2)
+    id_marked = _sample(darkness, id_centres, transform, radius) > threshold
+    id_marked = id_marked.reshape(layout.id_digits, 10)
+    if (id_marked.sum(axis=1) != 1).any():
+        message = _("copy number not readable: ") + str(file_path)
+        raise Exam2pdfException(message)
+    copy_number = int("".join(str(digit) for digit in id_marked.argmax(axis=1)))
+
+    choices = np.full(layout.n_questions, BLANK, np.int16)
+    if layout.n_questions and layout.n_answers:
+        centres = np.array(layout.question_bubbles).reshape(-1, 2)
+        marked = _sample(darkness, centres, transform, radius) > threshold
+        marked = marked.reshape(layout.n_questions, layout.n_answers)
+        n_marked = marked.sum(axis=1)
+        choices = np.where(n_marked == 1, marked.argmax(axis=1), choices)
+        choices = np.where(n_marked > 1, INVALID, choices).astype(np.int16)
+    return copy_number, choices
+
+
+def read_sheets(
+    file_paths: Iterable[Path],
+    layout: SheetLayout,
+    threshold: float = 0.5,
+    max_workers: Optional[int] = None,
+) -> Responses:
+    """Read scanned answer sheets in parallel, on a thread pool: the
+    student of each sheet is its file name without suffix.
+    """
+    file_paths = list(file_paths)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        sheets = list(
+            executor.map(
+                lambda file_path: read_sheet(file_path, layout, threshold), file_paths
+            )
+        )
+    copies = np.array([copy_number for copy_number, _1 in sheets], np.int64)
+    choices = np.array([choices for _1, choices in sheets], np.int16).reshape(
+        len(sheets), layout.n_questions
+    )
+    return Responses([file_path.stem for file_path in file_paths], copies, choices)
+
+
+def read_folder(
+    folder: Path,
+    layout: SheetLayout,
+    threshold: float = 0.5,
+    max_workers: Optional[int] = None,
+) -> Responses:
+    """Read every png or jpeg scan in folder, in name order.
+    """
+    file_paths = sorted(
+        file_path
+        for file_path in folder.iterdir()
+        if file_path.suffix.lower() in SCAN_SUFFIXES
+    )
+    return read_sheets(file_paths, layout, threshold, max_workers)
@@ -1,6 +1,25 @@
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial, lru_cache
+from io import BytesIO
+from itertools import islice
 from pathlib import Path
 import logging
-from typing import List, Union, Any
+import os
+import threading
+from typing import (
+    List,
+    Union,
+    Any,
+    Optional,
+    Tuple,
+    BinaryIO,
+    Iterable,
+    Sequence,
+    Deque,
+    Dict,
+    Iterator,
+)
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import (
     SimpleDocTemplate,
@@ -10,13 +29,29 @@ from reportlab.platypus import (
     ListItem,
     Spacer,
     KeepTogether,
+    Table,
+    TableStyle,
 )
+from reportlab.platypus.doctemplate import ActionFlowable
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.lib import utils
+from reportlab.lib.units import mm, inch
+from reportlab.lib import utils, colors
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing
+
+from .metrics import Metrics, NO_METRICS
+from .sheet import SheetLayout
+from .utility import Item
 
 NON_BREAK_SP = "<div>&nbsp;</div>"
+# QR codes are this size at least, larger if their modules would be
+# smaller than QR_MODULE_SIZE; the top margin grows to hold them, with
+# QR_CODE_GAP above and below
+QR_CODE_SIZE = 20 * mm
+QR_MODULE_SIZE = 0.4 * mm
+QR_CODE_GAP = 2.5 * mm
 
 
 class Style:
@@ -36,26 +71,226 @@ class Style:
         return self._style_sheet["Title"]
 
 
+@lru_cache(maxsize=256)
+def _cached_style(options: Tuple[Tuple[str, Any], ...]) -> Style:
+    return Style(**dict(options))
+
+
+def cached_style(**kwargs: Any) -> Style:
+    """Style with the given options, built once per process: building
+    the sample style sheet is slow, and styles are never changed once
+    built.
+    """
+    try:
+        return _cached_style(tuple(sorted(kwargs.items())))
+    except TypeError:  # unhashable option
+        return Style(**kwargs)
+
+
+def qr_code_widget(text: str) -> QrCodeWidget:
+    """QR code of text, barWidth wide and high: QR_CODE_SIZE, or more if
+    the modules, with the border, would be narrower than QR_MODULE_SIZE.
+    """
+    widget = QrCodeWidget(text)
+    widget.qr.make()
+    modules = widget.qr.getModuleCount() + 2 * widget.barBorder
+    widget.barWidth = widget.barHeight = max(QR_CODE_SIZE, modules * QR_MODULE_SIZE)
+    return widget
+
+
+class _DecodedImageReader(utils.ImageReader):
+    """ImageReader decoded once, then shared by documents and threads:
+    every read of a JPEG stream gets a stream of its own. nbytes is the
+    memory it holds: the file and its decoded pixels.
+    """
+
+    def __init__(self, file_name: str):
+        super().__init__(file_name)
+        self.nbytes = len(self.getRGBData()) + len(self.fp.getvalue())
+        if self._dataA is not None:
+            self.nbytes += len(self._dataA.getRGBData())
+
+    def _jpeg_fh(self) -> BytesIO:
+        return BytesIO(self.fp.getvalue())
+
+
+class _DecodedImage(Image):
+    """Image flowable of an image already decoded: laying it out and
+    drawing it read no file.
+    """
+
+    def __init__(self, reader: _DecodedImageReader, width: float, height: float):
+        self._img = reader
+        super().__init__(reader.fp, width=width, height=height)
+
+
+# image file name and modification time: its decoding, done or running,
+# least recently used first, the bytes of the ones done, and how many
+# prefetchers wait for layout to take each one
+ImageKey = Tuple[str, int]
+_images: "OrderedDict[ImageKey, Future]" = OrderedDict()
+_images_nbytes: Dict[ImageKey, int] = {}
+_images_pinned: Counter = Counter()
+_images_lock = threading.RLock()
+IMAGES_CACHED_BYTES = 256 * 1024 * 1024
+# images read ahead of layout
+PREFETCH_WINDOW = 16
+_PREFETCH_WORKERS = 4
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _forget_prefetch() -> None:
+    # a forked child has neither the threads nor their running decodings
+    global _prefetch_executor, _images_lock
+    _prefetch_executor = None
+    _images_lock = threading.RLock()
+    _images_pinned.clear()
+    for key in [key for key, future in _images.items() if not future.done()]:
+        del _images[key]
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_prefetch)
+
+
+def _image_key(file_name: Path) -> ImageKey:
+    return str(file_name), file_name.stat().st_mtime_ns
+
+
+def _image_future(key: ImageKey, prefetch: bool = False) -> Future:
+    """The decoding of the image of key: started on the prefetch thread
+    pool if prefetch, else done now, unless it is already done or running.
+    """
+    global _prefetch_executor
+    with _images_lock:
+        future = _images.get(key)
+        if future is not None:
+            _images.move_to_end(key)
+            return future
+        if prefetch:
+            if _prefetch_executor is None:
+                _prefetch_executor = ThreadPoolExecutor(
+                    _PREFETCH_WORKERS, thread_name_prefix="exam2pdf-image"
+                )
+            future = _prefetch_executor.submit(_DecodedImageReader, key[0])
+        else:
+            future = Future()
+        _images[key] = future
+        future.add_done_callback(partial(_image_done, key))
+    if not prefetch:
+        try:
+            reader = _DecodedImageReader(key[0])
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        future.set_result(reader)
+    return future
+
+
+def _image_done(key: ImageKey, future: Future) -> None:
+    """Count the bytes of a decoding done, or drop it if it failed: the
+    next layout tries again.
+    """
+    with _images_lock:
+        if _images.get(key) is not future:
+            return
+        if future.exception() is not None:
+            del _images[key]
+            return
+        _images_nbytes[key] = future.result().nbytes
+        _evict()
+
+
+def _evict() -> None:
+    """Drop the least recently used decodings until the cache fits
+    IMAGES_CACHED_BYTES: those still running, or prefetched and not laid
+    out yet, are kept.
+    """
+    total = sum(_images_nbytes.values())
+    for key in list(_images):
+        if total <= IMAGES_CACHED_BYTES:
+            break
+        if key in _images_nbytes and not _images_pinned[key]:
+            del _images[key]
+            total -= _images_nbytes.pop(key)
+
+
+def _prefetch(file_name: Path) -> Optional[ImageKey]:
+    """Start decoding file_name, kept in the cache until unpinned: its
+    key, None if no image or no file.
+    """
+    if file_name == Path("."):
+        return None
+    try:
+        key = _image_key(file_name)
+    except OSError:
+        return None  # reported when laid out
+    with _images_lock:
+        _image_future(key, prefetch=True)
+        _images_pinned[key] += 1
+    return key
+
+
+def _unpin(key: Optional[ImageKey]) -> None:
+    if key is None:
+        return
+    with _images_lock:
+        _images_pinned[key] -= 1
+        if not _images_pinned[key]:
+            del _images_pinned[key]
+            _evict()
+
+
+def prefetched(
+    items: Iterable[Item], window: int = PREFETCH_WINDOW
+) -> Iterator[Item]:
+    """Items, in order, while the images of the next window of them are
+    read and decoded on a thread pool, so that layout finds them decoded.
+    Images read ahead stay cached until laid out: the cache may exceed
+    IMAGES_CACHED_BYTES by a window of images.
+    """
+    ahead: Deque[Tuple[Item, Optional[ImageKey]]] = deque()
+    try:
+        for item in items:
+            ahead.append((item, _prefetch(item.image)))
+            if len(ahead) > window:
+                yield ahead[0][0]
+                _unpin(ahead.popleft()[1])
+        while ahead:
+            yield ahead[0][0]
+            _unpin(ahead.popleft()[1])
+    finally:
+        for _item, key in ahead:
+            _unpin(key)
+
+
 def get_std_aspect_image(file_name: Path, width: int = 50 * mm) -> Image:
-    """Return Image with original aspect and given width.
+    """Return Image with original aspect and given width. Each image is
+    read and decoded once, until the file changes or is dropped from the
+    cache, unless prefetched (see prefetched).
     """
     try:
-        image_reader = utils.ImageReader(str(file_name))
+        reader = _image_future(_image_key(file_name)).result()
     except OSError:
         logging.critical("OS Error reading %s", file_name)
         raise
+    orig_width, orig_height = reader.getSize()
 
-    orig_width, orig_height = image_reader.getSize()
     aspect = orig_height / float(orig_width)
 
-    return Image(str(file_name), width=width, height=(width * aspect))
+    return _DecodedImage(reader, width=width, height=(width * aspect))
 
 
 class PDFDoc:
-    """PDF Document builder. Mainly designed for ordered/unordered lists."""
+    """PDF Document builder. Mainly designed for ordered/unordered lists.
+    The document is saved in output_file, either a file path or a writable
+    binary stream.
+    """
 
-    def __init__(self, output_file: Path, **kwargs):
-        self._file_name: str = str(output_file)
+    def __init__(self, output_file: Union[Path, BinaryIO], **kwargs):
+        self._file_name: Union[str, BinaryIO] = (
+            str(output_file) if isinstance(output_file, Path) else output_file
+        )
         self._doc: List[ListFlowable, ...] = []
         self._in_progress_item: List[Union[ListFlowable, ListItem]] = []
         self._top_item_start: int = 1
@@ -76,12 +311,25 @@ class PDFDoc:
         self._sub_item_style = kwargs.get(
             "sub_item_style", {"leftIndent": 5, "fontName": "Helvetica"}
         )
+        self._duplex: bool = kwargs.get("duplex", False)
+        self._copy_number: int = 0
+        self._pending_outline: Optional[Tuple[str, str]] = None
+        self._qr_code: Optional[str] = kwargs.get("qr_code")
+        # QR code data: widget, of every copy
+        self._qr_code_widgets: Dict[str, QrCodeWidget] = {}
+        if self._qr_code is not None:
+            self._add_qr_code(self._qr_code)
+        self._metrics: Metrics = kwargs.get("metrics", NO_METRICS)
+        self._page_counts: Counter = Counter()
+        # fixed creation date and a document ID hashed from the content:
+        # same input, same bytes
+        self._invariant: bool = kwargs.get("invariant", False)
 
     @property
     def separator(self):
         """question_set separator.
         """
-        style = Style()
+        style = cached_style()
         return ListFlowable(
             [Paragraph(self._text_separator, style.title)],
             bulletType="bullet",
@@ -115,10 +363,127 @@ class PDFDoc:
             ListItem(item_list, bulletType=self._sub_item_bullet_type, value=value)
         )
 
+    def new_copy(self, heading: str, qr_code: Optional[str] = None) -> None:
+        """Start a new copy in the same document: the copy begins on a
+        fresh page (an odd one if duplex), has its own heading, page
+        counter, bookmark and QR code, if any, and top items are numbered
+        from the start.
+        """
+        if len(self._in_progress_item) != 0:
+            self._build_in_progress_item()
+            self._in_progress_item = []
+        self._top_item_start = 1
+        if qr_code is not None:
+            self._add_qr_code(qr_code)
+        if self._copy_number == 0:
+            self._start_copy(heading, qr_code)
+        else:
+            self._doc.append(_CopyStart(self, heading, qr_code))
+
+    def _add_qr_code(self, qr_code: str) -> None:
+        if qr_code not in self._qr_code_widgets:
+            self._qr_code_widgets[qr_code] = qr_code_widget(qr_code)
+
+    def _start_copy(self, heading: str, qr_code: Optional[str] = None) -> None:
+        self._copy_number += 1
+        self._1st_page_header_text = heading
+        self._later_pages_header_text = heading
+        self._qr_code = qr_code
+        self._pending_outline = (f"copy{self._copy_number}", heading)
+
+    def _mark_page(self, actual_canvas) -> None:
+        """Tell NumberedCanvas which copy the page belongs to and
+        whether the copy starts here.
+        """
+        actual_canvas.page_group = self._copy_number
+        actual_canvas.outline_entry = self._pending_outline
+        self._pending_outline = None
+        self._page_counts[self._copy_number] += 1
+
+    @property
+    def page_counts(self) -> Tuple[int, ...]:
+        """Pages of each copy, once built.
+        """
+        return tuple(self._page_counts[key] for key in sorted(self._page_counts))
+
+    def _draw_qr_code(self, actual_canvas, doc) -> None:
+        """Stamp the QR code of the copy in the top right corner, centered
+        in the top margin. The barcode is drawn once per copy in a form,
+        then every page just refers to it.
+        """
+        if self._qr_code is None:
+            return
+        form_name = f"qr{self._copy_number}"
+        widget = self._qr_code_widgets[self._qr_code]
+        size = widget.barWidth
+        if not actual_canvas.hasForm(form_name):
+            drawing = Drawing(size, size)
+            drawing.add(widget)
+            actual_canvas.beginForm(
+                form_name, lowerx=0, lowery=0, upperx=size, uppery=size
+            )
+            renderPDF.draw(drawing, actual_canvas, 0, 0)
+            actual_canvas.endForm()
+        actual_canvas.saveState()
+        actual_canvas.translate(
+            doc.leftMargin + doc.width - size,
+            doc.bottomMargin + doc.height + (doc.topMargin - size) / 2,
+        )
+        actual_canvas.doForm(form_name)
+        actual_canvas.restoreState()
+
+    def add_table(
+        self,
+        header: Sequence[str],
+        rows: Iterable[Sequence[str]],
+        chunk_rows: int = 50,
+        chunk_columns: int = 20,
+    ) -> None:
+        """Extend _doc with a dense table: the first column of header and
+        rows is a label, repeated in every table. Rows are consumed chunk
+        by chunk, chunk_rows at a time, and split in bands of chunk_columns
+        columns, so that every table has fixed size and is quickly laid out.
+        """
+        label_width = 15 * mm
+        column_width = (A4[0] - 2 * inch - label_width) / chunk_columns
+        row_height = 3.5 * mm
+        style = TableStyle(
+            [
+                ("FONT", (0, 0), (-1, -1), "Helvetica", 7),
+                ("FONT", (0, 0), (-1, 0), "Helvetica-Bold", 7),
+                ("FONT", (0, 0), (0, -1), "Helvetica-Bold", 7),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+                ("TOPPADDING", (0, 0), (-1, -1), 0),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
+            ]
+        )
+        rows_iterator = iter(rows)
+        chunk = list(islice(rows_iterator, chunk_rows))
+        while chunk:
+            for start in range(1, len(header), chunk_columns):
+                stop = start + chunk_columns
+                data = [[header[0], *header[start:stop]]]
+                data.extend([row[0], *row[start:stop]] for row in chunk)
+                n_columns = len(data[0]) - 1
+                self._doc.append(
+                    Table(
+                        data,
+                        colWidths=[label_width] + [column_width] * n_columns,
+                        rowHeights=row_height,
+                        style=style,
+                        hAlign="LEFT",
+                    )
+                )
+                self._doc.append(Spacer(1, self._space_text_image))
+            chunk = list(islice(rows_iterator, chunk_rows))
+
     def _build_item(self, item, **style_options: Any) -> ListFlowable:
         """Build an item container.
         """
-        style = Style(spaceAfter=self._space_text_image, **style_options)
+        style = cached_style(spaceAfter=self._space_text_image, **style_options)
         space = Spacer(1, self._space_after_item)
         if item.image != Path("."):
             image = get_std_aspect_image(item.image, width=80)
@@ -133,26 +498,39 @@ class PDFDoc:
         if len(self._in_progress_item) != 0:
             self._build_in_progress_item()
 
+        # large QR codes would cover the heading, and the first question
+        top_margin = max(
+            [inch]
+            + [
+                widget.barWidth + 2 * QR_CODE_GAP
+                for widget in self._qr_code_widgets.values()
+            ]
+        )
         doc = SimpleDocTemplate(
             self._file_name,
             pagesize=A4,
+            topMargin=top_margin,
             allowSplitting=1,
             author=self._author,
             title=self._title,
             subject=self._subject,
+            invariant=self._invariant,
         )
 
-        doc.build(
-            self._doc,
-            onFirstPage=self._first_page_head,
-            onLaterPages=self._later_page_head,
-            canvasmaker=NumberedCanvas,
-        )
+        with self._metrics.stage("layout"):
+            doc.build(
+                self._doc,
+                onFirstPage=self._first_page_head,
+                onLaterPages=self._later_page_head,
+                canvasmaker=partial(NumberedCanvas, metrics=self._metrics),
+            )
 
     def _first_page_head(self, actual_canvas, doc):
+        self._mark_page(actual_canvas)
+        self._draw_qr_code(actual_canvas, doc)
         # Save the state of our canvas so we can draw on it
         actual_canvas.saveState()
-        style = Style()
+        style = cached_style()
 
         # Header
         header = Paragraph(self._1st_page_header_text, style.normal)
@@ -172,9 +550,11 @@ class PDFDoc:
         actual_canvas.restoreState()
 
     def _later_page_head(self, actual_canvas, doc):
+        self._mark_page(actual_canvas)
+        self._draw_qr_code(actual_canvas, doc)
         # Save the state of our canvas so we can draw on it
         actual_canvas.saveState()
-        style = Style()
+        style = cached_style()
 
         # Header
         header = Paragraph(self._later_pages_header_text, style.normal)
@@ -194,29 +574,164 @@ class PDFDoc:
         actual_canvas.restoreState()
 
 
+class AnswerSheetDoc:
+    """Optical answer sheets, one page for each copy, drawn straight on
+    the canvas: what is common to every sheet (registration marks,
+    bubbles, labels) is drawn once in a form, each page adds only the
+    heading and the copy number.
+    """
+
+    _template_name = "sheet"
+
+    def __init__(
+        self, output_file: Union[Path, BinaryIO], layout: SheetLayout, **kwargs
+    ):
+        self._file_name: Union[str, BinaryIO] = (
+            str(output_file) if isinstance(output_file, Path) else output_file
+        )
+        self._layout = layout
+        self._sheets: List[Tuple[str, int]] = []
+        self._author = kwargs.get("author", "")
+        self._title = kwargs.get("title", "")
+        self._subject = kwargs.get("subject", "")
+        self._name_text = kwargs.get("name_text", "Name")
+        self._copy_text = kwargs.get("copy_text", "Copy")
+        self._metrics: Metrics = kwargs.get("metrics", NO_METRICS)
+        self._invariant: bool = kwargs.get("invariant", False)
+
+    @property
+    def page_counts(self) -> Tuple[int, ...]:
+        return (1,) * len(self._sheets)
+
+    def add_sheet(self, heading: str, copy_number: int) -> None:
+        self._layout.copy_digits(copy_number)  # fail early if it does not fit
+        self._sheets.append((heading, copy_number))
+
+    def build(self):
+        """Save the sheets in a file.
+        """
+        with self._metrics.stage("layout"):
+            layout = self._layout
+            actual_canvas = canvas.Canvas(
+                self._file_name, pagesize=layout.page_size, invariant=self._invariant
+            )
+            actual_canvas.setAuthor(self._author)
+            actual_canvas.setTitle(self._title)
+            actual_canvas.setSubject(self._subject)
+            self._draw_template(actual_canvas)
+            for heading, copy_number in self._sheets:
+                actual_canvas.doForm(self._template_name)
+                actual_canvas.setFont("Helvetica-Bold", 11)
+                actual_canvas.drawString(*layout.heading_position, heading)
+                digits = layout.copy_digits(copy_number)
+                for bubbles, digit in zip(layout.id_bubbles, digits):
+                    x, y = bubbles[digit]
+                    actual_canvas.circle(x, y, layout.bubble_radius, stroke=0, fill=1)
+                actual_canvas.showPage()
+            with self._metrics.stage("canvas_save"):
+                actual_canvas.save()
+
+    def _draw_template(self, actual_canvas) -> None:
+        layout = self._layout
+        width, height = layout.page_size
+        radius = layout.bubble_radius
+        actual_canvas.beginForm(
+            self._template_name, lowerx=0, lowery=0, upperx=width, uppery=height
+        )
+        for x, y in layout.marks:
+            half = layout.mark_size / 2
+            actual_canvas.rect(
+                x - half, y - half, layout.mark_size, layout.mark_size, fill=1
+            )
+
+        actual_canvas.setFont("Helvetica", 10)
+        x, y = layout.name_position
+        actual_canvas.drawString(x, y, self._name_text)
+        actual_canvas.line(x + 15 * mm, y, width - layout.margin, y)
+        x, y = layout.id_label_position
+        actual_canvas.drawString(x, y - 3, self._copy_text)
+
+        actual_canvas.setLineWidth(0.5)
+        actual_canvas.setFont("Helvetica", 6)
+        for bubbles in layout.id_bubbles:
+            for value, (x, y) in enumerate(bubbles):
+                actual_canvas.circle(x, y, radius)
+                actual_canvas.drawCentredString(x, y - 2, str(value))
+        actual_canvas.setFont("Helvetica-Bold", 8)
+        for number, (x, y) in enumerate(layout.label_positions, 1):
+            actual_canvas.drawString(x, y - 3, f"{number}.")
+        actual_canvas.setFont("Helvetica", 6)
+        for bubbles in layout.question_bubbles:
+            for option, (x, y) in enumerate(bubbles):
+                actual_canvas.circle(x, y, radius)
+                actual_canvas.drawCentredString(x, y - 2, chr(ord("A") + option))
+        actual_canvas.endForm()
+
+
+class _CopyStart(ActionFlowable):
+    """Never drawn: break the page and switch PDFDoc to the next copy.
+    """
+
+    def __init__(self, pdf_doc: PDFDoc, heading: str, qr_code: Optional[str]):
+        super().__init__()
+        self._pdf_doc = pdf_doc
+        self._heading = heading
+        self._qr_code = qr_code
+
+    def apply(self, doc):
+        doc.handle_pageBreak()
+        if self._pdf_doc._duplex and doc.page % 2:
+            # blank back page, still belonging to the previous copy
+            doc.clean_hanging()
+            doc.handle_pageBreak()
+        self._pdf_doc._start_copy(self._heading, self._qr_code)
+
+
 class NumberedCanvas(canvas.Canvas):
-    """Add page info to each page (page x of y)"""
+    """Add page info to each page (page x of y). Pages are counted
+    within their page_group, so that every copy in a merged document
+    has its own counter; outline_entry bookmarks the page.
+    """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, metrics: Metrics = NO_METRICS, **kwargs):
         canvas.Canvas.__init__(self, *args, **kwargs)
+        self._metrics = metrics
         self._saved_page_states = []
         self._text = "Pag. %d di %d"
+        self.page_group: int = 0
+        self.outline_entry: Optional[Tuple[str, str]] = None
 
     def showPage(self):
         self._saved_page_states.append(dict(self.__dict__))
         self._startPage()
 
     def save(self):
-        num_pages = len(self._saved_page_states)
+        with self._metrics.stage("canvas_save"):
+            self._save_numbered()
+
+    def _save_numbered(self):
+        group_pages = Counter(
+            state["page_group"] for state in self._saved_page_states
+        )
+        page_numbers: Counter = Counter()
+        has_outline = False
         for state in self._saved_page_states:
             self.__dict__.update(state)
-            self.draw_page_number(num_pages)
+            page_numbers[self.page_group] += 1
+            self.draw_page_number(
+                page_numbers[self.page_group], group_pages[self.page_group]
+            )
+            if self.outline_entry is not None:
+                key, title = self.outline_entry
+                self.bookmarkPage(key)
+                self.addOutlineEntry(title, key, level=0)
+                has_outline = True
             canvas.Canvas.showPage(self)
+        if has_outline:
+            self.showOutline()
         canvas.Canvas.save(self)
 
-    def draw_page_number(self, page_count):
+    def draw_page_number(self, page_number, page_count):
         w, h = A4
         self.setFont("Helvetica", 9)
-        self.drawCentredString(
-            w / 2, 20 * mm, self._text % (self._pageNumber, page_count)
-        )
+        self.drawCentredString(w / 2, 20 * mm, self._text % (page_number, page_count))
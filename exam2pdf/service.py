@@ -0,0 +1,238 @@
+"""exam2pdf render service: a local HTTP daemon printing exams on request.
+
+    python -m exam2pdf.service --root banks --port 8765 --workers 4
+
+POST /render with a json exam, as in a manifest (see exam2pdf.cli),
+bank relative to root: the answer is the pdf, or a zip if more than one
+file is printed. GET /metrics: requests, errors, latency and throughput.
+GET /health: ok.
+Workers are processes that live as long as the service: banks, styles,
+fonts and image sizes, once loaded, stay warm for the next requests.
+"""
+
+import argparse
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+import json
+import multiprocessing
+from pathlib import Path
+import threading
+from time import perf_counter
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .cli import load_bank, make_job
+from .export import MemorySink, ZipSink
+from .utility import Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+# Exam.print arguments writing in the file system of the service
+EXCLUDED_OPTIONS = {
+    "destination",
+    "answer_key_file",
+    "build_report",
+    "build_cache",
+    "journal",
+    "archive",
+}
+
+
+def render(exam: Dict[str, Any], root: Path) -> Tuple[str, bytes, int]:
+    """Print exam, a manifest exam with bank relative to root, in
+    memory: content type, content and number of files.
+
+    Raises:
+        Exam2pdfException: if exam is invalid, or its bank is not in root.
+    """
+    excluded = EXCLUDED_OPTIONS & set(exam)
+    if excluded:
+        message = _("not allowed in a service request: ") + ", ".join(sorted(excluded))
+        raise Exam2pdfException(message)
+    job = make_job(exam, root)
+    # absolute paths, "..", and links leading out of root are refused
+    bank = Path(job["bank"][0]).resolve()
+    if root.resolve() not in bank.parents:
+        message = _("bank outside the service root: ") + exam["bank"]
+        raise Exam2pdfException(message)
+    options = dict(job["options"], sink=MemorySink())
+    del options["destination"]
+    load_bank(job["bank"]).print(**options)
+    files = options["sink"].files
+    if len(files) == 1:
+        return "application/pdf", next(iter(files.values())), 1
+    buffer = BytesIO()
+    with ZipSink(buffer, invariant=exam.get("invariant", False)) as archive:
+        for name, data in files.items():
+            archive.write(name, data)
+    return "application/zip", buffer.getvalue(), len(files)
+
+
+class ServiceMetrics:
+    """Requests served, errors, and latency of the last requests.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+        self._start = perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.files = 0
+        self.in_flight = 0
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, seconds: float, files: int = 0, error: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += error
+            self.files += files
+            self._latencies.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uptime = perf_counter() - self._start
+            snapshot = {
+                "uptime": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "files": self.files,
+                "requests_per_second": self.requests / uptime,
+                "files_per_second": self.files / uptime,
+            }
+        if latencies:
+            snapshot["latency"] = {
+                "mean": sum(latencies) / len(latencies),
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "p99": _percentile(latencies, 0.99),
+                "max": latencies[-1],
+            }
+        return snapshot
+
+
+def _percentile(values: Sequence[float], fraction: float) -> float:
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class RenderService(ThreadingHTTPServer):
+    """HTTP server handing renders to executor, a pool of processes or
+    threads.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], root: Path, executor: Executor):
+        super().__init__(address, _Handler)
+        self.root = root
+        self.executor = executor
+        self.metrics = ServiceMetrics()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: RenderService
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, "text/plain", b"ok")
+        elif self.path == "/metrics":
+            body = json.dumps(self.server.metrics.snapshot()).encode()
+            self._send(200, "application/json", body)
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def do_POST(self):
+        if self.path != "/render":
+            self._send(404, "text/plain", b"not found")
+            return
+        metrics = self.server.metrics
+        metrics.begin()
+        start = perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            exam = json.loads(self.rfile.read(length))
+            future = self.server.executor.submit(render, exam, self.server.root)
+            content_type, body, files = future.result()
+        except (Exam2pdfException, ValueError, TypeError) as error:
+            metrics.end(perf_counter() - start, error=True)
+            self._send(400, "text/plain", str(error).encode())
+            return
+        except Exception as error:
+            metrics.end(perf_counter() - start, error=True)
+            self._send(500, "text/plain", str(error).encode())
+            return
+        metrics.end(perf_counter() - start, files)
+        self._send(200, content_type, body)
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # metrics tell more
+
+
+def make_executor(workers: int, threads: bool = False) -> Executor:
+    """A pool of workers processes, forked where possible, or threads.
+    """
+    if threads:
+        return ThreadPoolExecutor(workers)
+    if "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("fork")
+        )
+    return ProcessPoolExecutor(workers)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="exam2pdf-service",
+        description=__doc__.splitlines()[0],
+        epilog=__doc__.split("\n", 2)[2],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--root", type=Path, default=Path("."), help="bank folder")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--threads", action="store_true", help="threads, not processes")
+    parser.add_argument(
+        "--preload",
+        nargs="*",
+        default=(),
+        type=Path,
+        help="exams (json) loaded at start",
+    )
+    arguments = parser.parse_args(argv)
+
+    for file_path in arguments.preload:
+        # parsed before workers are forked, so that all of them share it
+        job = make_job(json.loads(file_path.read_text()), arguments.root)
+        load_bank(job["bank"])
+    with make_executor(arguments.workers, arguments.threads) as executor:
+        # workers are started now, before the server has threads to fork
+        executor.submit(int).result()
+        server = RenderService(
+            (arguments.host, arguments.port), arguments.root, executor
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
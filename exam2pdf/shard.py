@@ -0,0 +1,342 @@
+"""exam2pdf sharded print: the copies of one exam printed in slices by
+workers, processes or hosts, sharing a queue folder; no broker is needed.
+
+    python -m exam2pdf.shard submit queue exam.json --shards 100
+    python -m exam2pdf.shard work queue       # on any host, as many as wanted
+    python -m exam2pdf.shard merge queue
+
+exam.json is an exam as in a manifest (see exam2pdf.cli), with paths
+relative to the queue folder. submit splits its copies in shards, one
+file each in queue/todo, and saves the exam and its shards in
+queue/job.json. A worker claims a shard by moving its file to
+queue/claimed, an atomic rename only one worker wins, prints its copies
+in destination, saves their answer keys, a slice of the plan, in
+queue/keys, then moves the shard file to queue/done; a shard that fails
+goes to queue/failed with its error. merge joins the slices in
+queue/plan.jsonl and prints the correction and the answer key file.
+Without a seed the copies are still consistent: the correction is made of
+the keys the workers saved. run does it all with local worker processes:
+
+    python -m exam2pdf.shard run queue exam.json --shards 100 --workers 8
+
+Shards left claimed by a worker that stopped go back to todo with requeue,
+when no worker is running them.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import socket
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .cli import load_bank, make_job
+from .plan import Plan, load_plan, merge_plans, save_plan
+from .utility import Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+JOB_FILE = "job.json"
+PLAN_FILE = "plan.jsonl"
+TODO, CLAIMED, DONE, FAILED, KEYS = "todo", "claimed", "done", "failed", "keys"
+
+# manifest keys that cannot be printed in slices, by many workers
+EXCLUDED_OPTIONS = {
+    "merge",
+    "archive",
+    "answer_sheet_file",
+    "build_report",
+    "build_cache",
+    "journal",
+}
+# Exam.print arguments used by merge only
+CORRECTION_OPTIONS = {"correction_file_name", "answer_key_file", "correction_layout"}
+
+
+def shard_ranges(n_copies: int, shards: int) -> List[range]:
+    """Copy numbers of each shard: consecutive, sizes differing by one
+    at most.
+    """
+    shards = max(1, min(shards, n_copies))
+    size, extra = divmod(n_copies, shards)
+    ranges = []
+    start = 1
+    for index in range(shards):
+        stop = start + size + (1 if index < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+    return ranges
+
+
+def submit(queue: Path, exam: Dict[str, Any], shards: int) -> int:
+    """Queue the shards of exam in queue, and return their number. Shards
+    already queued, claimed, done or failed are not queued again:
+    submitting the same exam twice is harmless.
+
+    Raises:
+        Exam2pdfException: if exam cannot be printed in slices, or queue
+            holds a different exam, or the same one in other shards.
+    """
+    excluded = EXCLUDED_OPTIONS & set(exam)
+    if excluded:
+        message = _("not allowed in a sharded print: ") + ", ".join(sorted(excluded))
+        raise Exam2pdfException(message)
+    make_job(exam, queue)  # raises on invalid exams before anything is queued
+
+    for folder in (TODO, CLAIMED, DONE, FAILED, KEYS):
+        (queue / folder).mkdir(parents=True, exist_ok=True)
+    ranges = shard_ranges(exam.get("n_copies", 1), shards)
+    # shards are known by name only: other ranges would print copies twice
+    job = {
+        "exam": exam,
+        "shards": [[copies.start, copies.stop] for copies in ranges],
+    }
+    job_file = queue / JOB_FILE
+    if job_file.exists():
+        queued = json.loads(job_file.read_text(encoding="utf-8"))
+        if queued["exam"] != exam:
+            message = _("queue of a different exam: ") + str(queue)
+            raise Exam2pdfException(message)
+        if queued["shards"] != job["shards"]:
+            message = _("queue of the same exam in {} shards: ").format(
+                len(queued["shards"])
+            )
+            raise Exam2pdfException(message + str(queue))
+    else:
+        _write_atomic(job_file, json.dumps(job, indent=2))
+
+    width = len(str(len(ranges)))
+    for index, copies in enumerate(ranges, 1):
+        name = f"{index:0{width}}.json"
+        if not any(
+            (queue / folder / name).exists() for folder in (TODO, CLAIMED, DONE, FAILED)
+        ):
+            shard = {"copies": [copies.start, copies.stop]}
+            _write_atomic(queue / TODO / name, json.dumps(shard))
+    return len(ranges)
+
+
+def _write_atomic(file_path: Path, text: str) -> None:
+    # readers on other hosts see the whole file or no file
+    temporary = file_path.with_name(f".{file_path.name}.tmp")
+    temporary.write_text(text, encoding="utf-8")
+    os.replace(temporary, file_path)
+
+
+def _load_exam(queue: Path) -> Dict[str, Any]:
+    return json.loads((queue / JOB_FILE).read_text(encoding="utf-8"))["exam"]
+
+
+def claim(queue: Path) -> Iterator[Path]:
+    """Claim the shards in queue/todo one at a time, yielding the path of
+    each claimed: shards claimed by other workers meanwhile are skipped.
+    """
+    while True:
+        names = sorted(path.name for path in (queue / TODO).glob("*.json"))
+        if not names:
+            return
+        for name in names:
+            try:
+                os.rename(queue / TODO / name, queue / CLAIMED / name)
+            except FileNotFoundError:
+                continue  # another worker won it
+            yield queue / CLAIMED / name
+            break
+
+
+def print_shard(queue: Path, exam: Dict[str, Any], copies: range) -> Plan:
+    """Print copies of exam, with paths relative to queue, as planned: the
+    plan of this slice is returned.
+    """
+    job = make_job(exam, queue)
+    options = {
+        key: value
+        for key, value in job["options"].items()
+        if key not in CORRECTION_OPTIONS
+    }
+    bank = load_bank(job["bank"])
+    plan = bank.plan(
+        options["exam_file_name"],
+        options.get("n_copies", 1),
+        options.get("seed"),
+        options.get("questions_shuffle", False),
+        options.get("answers_shuffle", False),
+        copies,
+    )
+    options["destination"].mkdir(parents=True, exist_ok=True)
+    bank.print(plan=plan, **options)
+    return plan
+
+
+def work(queue: Path, max_shards: Optional[int] = None) -> Tuple[int, int]:
+    """Print the shards of queue until none is left, or max_shards are
+    printed: the number of shards printed and failed.
+    """
+    exam = _load_exam(queue)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    printed = failed = 0
+    for shard_file in claim(queue):
+        shard = json.loads(shard_file.read_text(encoding="utf-8"))
+        shard["worker"] = worker
+        try:
+            plan = print_shard(queue, exam, range(*shard["copies"]))
+            keys_file = queue / KEYS / (shard_file.stem + ".jsonl")
+            temporary = keys_file.with_name(f".{keys_file.name}.tmp")
+            save_plan(plan, temporary)
+            os.replace(temporary, keys_file)
+        except Exception as error:
+            # one shard failing must not be left claimed, nor stop the worker
+            if isinstance(error, Exam2pdfException):
+                shard["error"] = str(error)
+            else:
+                shard["error"] = f"{type(error).__name__}: {error}"
+            _write_atomic(shard_file, json.dumps(shard))
+            os.replace(shard_file, queue / FAILED / shard_file.name)
+            failed += 1
+        else:
+            _write_atomic(shard_file, json.dumps(shard))
+            os.replace(shard_file, queue / DONE / shard_file.name)
+            printed += 1
+        if max_shards is not None and printed + failed >= max_shards:
+            break
+    return printed, failed
+
+
+def requeue(queue: Path, failed: bool = False) -> int:
+    """Move the shards claimed, and failed too if so, back to todo: the
+    number moved. Run it when no worker is printing them.
+    """
+    folders = (CLAIMED, FAILED) if failed else (CLAIMED,)
+    moved = 0
+    for folder in folders:
+        for shard_file in sorted((queue / folder).glob("*.json")):
+            os.replace(shard_file, queue / TODO / shard_file.name)
+            moved += 1
+    return moved
+
+
+def merge(queue: Path) -> Plan:
+    """Join the slices saved by the workers in queue/plan.jsonl, then
+    print the correction and answer key file of exam, if any: the whole
+    plan is returned.
+
+    Raises:
+        Exam2pdfException: if copies are missing, i.e. some shard is not
+            done.
+    """
+    exam = _load_exam(queue)
+    job = make_job(exam, queue)
+    options = job["options"]
+    plan = merge_plans(
+        load_plan(keys_file) for keys_file in sorted((queue / KEYS).glob("*.jsonl"))
+    )
+    missing = plan.n_copies - len(plan.keys)
+    if missing:
+        message = _("copies not printed yet: ") + str(missing)
+        raise Exam2pdfException(message)
+    save_plan(plan, queue / PLAN_FILE)
+
+    if "correction_file_name" in options or "answer_key_file" in options:
+        options["destination"].mkdir(parents=True, exist_ok=True)
+        load_bank(job["bank"]).print_correction(
+            plan,
+            options.get("correction_file_name"),
+            options["destination"],
+            heading=options.get("heading", ""),
+            footer=options.get("footer", ""),
+            correction_layout=options.get("correction_layout", "list"),
+            answer_key_file=options.get("answer_key_file"),
+            invariant=options.get("invariant", False),
+        )
+    return plan
+
+
+def run_local(queue: Path, workers: int) -> Tuple[int, int]:
+    """Print the shards of queue with workers local processes, standing
+    in for hosts: the number of shards printed and failed.
+    """
+    if workers <= 1:
+        return work(queue)
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        # parsed once, before the workers are forked
+        exam = _load_exam(queue)
+        try:
+            load_bank(make_job(exam, queue)["bank"])
+        except Exception:
+            pass  # reported by the shards
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(workers) as pool:
+        outcomes = pool.map(work, [queue] * workers)
+    return sum(printed for printed, _1 in outcomes), sum(
+        failed for _1, failed in outcomes
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="exam2pdf-shard",
+        description=__doc__.splitlines()[0],
+        epilog=__doc__.split("\n", 2)[2],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("submit", "run"):
+        command = commands.add_parser(name)
+        command.add_argument("queue", type=Path, help="shared queue folder")
+        command.add_argument("exam", type=Path, help="json exam")
+        command.add_argument("--shards", type=int, default=10)
+        if name == "run":
+            command.add_argument(
+                "--workers", type=int, default=multiprocessing.cpu_count()
+            )
+    work_command = commands.add_parser("work")
+    work_command.add_argument("queue", type=Path, help="shared queue folder")
+    work_command.add_argument("--max-shards", type=int, help="then stop")
+    requeue_command = commands.add_parser("requeue")
+    requeue_command.add_argument("queue", type=Path, help="shared queue folder")
+    requeue_command.add_argument(
+        "--failed", action="store_true", help="failed shards too"
+    )
+    merge_command = commands.add_parser("merge")
+    merge_command.add_argument("queue", type=Path, help="shared queue folder")
+    arguments = parser.parse_args(argv)
+
+    queue = arguments.queue
+    try:
+        if arguments.command in ("submit", "run"):
+            try:
+                exam = json.loads(arguments.exam.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError) as error:
+                message = _("invalid exam: ") + f"{arguments.exam}: {error}"
+                raise Exam2pdfException(message)
+            shards = submit(queue, exam, arguments.shards)
+            print(_("{} shards queued").format(shards), file=sys.stderr)
+        if arguments.command in ("work", "run"):
+            if arguments.command == "work":
+                printed, failed = work(queue, arguments.max_shards)
+            else:
+                printed, failed = run_local(queue, arguments.workers)
+            print(
+                _("{} shards printed, {} failed").format(printed, failed),
+                file=sys.stderr,
+            )
+            if failed:
+                return 1
+        if arguments.command == "requeue":
+            moved = requeue(queue, arguments.failed)
+            print(_("{} shards requeued").format(moved), file=sys.stderr)
+        if arguments.command in ("merge", "run"):
+            plan = merge(queue)
+            print(_("{} copies merged").format(len(plan.keys)), file=sys.stderr)
+    except Exam2pdfException as error:
+        print(error, file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
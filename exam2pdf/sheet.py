@@ -0,0 +1,98 @@
+from math import ceil
+from typing import Tuple
+
+from .utility import Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+MM = 72 / 25.4  # points
+A4_SIZE = (210 * MM, 297 * MM)
+
+Point = Tuple[float, float]
+
+
+class SheetLayout:
+    """Geometry of an optical answer sheet, in points from the bottom left
+    corner of the page, shared by the sheet generator and the reader.
+    Four registration marks sit in the corners, then, from the top:
+    heading, name line, copy number bubbles (one row of ten for each
+    digit) and question bubbles (one row for each question, in as many
+    columns as needed).
+    """
+
+    mark_size = 6 * MM
+    mark_margin = 10 * MM
+    margin = 25 * MM
+    pitch = 6 * MM
+    bubble_radius = 2.2 * MM
+    label_width = 10 * MM
+    column_gap = 5 * MM
+
+    def __init__(
+        self,
+        n_questions: int,
+        n_answers: int,
+        id_digits: int = 1,
+        page_size: Tuple[float, float] = A4_SIZE,
+    ):
+        self.n_questions = n_questions
+        self.n_answers = n_answers
+        self.id_digits = id_digits
+        self.page_size = page_size
+        width, height = page_size
+
+        offset = self.mark_margin + self.mark_size / 2
+        self.marks: Tuple[Point, ...] = (
+            (offset, height - offset),
+            (width - offset, height - offset),
+            (offset, offset),
+            (width - offset, offset),
+        )
+
+        top = height - self.margin
+        self.heading_position: Point = (self.margin, top - 4 * MM)
+        self.name_position: Point = (self.margin, top - 12 * MM)
+
+        id_top = top - 22 * MM
+        self.id_label_position: Point = (self.margin, id_top)
+        self.id_bubbles: Tuple[Tuple[Point, ...], ...] = tuple(
+            tuple(
+                (self.margin + self.label_width + value * self.pitch, y)
+                for value in range(10)
+            )
+            for y in (id_top - digit * self.pitch for digit in range(id_digits))
+        )
+
+        questions_top = id_top - (id_digits + 1) * self.pitch
+        self.rows_per_column = int((questions_top - self.margin) / self.pitch) + 1
+        column_width = self.label_width + n_answers * self.pitch + self.column_gap
+        n_columns = ceil(n_questions / self.rows_per_column)
+        used_width = n_columns * column_width - self.column_gap
+        if used_width > width - 2 * self.margin:
+            message = _("too many questions for an answer sheet: ") + str(n_questions)
+            raise Exam2pdfException(message)
+        label_positions = []
+        question_bubbles = []
+        for question in range(n_questions):
+            column, row = divmod(question, self.rows_per_column)
+            x = self.margin + column * column_width
+            y = questions_top - row * self.pitch
+            label_positions.append((x, y))
+            question_bubbles.append(
+                tuple(
+                    (x + self.label_width + option * self.pitch, y)
+                    for option in range(n_answers)
+                )
+            )
+        self.label_positions: Tuple[Point, ...] = tuple(label_positions)
+        self.question_bubbles: Tuple[Tuple[Point, ...], ...] = tuple(question_bubbles)
+
+    def copy_digits(self, copy_number: int) -> Tuple[int, ...]:
+        """Digits of copy_number, most significant first, as filled in the
+        copy number bubbles.
+        """
+        text = str(copy_number).zfill(self.id_digits)
+        if copy_number < 0 or len(text) > self.id_digits:
+            message = _("copy number does not fit the answer sheet: ")
+            raise Exam2pdfException(message + str(copy_number))
+        return tuple(int(digit) for digit in text)
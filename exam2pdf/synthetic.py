@@ -0,0 +1,157 @@
+"""Synthetic question banks, for scale and load testing."""
+
+import codecs
+from pathlib import Path
+import random
+from typing import List, Mapping, Tuple
+
+from .exam import Exam
+from .utility import Exam2pdfException, set_i18n
+
+_ = set_i18n().gettext
+
+QUESTION_TYPE = "Question type"
+ENCODINGS = ("utf_8", "utf_16", "cp1252", "iso8859_15")
+# number of answers of multiple choice questions: weight
+ANSWERS = {2: 1.0, 3: 2.0, 4: 4.0, 5: 2.0}
+
+_WORDS = (
+    "città perché così però più già giù è andato caffè virtù età lunedì "
+    "which what value energy force mass speed time cost 100 € unit law "
+    "the of a an is are be when where result system function"
+).split()
+_POOL_BITS = 12
+_CHUNK_ROWS = 10000
+
+
+def bank_fields(max_answers: int) -> Tuple[str, ...]:
+    """Data columns of a bank, the question type excluded: the
+    attribute_selector needed to load it.
+    """
+    fields = ["question", "subject", "image", "level"]
+    for number in range(max_answers):
+        letter = chr(ord("A") + number)
+        fields.extend((letter, letter + "i"))
+    return tuple(fields)
+
+
+def write_images(folder: Path, n_images: int, seed: int = 0) -> List[str]:
+    """Write n_images small png pictures of various sizes and colours in
+    folder; return their file names.
+    """
+    from PIL import Image
+
+    rng = random.Random(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    names = []
+    for number in range(n_images):
+        name = f"image{number}.png"
+        size = (rng.randint(60, 240), rng.randint(40, 180))
+        colour = tuple(rng.randrange(256) for _1 in range(3))
+        Image.new("RGB", size, colour).save(folder / name)
+        names.append(name)
+    return names
+
+
+def write_bank(
+    file_path: Path,
+    n_questions: int,
+    seed: int = 0,
+    true_false: float = 0.2,
+    answers: Mapping[int, float] = ANSWERS,
+    empty_answers: float = 0.05,
+    images: float = 0.0,
+    answer_images: float = 0.0,
+    n_images: int = 8,
+    encoding: str = "utf_8",
+) -> Path:
+    """Write a csv bank of n_questions, the same for the same arguments.
+    true_false is the share of TrueFalse questions, the others are
+    MultiChoice with a number of answers drawn from answers weights;
+    empty_answers is the share of them with an empty answer column
+    in the middle. images and answer_images are the share of questions
+    and answers with a picture, from n_images written in the images
+    folder next to file_path. Text has accented letters and the euro
+    sign, all in the given encoding.
+    Load it with load_bank.
+    """
+    if not answers or min(answers) < 1:
+        message = _("invalid number of answers: ") + str(list(answers))
+        raise Exam2pdfException(message)
+    rng = random.Random(seed)
+    random_value = rng.random
+    random_bits = rng.getrandbits
+    max_answers = max(max(answers), 2)
+
+    phrases = [
+        " ".join(rng.choices(_WORDS, k=rng.randint(3, 9)))
+        for _1 in range(1 << _POOL_BITS)
+    ]
+    image_names: List[str] = []
+    if (images > 0 or answer_images > 0) and n_images > 0:
+        image_folder = file_path.parent / "images"
+        image_names = [
+            f"{image_folder.name}/{name}"
+            for name in write_images(image_folder, n_images, seed)
+        ]
+
+    def pick_image(share: float) -> str:
+        if image_names and random_value() < share:
+            return image_names[int(random_value() * len(image_names))]
+        return ""
+
+    # Rows are made of pooled answer columns, drawn as the whole bank
+    # should be: no field has commas, quotes or new lines, so no quoting
+    # is needed and rows are just joined.
+    counts = rng.choices(
+        list(answers), weights=list(answers.values()), k=1 << _POOL_BITS
+    )
+    multi_choice_pool = []
+    for count in counts:
+        columns = []
+        for _1 in range(count):
+            columns.extend(
+                (phrases[random_bits(_POOL_BITS)], pick_image(answer_images))
+            )
+        if count < max_answers and random_value() < empty_answers:
+            middle = 2 * (1 + int(random_value() * (count - 1)))
+            columns[middle:middle] = ("", "")
+        columns.extend([""] * (2 * max_answers - len(columns)))
+        multi_choice_pool.append(",".join(columns))
+    padding = "," * (2 * max_answers - 4)
+    true_false_pool = ("1,,," + padding, ",,1," + padding)
+
+    header = (QUESTION_TYPE,) + bank_fields(max_answers)
+    with file_path.open("w", newline="", encoding=encoding) as bank_file:
+        bank_file.write(",".join(header) + "\r\n")
+        for start in range(0, n_questions, _CHUNK_ROWS):
+            lines = []
+            for number in range(start + 1, min(start + _CHUNK_ROWS, n_questions) + 1):
+                if random_value() < true_false:
+                    kind = "TrueFalse"
+                    columns = true_false_pool[random_bits(1)]
+                else:
+                    kind = "MultiChoice"
+                    columns = multi_choice_pool[random_bits(_POOL_BITS)]
+                lines.append(
+                    f"{kind},{number}. {phrases[random_bits(_POOL_BITS)]}?,"
+                    f"subject {number % 12},{pick_image(images)},{number % 5 + 1},"
+                    f"{columns}\r\n"
+                )
+            bank_file.write("".join(lines))
+    return file_path
+
+
+def load_bank(file_path: Path) -> Exam:
+    """Load a bank written by write_bank.
+    """
+    with file_path.open("rb") as bank_file:
+        first_line = bank_file.readline()
+    is_utf_16 = first_line.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE))
+    header = first_line.decode("utf_16" if is_utf_16 else "latin_1", "ignore")
+    exam = Exam()
+    exam.attribute_selector = (
+        field for field in header.strip().split(",") if field != QUESTION_TYPE
+    )
+    exam.from_csv(file_path)
+    return exam
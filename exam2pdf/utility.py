@@ -1,11 +1,15 @@
+from array import array
+import base64
 from collections import namedtuple
 from enum import Enum
+from functools import lru_cache
 import gettext
+import hashlib
 from pathlib import Path
-
-import chardet
+from typing import Tuple
 
 
+@lru_cache(maxsize=None)
 def set_i18n():
     # user application must use
     # gettext.bindtextdomain("exam2pdf", localedir=application_locales)
@@ -40,6 +44,14 @@ class ItemLevel(Enum):
 
 Item = namedtuple("Item", ["item_level", "text", "image"])
 
+# Compact answer key of a shuffled copy: order has the original index of
+# each question, answers the original index of each answer, question after
+# question, correct the index of the correct answer in the copy, -1 if none;
+# seed is the one the copy is shuffled with, None if global random is used.
+AnswerKey = namedtuple(
+    "AnswerKey", ["order", "answers", "correct", "seed"], defaults=(None,)
+)
+
 
 def safe_int(text: str) -> int:
     try:
@@ -48,6 +60,72 @@ def safe_int(text: str) -> int:
         return 0
 
 
+def copy_seed(seed: int, copy_number: int) -> int:
+    """Seed of the given copy of an exam printed with seed: any copy can
+    be shuffled again on its own.
+    """
+    digest = hashlib.sha256(f"{seed}/{copy_number}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+QR_PREFIX = "E2P"
+
+
+def encode_answer_key(copy_number: int, answer_key: AnswerKey) -> str:
+    """Compact text of the answer key of a copy, fit for a QR code:
+    prefix, copy number, seed (empty if None), then order, answers and
+    correct as url safe base64, separated by "|". Indexes are little
+    endian, order ones as wide as the largest needs: 1, 2 or 4 bytes.
+    """
+    seed = "" if answer_key.seed is None else str(answer_key.seed)
+    largest = max(answer_key.order, default=0)
+    width = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+    order = b"".join(index.to_bytes(width, "little") for index in answer_key.order)
+    arrays = (
+        base64.urlsafe_b64encode(values).decode("ascii")
+        for values in (
+            order,
+            array("B", answer_key.answers).tobytes(),
+            array("b", answer_key.correct).tobytes(),
+        )
+    )
+    return "|".join((QR_PREFIX, str(copy_number), seed, *arrays))
+
+
+def decode_answer_key(text: str) -> Tuple[int, AnswerKey]:
+    """Copy number and answer key from the text of encode_answer_key.
+
+    Raises:
+        Exam2pdfException: if text is not an encoded answer key.
+    """
+    fields = text.split("|")
+    if len(fields) != 6 or fields[0] != QR_PREFIX:
+        message = _("not an answer key: ") + text
+        raise Exam2pdfException(message)
+    try:
+        copy_number = int(fields[1])
+        seed = None if fields[2] == "" else int(fields[2])
+        order_bytes, answers_bytes, correct_bytes = (
+            base64.urlsafe_b64decode(field) for field in fields[3:]
+        )
+        answers, correct = array("B", answers_bytes), array("b", correct_bytes)
+        # one order index per question, as correct has
+        width = len(order_bytes) // len(correct) if correct else 1
+        if width not in (1, 2, 4) or len(order_bytes) != width * len(correct):
+            raise ValueError(width)
+        order = array(
+            "I",
+            (
+                int.from_bytes(order_bytes[start : start + width], "little")
+                for start in range(0, len(order_bytes), width)
+            ),
+        )
+    except ValueError:
+        message = _("not an answer key: ") + text
+        raise Exam2pdfException(message)
+    return copy_number, AnswerKey(order, answers, correct, seed)
+
+
 def guess_encoding(file_path: Path) -> str:
     """Try to guess file encoding.
 
@@ -61,6 +139,8 @@ def guess_encoding(file_path: Path) -> str:
         Exam2pdfException: if the given file is not found
         and if chardet.detect["encoding"] is None.
     """
+    import chardet  # slow to import, and needed only without an encoding
+
     try:
         result = chardet.detect(file_path.read_bytes())
     except FileNotFoundError:
@@ -14,5 +14,13 @@ setup(
    url="https://github.com/agossino/exam2pdf",
    version=exam2pdf.__version__,
    packages=find_packages(),
-   python_requires=">=3.6"
+   python_requires=">=3.6",
+   extras_require={"grading": ["numpy"]},
+   entry_points={
+        "console_scripts": [
+            "exam2pdf=exam2pdf.cli:main",
+            "exam2pdf-service=exam2pdf.service:main",
+            "exam2pdf-shard=exam2pdf.shard:main",
+        ]
+    },
 )
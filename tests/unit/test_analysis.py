@@ -0,0 +1,82 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import exam2pdf
+from exam2pdf.analysis import analyze, update_levels
+from exam2pdf.grading import BLANK, INVALID, Grades
+
+
+@pytest.fixture
+def grades():
+    """Four students, three original questions with two or three answers;
+    answer 0 is the correct one.
+    """
+    original_choices = np.array(
+        [[0, 0, 0], [0, 1, 0], [0, BLANK, 2], [1, INVALID, 0]], np.int16
+    )
+    right = original_choices == 0
+    blank = original_choices == BLANK
+    n_right = right.sum(axis=1)
+    return Grades(
+        ["s1", "s2", "s3", "s4"],
+        np.array([1, 2, 3, 4]),
+        n_right.astype(float),
+        n_right,
+        (~right & ~blank).sum(axis=1),
+        blank.sum(axis=1),
+        original_choices,
+        right,
+    )
+
+
+def test_analyze_difficulty(grades):
+    analysis = analyze(grades)
+
+    assert analysis.difficulty.tolist() == [0.75, 0.25, 0.75]
+
+
+def test_analyze_discrimination(grades):
+    """point-biserial against the rest score, as numpy corrcoef does"""
+    analysis = analyze(grades)
+
+    right = grades.right.astype(float)
+    for question in range(3):
+        rest = right.sum(axis=1) - right[:, question]
+        expected = np.corrcoef(right[:, question], rest)[0, 1]
+        assert analysis.discrimination[question] == pytest.approx(expected)
+
+
+def test_analyze_distractors(grades):
+    analysis = analyze(grades, n_answers=3)
+
+    assert analysis.distractors.tolist() == [[3, 1, 0], [1, 1, 0], [3, 0, 1]]
+    assert analysis.blank.tolist() == [0, 1, 0]
+    assert analysis.invalid.tolist() == [0, 1, 0]
+
+
+def test_analyze_constant_item(grades):
+    """GIVEN a question answered by all correctly
+    THEN discrimination is not defined
+    """
+    grades.right[:, 0] = True
+
+    analysis = analyze(grades)
+
+    assert np.isnan(analysis.discrimination[0])
+
+
+def test_update_levels(grades):
+    questions = []
+    for n in range(3):
+        question = exam2pdf.Question(f"q{n}")
+        question.answers = (exam2pdf.Answer("a"), exam2pdf.Answer("b"))
+        questions.append(question)
+    questions.append(exam2pdf.Question("no answer", level=3))
+    ex = exam2pdf.Exam(*questions)
+    analysis = analyze(grades)
+    analysis = analysis._replace(difficulty=np.append(analysis.difficulty, 0.0))
+
+    update_levels(ex, analysis, n_levels=4)
+
+    assert [question.level for question in ex.questions] == [2, 4, 2, 3]
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from exam2pdf.buildcache import BuildCache, content_hash
+from exam2pdf.metrics import Metrics
+from exam2pdf.synthetic import load_bank, write_bank
+from exam2pdf.utility import Exam2pdfException, Item, ItemLevel
+
+
+def test_content_hash_image(tmp_path):
+    """GIVEN items with an image
+    WHEN the image content changes
+    THEN the hash changes
+    """
+    image = tmp_path / "image.png"
+    image.write_bytes(b"first")
+    items = [Item(ItemLevel.top, "text", image)]
+    first = content_hash(items, "heading")
+
+    image.write_bytes(b"second image")
+
+    assert content_hash(items, "heading") != first
+    assert content_hash(items, "heading") == content_hash(items, "heading")
+    assert content_hash(items, "other heading") != content_hash(items, "heading")
+
+
+def test_build_cache_lookup(tmp_path):
+    """GIVEN a saved cache
+    THEN a file is up to date only if its hash is unchanged and it is
+    still there, with the same size
+    """
+    (tmp_path / "exam.pdf").write_bytes(b"pdf")
+    cache = BuildCache(tmp_path / "cache.json", tmp_path)
+    cache.add(Path("exam.pdf"), "hash", 3, [1])
+    cache.save()
+
+    cache = BuildCache(tmp_path / "cache.json", tmp_path)
+
+    assert cache.lookup(Path("exam.pdf"), "hash")["pages"] == [1]
+    assert cache.lookup(Path("exam.pdf"), "other") is None
+    (tmp_path / "exam.pdf").write_bytes(b"edited")
+    assert cache.lookup(Path("exam.pdf"), "hash") is None
+
+
+@pytest.mark.parametrize("merge", [False, True])
+def test_print_build_cache(tmp_path, merge):
+    """GIVEN an exam printed with a build cache
+    WHEN printed again, unchanged, then with a question changed
+    THEN nothing is built the first time, only what changed the second
+    """
+    exam = load_bank(write_bank(tmp_path / "bank.csv", 10, seed=1))
+    options = dict(
+        destination=tmp_path,
+        n_copies=3,
+        seed=1,
+        answers_shuffle=True,
+        merge=merge,
+        correction_file_name=Path("correction.pdf"),
+        build_cache=Path("cache.json"),
+    )
+
+    def layouts() -> int:
+        metrics = Metrics()
+        exam.print(Path("exam.pdf"), metrics=metrics, **options)
+        assert len(metrics.files) == (2 if merge else 4)
+        return metrics.stages.get("layout", {"calls": 0})["calls"]
+
+    assert layouts() == (2 if merge else 4)
+    assert layouts() == 0
+    exam.questions[0].answers[0].text = "changed"
+    assert layouts() == (1 if merge else 3)
+
+
+def test_print_build_cache_with_sink(tmp_path, mix_dummy_exam):
+    with pytest.raises(Exam2pdfException):
+        mix_dummy_exam.print(
+            Path("exam.pdf"), archive=Path("exam.zip"), build_cache=Path("cache.json")
+        )
@@ -0,0 +1,160 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from exam2pdf import cli
+from exam2pdf.cli import load_bank, load_manifest, main
+from exam2pdf.exam import Exam
+from exam2pdf.synthetic import bank_fields, write_bank
+from exam2pdf.utility import Exam2pdfException
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    write_bank(tmp_path / "first.csv", 10, seed=1)
+    write_bank(tmp_path / "second.csv", 10, seed=2)
+    data = {
+        "defaults": {
+            "destination": "out",
+            "selector": list(bank_fields(5)),
+            "questions_shuffle": True,
+        },
+        "exams": [
+            {"bank": "first.csv", "n_copies": 2, "seed": 1},
+            {
+                "bank": "second.csv",
+                "exam_file": "second_exam.pdf",
+                "correction_file": "second_correction.pdf",
+            },
+            {"bank": "first.csv", "exam_file": "merged.pdf", "merge": True},
+        ],
+    }
+    file_path = tmp_path / "manifest.json"
+    file_path.write_text(json.dumps(data))
+    return file_path
+
+
+def test_load_manifest(tmp_path, manifest):
+    """GIVEN a manifest with defaults
+    THEN every job has the defaults, and paths relative to the manifest
+    """
+    jobs = load_manifest(manifest)
+
+    assert len(jobs) == 3
+    assert jobs[0]["bank"][0] == str(tmp_path / "first.csv")
+    assert jobs[0]["bank"] == jobs[2]["bank"]
+    assert jobs[0]["options"]["destination"] == tmp_path / "out"
+    assert jobs[0]["options"]["exam_file_name"] == Path("first.pdf")
+    assert jobs[1]["options"]["correction_file_name"] == Path("second_correction.pdf")
+    assert jobs[1]["options"]["questions_shuffle"] is True
+
+
+def test_load_manifest_unknown_key(tmp_path):
+    file_path = tmp_path / "manifest.json"
+    file_path.write_text(json.dumps({"exams": [{"bank": "a.csv", "copies": 2}]}))
+
+    with pytest.raises(Exam2pdfException):
+        load_manifest(file_path)
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main(tmp_path, manifest, jobs):
+    """GIVEN a manifest
+    WHEN run, in one or more processes
+    THEN all the exams are printed and timings reported
+    """
+    report = tmp_path / "report.json"
+
+    result = main([str(manifest), "--jobs", jobs, "--quiet", "--report", str(report)])
+
+    names = {file_path.name for file_path in (tmp_path / "out").iterdir()}
+    assert result == 0
+    assert names == {
+        "first_1_2.pdf",
+        "first_2_2.pdf",
+        "second_exam.pdf",
+        "second_correction.pdf",
+        "merged.pdf",
+    }
+    assert len(json.loads(report.read_text())["jobs"]) == 3
+
+
+def test_main_failed_job(tmp_path, capsys):
+    file_path = tmp_path / "manifest.json"
+    file_path.write_text(json.dumps({"exams": [{"bank": "missing.csv"}]}))
+
+    result = main([str(file_path)])
+
+    assert result == 1
+    assert "missing.csv" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "key, value", [("n_copies", "2"), ("n_copies", True), ("merge", 1), ("bank", 3)]
+)
+def test_load_manifest_invalid_value(tmp_path, key, value):
+    file_path = tmp_path / "manifest.json"
+    exam = {"bank": "a.csv", key: value}
+    file_path.write_text(json.dumps({"exams": [exam]}))
+
+    with pytest.raises(Exam2pdfException):
+        load_manifest(file_path)
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_unexpected_error(tmp_path, monkeypatch, manifest, jobs):
+    """GIVEN jobs failing with errors other than Exam2pdfException
+    WHEN run, in one or more processes
+    THEN every failure is reported, and the run ends with exit code 1
+    """
+
+    def broken_print(self, *args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Exam, "print", broken_print)
+    report = tmp_path / "report.json"
+
+    result = main([str(manifest), "--jobs", jobs, "--quiet", "--report", str(report)])
+
+    assert result == 1
+    errors = [job["error"] for job in json.loads(report.read_text())["jobs"]]
+    assert errors == ["OSError: disk full"] * 3
+
+
+def test_load_bank_cache_bounded(tmp_path, monkeypatch):
+    """GIVEN more banks than are cached
+    WHEN loaded, one used again
+    THEN the least recently used are dropped
+    """
+    monkeypatch.setattr(cli, "BANKS_CACHED", 2)
+    monkeypatch.setattr(cli, "_banks", cli.OrderedDict())
+    keys = []
+    for name in "abc":
+        write_bank(tmp_path / f"{name}.csv", 3, seed=1)
+        keys.append((str(tmp_path / f"{name}.csv"), tuple(bank_fields(3)), ()))
+
+    first = load_bank(keys[0])
+    load_bank(keys[1])
+    assert load_bank(keys[0]) is first
+    load_bank(keys[2])
+
+    assert list(cli._banks) == [keys[0], keys[2]]
+
+
+def test_load_bank_changed(tmp_path):
+    """GIVEN a bank loaded
+    WHEN its file is rewritten
+    THEN it is parsed again
+    """
+    file_path = tmp_path / "bank.csv"
+    write_bank(file_path, 3, seed=1)
+    key = (str(file_path), tuple(bank_fields(3)), ())
+    first = load_bank(key)
+    assert load_bank(key) is first
+
+    write_bank(file_path, 4, seed=2)
+    os.utime(file_path, ns=(0, file_path.stat().st_mtime_ns + 10 ** 9))
+
+    assert len(load_bank(key).questions) == 4
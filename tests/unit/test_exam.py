@@ -1,6 +1,12 @@
 import pytest
+import csv
+import io
+import json
 from pathlib import Path
 import random
+import tarfile
+import threading
+import zipfile
 
 import exam2pdf
 from exam2pdf.exam import SerializeExam
@@ -630,6 +636,121 @@ def test_print_two_exams(tmp_path, dummy_exam_with_img):
         assert data.find(pdf_magic_no) == 1
 
 
+def test_print_merged_exams(tmp_path, dummy_exam_with_img):
+    """GIVEN an Exam
+    WHEN it is printed in n copies with merge
+    THEN one file is written, with a bookmark for each copy
+    """
+    pdf_magic_no = b"PDF"
+    file_path = tmp_path / "Exam.pdf"
+    ex = dummy_exam_with_img
+    n_copies = 3
+    ex.print(file_path, n_copies=n_copies, merge=True)
+
+    data = file_path.read_bytes()
+
+    assert data.find(pdf_magic_no) == 1
+    assert list(tmp_path.glob("*.pdf")) == [file_path]
+    assert data.count(b"/Dest [") == n_copies
+
+
+def test_print_merged_exams_duplex(tmp_path):
+    """GIVEN an Exam filling one page
+    WHEN it is printed in n copies with merge and duplex
+    THEN every copy starts on an odd page
+    """
+    q1 = exam2pdf.Question("q1 text", "")
+    q1.answers = (exam2pdf.Answer("a1 text"), exam2pdf.Answer("a2 text"))
+    ex = exam2pdf.Exam(q1)
+    n_copies = 3
+    simplex_path = tmp_path / "simplex.pdf"
+    duplex_path = tmp_path / "duplex.pdf"
+    ex.print(simplex_path, n_copies=n_copies, merge=True)
+    ex.print(duplex_path, n_copies=n_copies, merge=True, duplex=True)
+
+    assert f"/Count {n_copies} /Kids".encode() in simplex_path.read_bytes()
+    assert f"/Count {2 * n_copies - 1} /Kids".encode() in duplex_path.read_bytes()
+
+
+def test_print_qr_code(tmp_path):
+    """GIVEN an Exam filling many pages
+    WHEN it is printed in n copies with merge and qr_code
+    THEN the QR code is drawn once for each copy
+    """
+    questions = []
+    for number in range(40):
+        question = exam2pdf.Question(f"q{number} text", "")
+        question.answers = (exam2pdf.Answer("a1 text"), exam2pdf.Answer("a2 text"))
+        questions.append(question)
+    ex = exam2pdf.Exam(*questions)
+    n_copies = 3
+    file_path = tmp_path / "Exam.pdf"
+    ex.print(file_path, n_copies=n_copies, merge=True, seed=3, qr_code=True)
+
+    data = file_path.read_bytes()
+
+    assert data.count(b"/Subtype /Form") == n_copies
+
+
+def test_print_qr_code_separate_copies(tmp_path, dummy_exam_with_img):
+    ex = dummy_exam_with_img
+    ex.print(tmp_path / "Exam.pdf", n_copies=2, qr_code=True)
+
+    for file_path in tmp_path.glob("*.pdf"):
+        assert file_path.read_bytes().count(b"/Subtype /Form") == 1
+
+
+def test_print_answer_sheets(tmp_path, mix_dummy_exam):
+    """GIVEN an Exam
+    WHEN it is printed in n copies with answer_sheet_file_name
+    THEN a page for each copy is printed, all sharing one template
+    """
+    ex = mix_dummy_exam
+    ex.add_path_parent(Path("tests/unit/resources"))
+    n_copies = 12
+    ex.print(
+        Path("Exam.pdf"),
+        destination=tmp_path,
+        n_copies=n_copies,
+        answer_sheet_file_name=Path("Sheets.pdf"),
+    )
+
+    data = (tmp_path / "Sheets.pdf").read_bytes()
+
+    assert f"/Count {n_copies} /Kids".encode() in data
+    assert data.count(b"/Subtype /Form") == 1
+
+
+def test_print_build_report(tmp_path, mix_dummy_exam):
+    """GIVEN an Exam
+    WHEN it is printed merged, with build_report
+    THEN the report has the time of every stage, the pages of every
+    copy and the size of every file
+    """
+    ex = mix_dummy_exam
+    ex.add_path_parent(Path("tests/unit/resources"))
+    n_copies = 3
+    ex.print(
+        Path("Exam.pdf"),
+        Path("Correction.pdf"),
+        destination=tmp_path,
+        n_copies=n_copies,
+        merge=True,
+        build_report=Path("report.json"),
+    )
+
+    report = json.loads((tmp_path / "report.json").read_text())
+
+    expected_stages = {"shuffling", "flowables", "layout", "canvas_save", "writing"}
+    assert set(report["stages"]) == expected_stages
+    assert report["stages"]["shuffling"]["calls"] == n_copies
+    exam_file, correction_file = report["files"]
+    assert exam_file["name"] == "Exam.pdf"
+    assert exam_file["bytes"] == (tmp_path / "Exam.pdf").stat().st_size
+    assert len(exam_file["pages"]) == n_copies
+    assert correction_file["name"] == "Correction.pdf"
+
+
 def test_print_top_item_style(tmp_path, dummy_exam_with_img):
     pdf_magic_no = b"PDF"
     file_path = tmp_path / "Exam.pdf"
@@ -677,6 +798,248 @@ def test_print_correction(tmp_path):
     assert correction_data.find(pdf_magic_no) == 1
 
 
+def test_write_pdf_stream(dummy_exam_with_img):
+    """GIVEN an Exam
+    WHEN it is printed to a binary stream
+    THEN the stream holds a pdf
+    """
+    pdf_magic_no = b"PDF"
+    stream = io.BytesIO()
+    ex = dummy_exam_with_img
+    ex.write_pdf(stream, heading="Exam")
+
+    assert stream.getvalue().find(pdf_magic_no) == 1
+    assert ex.pdf_bytes(heading="Exam").find(pdf_magic_no) == 1
+
+
+def test_print_memory_sink(tmp_path, dummy_exam_with_img):
+    """GIVEN an Exam
+    WHEN it is printed in n copies with correction to a MemorySink
+    THEN each pdf is in the sink by name and nothing is written on disk
+    """
+    pdf_magic_no = b"PDF"
+    n_copies = 2
+    sink = exam2pdf.MemorySink()
+    ex = dummy_exam_with_img
+    ex.print(
+        Path("Exam.pdf"),
+        correction_file_name=Path("Correction.pdf"),
+        n_copies=n_copies,
+        sink=sink,
+    )
+
+    assert set(sink.files) == {
+        Path("Exam_1_2.pdf"),
+        Path("Exam_2_2.pdf"),
+        Path("Correction.pdf"),
+    }
+    assert all(data.find(pdf_magic_no) == 1 for data in sink.files.values())
+    assert list(tmp_path.glob("*.pdf")) == []
+
+
+def test_directory_sink_atomic(tmp_path):
+    """GIVEN a DirectorySink
+    WHEN a file is written, then written again
+    THEN it is replaced, and no temporary file is left
+    """
+    sink = exam2pdf.DirectorySink(tmp_path)
+
+    sink.write(Path("Exam.pdf"), b"first")
+    sink.write(Path("Exam.pdf"), b"second")
+
+    assert [file_path.name for file_path in tmp_path.iterdir()] == ["Exam.pdf"]
+    assert (tmp_path / "Exam.pdf").read_bytes() == b"second"
+
+
+@pytest.mark.parametrize("archive_name", ["Exam.zip", "Exam.tar", "Exam.tar.gz"])
+def test_print_archive(tmp_path, dummy_exam_with_img, archive_name):
+    """GIVEN an Exam
+    WHEN it is printed in n copies with correction to an archive
+    THEN all the pdf files are in the archive only
+    """
+    pdf_magic_no = b"PDF"
+    n_copies = 2
+    ex = dummy_exam_with_img
+    ex.print(
+        Path("Exam.pdf"),
+        correction_file_name=Path("Correction.pdf"),
+        destination=tmp_path,
+        n_copies=n_copies,
+        archive=Path(archive_name),
+        compress_level=9,
+    )
+    archive_path = tmp_path / archive_name
+    expected_names = ["Exam_1_2.pdf", "Exam_2_2.pdf", "Correction.pdf"]
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            assert archive.namelist() == expected_names
+            data = archive.read("Exam_1_2.pdf")
+    else:
+        with tarfile.open(archive_path) as archive:
+            assert archive.getnames() == expected_names
+            data = archive.extractfile("Exam_1_2.pdf").read()
+    assert data.find(pdf_magic_no) == 1
+    assert list(tmp_path.glob("*.pdf")) == []
+
+
+def test_print_archive_unknown_format(tmp_path):
+    """GIVEN an Exam
+    WHEN archive has an unknown suffix
+    THEN Exception is risen
+    """
+    ex = exam2pdf.Exam()
+    with pytest.raises(Exam2pdfException):
+        ex.print(Path("Exam.pdf"), destination=tmp_path, archive=Path("Exam.rar"))
+
+
+@pytest.mark.parametrize("merge", [False, True])
+def test_print_invariant(dummy_exam_with_img, merge):
+    """GIVEN an Exam
+    WHEN it is printed twice with the same seed and invariant
+    THEN every pdf is byte identical, while without invariant it is not
+    """
+    outputs = []
+    for invariant in (True, True, False):
+        sink = exam2pdf.MemorySink()
+        dummy_exam_with_img.print(
+            Path("Exam.pdf"),
+            correction_file_name=Path("Correction.pdf"),
+            answer_sheet_file_name=Path("Sheets.pdf"),
+            n_copies=2,
+            seed=3,
+            questions_shuffle=True,
+            qr_code=True,
+            merge=merge,
+            sink=sink,
+            invariant=invariant,
+        )
+        outputs.append(sink.files)
+
+    assert outputs[0] == outputs[1]
+    assert all(outputs[0][name] != data for name, data in outputs[2].items())
+
+
+@pytest.mark.parametrize("archive_name", ["Exam.zip", "Exam.tar.gz", "Exam.tar.xz"])
+def test_print_archive_invariant(tmp_path, dummy_exam_with_img, archive_name):
+    """GIVEN an Exam
+    WHEN it is printed twice to an archive with invariant
+    THEN the archives are byte identical, and readable
+    """
+    archives = []
+    for folder in ("first", "second"):
+        destination = tmp_path / folder
+        destination.mkdir()
+        dummy_exam_with_img.print(
+            Path("Exam.pdf"),
+            destination=destination,
+            n_copies=2,
+            seed=1,
+            archive=Path(archive_name),
+            invariant=True,
+        )
+        archives.append((destination / archive_name).read_bytes())
+
+    assert archives[0] == archives[1]
+    if archive_name.endswith(".zip"):
+        with zipfile.ZipFile(tmp_path / "first" / archive_name) as archive:
+            assert archive.namelist() == ["Exam_1_2.pdf", "Exam_2_2.pdf"]
+    else:
+        with tarfile.open(tmp_path / "first" / archive_name) as archive:
+            assert archive.getnames() == ["Exam_1_2.pdf", "Exam_2_2.pdf"]
+
+
+def test_print_correction_table(tmp_path, mix_dummy_exam):
+    pdf_magic_no = b"PDF"
+    exam_file_path = tmp_path / "Exam"
+    correction_file_path = tmp_path / "Correction"
+    ex = mix_dummy_exam
+    ex.add_path_parent(Path("tests/unit/resources"))
+    ex.print(
+        exam_file_path,
+        correction_file_name=correction_file_path,
+        n_copies=2,
+        correction_layout="table",
+    )
+
+    assert correction_file_path.read_bytes().find(pdf_magic_no) == 1
+
+
+def test_print_correction_unknown_layout(tmp_path):
+    ex = exam2pdf.Exam()
+    with pytest.raises(Exam2pdfException):
+        ex.print(
+            tmp_path / "Exam",
+            correction_file_name=tmp_path / "Correction",
+            correction_layout="grid",
+        )
+
+
+def test_print_answer_key_csv(tmp_path, mix_dummy_exam):
+    """GIVEN an Exam with mixed questions
+    WHEN it is printed in n copies with a csv answer key file
+    THEN the file has one row for each question of each copy
+    """
+    n_copies = 3
+    ex = mix_dummy_exam
+    ex.add_path_parent(Path("tests/unit/resources"))
+    ex.print(
+        Path("Exam.pdf"),
+        destination=tmp_path,
+        n_copies=n_copies,
+        questions_shuffle=True,
+        answers_shuffle=True,
+        seed=7,
+        answer_key_file=Path("key.csv"),
+    )
+
+    with (tmp_path / "key.csv").open(newline="") as key_file:
+        rows = list(csv.DictReader(key_file))
+
+    assert len(rows) == n_copies * len(ex.questions)
+    assert {row["copy"] for row in rows} == {"1", "2", "3"}
+    assert all(row["seed"] != "" for row in rows)
+    for row in rows:
+        question = ex.questions[int(row["question"])]
+        answers = [int(index) for index in row["answers"].split()]
+        assert sorted(answers) == list(range(len(question.answers)))
+        if question.correct_answer is not None:
+            correct_answer = question.answers[answers[int(row["correct"])]]
+            assert correct_answer is question.correct_answer
+
+
+def test_print_answer_key_jsonl(tmp_path, mix_dummy_exam):
+    """GIVEN an Exam with mixed questions
+    WHEN it is printed with a jsonl answer key file
+    THEN the file has one object for each copy, as the correction
+    """
+    n_copies = 2
+    ex = mix_dummy_exam
+    ex.add_path_parent(Path("tests/unit/resources"))
+    ex.print(
+        Path("Exam.pdf"),
+        destination=tmp_path,
+        n_copies=n_copies,
+        answer_key_file=Path("key.jsonl"),
+    )
+
+    lines = (tmp_path / "key.jsonl").read_text().splitlines()
+    records = [json.loads(line) for line in lines]
+
+    assert [record["copy"] for record in records] == [1, 2]
+    assert records[0]["seed"] is None
+    assert records[0]["questions"] == [0, 1, 2, 3, 4, 5]
+    assert records[0]["options"] == ["B", "A", "True", "None", "False", "C"]
+
+
+def test_print_answer_key_unknown_format(tmp_path):
+    ex = exam2pdf.Exam()
+    with pytest.raises(Exam2pdfException):
+        ex.print(
+            Path("Exam.pdf"), destination=tmp_path, answer_key_file=Path("key.xml")
+        )
+
+
 @pytest.mark.interactive
 def test_have_a_look(have_a_look, is_correct):
     """GIVEN a pdf file with some not shuffled question and a correction file
@@ -838,3 +1201,209 @@ def test_serialize_correction_n_copies(dummy_exam):
     for item in serial.correction():
         if item.item_level == ItemLevel.top:
             assert f"{expected_num_sequence.pop()}/{n_copies}" in item.text
+
+
+def test_serialize_correction_options(mix_dummy_exam):
+    """GIVEN an Exam with mixed questions
+    WHEN exam is serialized without shuffle
+    THEN correction has the correct option of each question
+    """
+    serial = SerializeExam(mix_dummy_exam)
+    for _ in serial.assignment():
+        pass
+
+    options = [
+        item.text
+        for item in serial.correction()
+        if item.item_level == ItemLevel.sub
+    ]
+
+    assert options == ["B", "A", "True", "None", "False", "C"]
+
+
+def test_serialize_answer_keys(mix_dummy_exam):
+    """GIVEN an Exam with mixed questions
+    WHEN exam is serialized with questions and answers shuffled
+    THEN the answer key maps each copy back to the original exam
+    """
+    ex = mix_dummy_exam
+    n_copies = 3
+    serial = SerializeExam(ex, shuffle_item=True, shuffle_sub=True)
+    random.seed(1)
+    assignments = [list(serial.assignment()) for _ in range(n_copies)]
+
+    assert len(serial.answer_keys) == n_copies
+    for items, answer_key in zip(assignments, serial.answer_keys):
+        expected = []
+        answers = iter(answer_key.answers)
+        for index in answer_key.order:
+            question = ex.questions[index]
+            expected.append(question.text)
+            expected.extend(
+                question.answers[next(answers)].text for _ in question.answers
+            )
+        texts = [item.text for item in items]
+        assert texts == expected
+        for index, correct in zip(answer_key.order, answer_key.correct):
+            question = ex.questions[index]
+            if question.correct_answer is None:
+                assert correct == -1
+            else:
+                position = texts.index(question.text) + 1 + correct
+                assert texts[position] == question.correct_answer.text
+
+
+def test_serialize_correction_rows(mix_dummy_exam):
+    """GIVEN an Exam with mixed questions
+    WHEN exam is serialized in n copies without shuffle
+    THEN correction_rows has one row per copy with the correct options
+    """
+    n_copies = 2
+    serial = SerializeExam(mix_dummy_exam)
+    for _ in range(n_copies):
+        for _ in serial.assignment():
+            pass
+
+    assert serial.correction_header() == ("checker", "1", "2", "3", "4", "5", "6")
+    assert list(serial.correction_rows()) == [
+        ("1/2", "B", "A", "True", "None", "False", "C"),
+        ("2/2", "B", "A", "True", "None", "False", "C"),
+    ]
+
+
+def test_serialize_last_answer_key(mix_dummy_exam):
+    """GIVEN a SerializeExam
+    WHEN a copy is assigned
+    THEN its answer key is available before its items are consumed
+    """
+    serial = SerializeExam(mix_dummy_exam, shuffle_item=True, seed=2)
+    assert serial.last_answer_key is None
+
+    items = serial.assignment()
+
+    assert serial.last_answer_key == serial.answer_keys[0]
+    assert len(list(items)) > 0
+
+
+def test_serialize_seed(mix_dummy_exam):
+    """GIVEN an Exam with mixed questions
+    WHEN it is serialized twice with the same seed
+    THEN copies are shuffled the same way, whatever global random is
+    """
+    n_copies = 4
+    answer_keys = []
+    for global_seed in (1, 2):
+        random.seed(global_seed)
+        serial = SerializeExam(
+            mix_dummy_exam, shuffle_item=True, shuffle_sub=True, seed=11
+        )
+        for _ in range(n_copies):
+            for _ in serial.assignment():
+                pass
+        answer_keys.append(serial.answer_keys)
+
+    assert answer_keys[0] == answer_keys[1]
+    assert len({answer_key.seed for answer_key in answer_keys[0]}) == n_copies
+
+
+@pytest.mark.parametrize("merge", [False, True])
+def test_print_pipeline(tmp_path, dummy_exam_with_img, merge):
+    """GIVEN an Exam
+    WHEN it is printed pipelined, and in sequence, with the same seed
+    THEN files, answer keys and build report files are the same
+    """
+    outputs = []
+    for pipeline in (False, True):
+        destination = tmp_path / str(pipeline)
+        destination.mkdir()
+        dummy_exam_with_img.print(
+            Path("Exam.pdf"),
+            correction_file_name=Path("Correction.pdf"),
+            answer_sheet_file_name=Path("Sheets.pdf"),
+            destination=destination,
+            n_copies=4,
+            seed=3,
+            questions_shuffle=True,
+            answers_shuffle=True,
+            answer_key_file=Path("keys.jsonl"),
+            build_report=Path("report.json"),
+            qr_code=True,
+            merge=merge,
+            invariant=True,
+            pipeline=pipeline,
+        )
+        report = json.loads((destination / "report.json").read_text())
+        files = {
+            path.name: path.read_bytes()
+            for path in destination.iterdir()
+            if path.name != "report.json"
+        }
+        outputs.append((files, report["files"]))
+
+    assert outputs[0] == outputs[1]
+
+
+def test_print_pipeline_journal(tmp_path, monkeypatch, dummy_exam_with_img):
+    """GIVEN a pipelined print with a journal
+    WHEN the writer fails on the third copy, and the print runs again
+    THEN the first two copies are journaled and not printed again
+    """
+    written = []
+    real_write = exam2pdf.DirectorySink.write
+
+    def failing_write(self, file_name, data):
+        if len(written) == 2:
+            raise OSError("disk full")
+        written.append(file_name)
+        real_write(self, file_name, data)
+
+    arguments = dict(
+        exam_file_name=Path("Exam.pdf"),
+        destination=tmp_path,
+        n_copies=4,
+        seed=1,
+        questions_shuffle=True,
+        journal=Path("journal.jsonl"),
+        pipeline=True,
+    )
+    monkeypatch.setattr(exam2pdf.DirectorySink, "write", failing_write)
+    with pytest.raises(OSError):
+        dummy_exam_with_img.print(**arguments)
+    monkeypatch.undo()
+    journaled = (tmp_path / "journal.jsonl").read_text().splitlines()[1:]
+
+    assert [json.loads(line)["copy"] for line in journaled] == [1, 2]
+    dummy_exam_with_img.print(**arguments)
+    assert len(list(tmp_path.glob("Exam_*_4.pdf"))) == 4
+
+
+def test_print_pipeline_error(tmp_path, monkeypatch, dummy_exam_with_img):
+    """GIVEN a pipelined print
+    WHEN the layout of the second copy fails
+    THEN the thread shuffling copies is stopped, without shuffling more
+    """
+    built = []
+
+    def failing_build(interface):
+        if built:
+            raise Exam2pdfException("broken")
+        built.append(interface)
+
+    monkeypatch.setattr(exam2pdf.Exam, "_build", staticmethod(failing_build))
+    # the traceback keeps the print frame alive, as a caller's would
+    with pytest.raises(Exam2pdfException) as error:
+        dummy_exam_with_img.print(
+            Path("Exam.pdf"),
+            destination=tmp_path,
+            n_copies=20,
+            seed=1,
+            answer_key_file=Path("keys.jsonl"),
+            pipeline=True,
+        )
+
+    assert not any(
+        thread.name == "exam2pdf-producer" for thread in threading.enumerate()
+    )
+    keys = (tmp_path / "keys.jsonl").read_text().splitlines()
+    assert len(keys) < 20
+    assert error.traceback
@@ -0,0 +1,141 @@
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from exam2pdf.exam import SerializeExam
+from exam2pdf.grading import (
+    BLANK,
+    INVALID,
+    KeyArrays,
+    Responses,
+    grade,
+    load_responses,
+    parse_choice,
+    save_grades,
+)
+from exam2pdf.utility import Exam2pdfException
+
+
+@pytest.fixture
+def serialized_exam(mix_dummy_exam):
+    serial = SerializeExam(mix_dummy_exam, shuffle_item=True, shuffle_sub=True, seed=5)
+    for _ in range(3):
+        for _ in serial.assignment():
+            pass
+    return serial
+
+
+@pytest.mark.parametrize(
+    "text, expected", [["A", 0], ["c", 2], ["", BLANK], [" - ", BLANK], ["AB", INVALID]]
+)
+def test_parse_choice(text, expected):
+    assert parse_choice(text) == expected
+
+
+def test_key_arrays_from_records(serialized_exam):
+    keys = KeyArrays.from_records(serialized_exam.key_records())
+
+    assert keys.copies.tolist() == [1, 2, 3]
+    assert keys.order.shape == (3, 6)
+    assert keys.answers.shape == (3, 6, 4)
+    for row, answer_key in enumerate(serialized_exam.answer_keys):
+        assert keys.order[row].tolist() == answer_key.order.tolist()
+        assert keys.correct[row].tolist() == answer_key.correct.tolist()
+
+
+@pytest.mark.parametrize("key_file_name", ["key.csv", "key.jsonl"])
+def test_key_arrays_load(tmp_path, mix_dummy_exam, key_file_name):
+    """GIVEN the answer key file written by Exam.print
+    THEN it is loaded as the keys kept by SerializeExam
+    """
+    ex = mix_dummy_exam
+    ex.add_path_parent(Path("tests/unit/resources"))
+    ex.print(
+        Path("Exam.pdf"),
+        destination=tmp_path,
+        n_copies=3,
+        questions_shuffle=True,
+        answers_shuffle=True,
+        seed=5,
+        answer_key_file=Path(key_file_name),
+    )
+    serial = SerializeExam(ex, shuffle_item=True, shuffle_sub=True, seed=5)
+    for _ in range(3):
+        for _ in serial.assignment():
+            pass
+
+    loaded = KeyArrays.load(tmp_path / key_file_name)
+    expected = KeyArrays.from_records(serial.key_records())
+
+    assert np.array_equal(loaded.copies, expected.copies)
+    assert np.array_equal(loaded.order, expected.order)
+    assert np.array_equal(loaded.answers, expected.answers)
+    assert np.array_equal(loaded.correct, expected.correct)
+
+
+def test_grade(serialized_exam):
+    """GIVEN three students, one answering all correctly, one leaving
+    everything blank, one answering all wrongly
+    THEN scores follow the given points and penalties
+    """
+    keys = KeyArrays.from_records(serialized_exam.key_records())
+    all_right = np.where(keys.correct[0] < 0, BLANK, keys.correct[0])
+    all_wrong = np.where(keys.correct[2] < 0, BLANK, INVALID)
+    choices = np.stack([all_right, np.full(6, BLANK), all_wrong]).astype(np.int16)
+    responses = Responses(["s1", "s2", "s3"], np.array([1, 2, 3]), choices)
+
+    grades = grade(keys, responses, right=1.0, wrong=-0.25, blank=0.0)
+
+    assert grades.n_right.tolist() == [5, 0, 0]
+    assert grades.n_blank.tolist() == [1, 6, 1]
+    assert grades.n_wrong.tolist() == [0, 0, 5]
+    assert grades.scores.tolist() == [5.0, 0.0, -1.25]
+    # question 4 has no answer: never right
+    assert grades.right[0].tolist() == [True, True, True, False, True, True]
+
+
+def test_grade_original_choices(mix_dummy_exam, serialized_exam):
+    """GIVEN a student answering all correctly
+    THEN original choices are the original correct answers
+    """
+    keys = KeyArrays.from_records(serialized_exam.key_records())
+    choices = np.where(keys.correct[1:2] < 0, BLANK, keys.correct[1:2])
+    responses = Responses(["s1"], np.array([2]), choices.astype(np.int16))
+
+    grades = grade(keys, responses)
+
+    expected = [
+        BLANK if question.correct_index is None else question.correct_index
+        for question in mix_dummy_exam.questions
+    ]
+    assert grades.original_choices[0].tolist() == expected
+
+
+def test_grade_unknown_copy(serialized_exam):
+    keys = KeyArrays.from_records(serialized_exam.key_records())
+    responses = Responses(["s1"], np.array([7]), np.zeros((1, 6), np.int16))
+
+    with pytest.raises(Exam2pdfException):
+        grade(keys, responses)
+
+
+def test_load_responses_and_save_grades(tmp_path, serialized_exam):
+    responses_file = tmp_path / "responses.csv"
+    text = "student,copy,1,2,3,4,5,6\nann,1,A,B,,A,AB,C\nbob,3,A,A\n"
+    responses_file.write_text(text)
+    grades_file = tmp_path / "grades.csv"
+
+    responses = load_responses(responses_file)
+    grades = grade(KeyArrays.from_records(serialized_exam.key_records()), responses)
+    save_grades(grades, grades_file)
+
+    assert responses.students == ["ann", "bob"]
+    assert responses.choices.tolist() == [
+        [0, 1, BLANK, 0, INVALID, 2],
+        [0, 0, BLANK, BLANK, BLANK, BLANK],
+    ]
+    lines = grades_file.read_text().splitlines()
+    assert lines[0] == "student,copy,score,right,wrong,blank"
+    assert len(lines) == 3
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import exam2pdf",
+        "from exam2pdf import Exam, Question, MemorySink",
+        "from exam2pdf.synthetic import load_bank",
+    ],
+)
+def test_lazy_imports(statement):
+    """GIVEN a fresh interpreter
+    WHEN exam2pdf is imported for loading banks
+    THEN neither ReportLab nor chardet are imported
+    """
+    probe = (
+        f"import sys; {statement}; "
+        "print('reportlab' in sys.modules, 'chardet' in sys.modules)"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert output.split() == ["False", "False"]
+
+
+def test_lazy_attribute():
+    import exam2pdf
+    from exam2pdf.export import ZipSink
+
+    assert exam2pdf.ZipSink is ZipSink
+    assert "Exam" in dir(exam2pdf)
+    with pytest.raises(AttributeError):
+        exam2pdf.Missing
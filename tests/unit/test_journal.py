@@ -0,0 +1,111 @@
+from array import array
+import json
+from pathlib import Path
+
+import pytest
+
+from exam2pdf.journal import Journal
+from exam2pdf.synthetic import load_bank, write_bank
+from exam2pdf.utility import AnswerKey, Exam2pdfException
+
+
+def answer_key(seed: int) -> AnswerKey:
+    return AnswerKey(
+        array("I", [1, 0]), array("B", [0, 1, 1, 0]), array("b", [1, 0]), seed
+    )
+
+
+def test_journal_resume(tmp_path):
+    """GIVEN a journal of a run stopped while writing a line
+    WHEN opened again for the same job
+    THEN the copies recorded in full, with their files, are delivered,
+    and the broken line is dropped
+    """
+    file_path = tmp_path / "journal.jsonl"
+    journal = Journal(file_path, {"n_copies": 3})
+    for number in (1, 2):
+        (tmp_path / f"{number}.pdf").write_bytes(b"pdf")
+        journal.record(number, Path(f"{number}.pdf"), answer_key(number))
+    journal.close()
+    (tmp_path / "1.pdf").unlink()
+    with file_path.open("a") as journal_file:
+        journal_file.write('{"copy": 3, "fi')
+
+    journal = Journal(file_path, {"n_copies": 3})
+    journal.record(3, Path("3.pdf"), answer_key(3))
+    journal.close()
+
+    assert list(journal.delivered(tmp_path)) == [2]
+    assert journal.delivered(tmp_path)[2] == answer_key(2)
+    lines = file_path.read_text().splitlines()
+    assert [json.loads(line).get("copy") for line in lines] == [None, 1, 2, 3]
+
+
+def test_journal_other_job(tmp_path):
+    file_path = tmp_path / "journal.jsonl"
+    Journal(file_path, {"n_copies": 3}).close()
+
+    with pytest.raises(Exam2pdfException):
+        Journal(file_path, {"n_copies": 4})
+
+
+def test_print_journal(tmp_path):
+    """GIVEN a print with a journal, stopped before its last copy
+    WHEN it is run again
+    THEN only the missing copy is printed, and the answer keys of the
+    others are the ones of the first run
+    """
+    exam = load_bank(write_bank(tmp_path / "bank.csv", 10, seed=1))
+    options = dict(
+        destination=tmp_path,
+        n_copies=3,
+        questions_shuffle=True,
+        answers_shuffle=True,
+        correction_file_name=Path("correction.pdf"),
+        answer_key_file=Path("keys.jsonl"),
+        journal=Path("journal.jsonl"),
+    )
+    exam.print(Path("exam.pdf"), **options)
+    first_keys = (tmp_path / "keys.jsonl").read_text().splitlines()
+    (tmp_path / "exam_3_3.pdf").unlink()
+    first_copy = (tmp_path / "exam_1_3.pdf").stat().st_mtime_ns
+
+    exam.print(Path("exam.pdf"), **options)
+
+    keys = (tmp_path / "keys.jsonl").read_text().splitlines()
+    assert keys[:2] == first_keys[:2]
+    assert len(keys) == 3
+    assert (tmp_path / "exam_3_3.pdf").exists()
+    assert (tmp_path / "exam_1_3.pdf").stat().st_mtime_ns == first_copy
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_print_journal_merge(tmp_path, mix_dummy_exam):
+    with pytest.raises(Exam2pdfException):
+        mix_dummy_exam.print(
+            Path("exam.pdf"),
+            destination=tmp_path,
+            merge=True,
+            journal=Path("journal.jsonl"),
+        )
+
+
+def test_print_journal_other_correct_answer(tmp_path):
+    """GIVEN a print with a journal
+    WHEN the correct answer of a question changes, and it is run again
+    THEN the journal is refused: its answer keys record the old one
+    """
+    exam = load_bank(write_bank(tmp_path / "bank.csv", 10, seed=1))
+    options = dict(
+        destination=tmp_path,
+        n_copies=2,
+        seed=1,
+        questions_shuffle=True,
+        journal=Path("journal.jsonl"),
+    )
+    exam.print(Path("exam.pdf"), **options)
+    question = exam.questions[0]
+    question.correct_index = (question.correct_index + 1) % len(question.answers)
+
+    with pytest.raises(Exam2pdfException):
+        exam.print(Path("exam.pdf"), **options)
@@ -0,0 +1,71 @@
+import json
+import threading
+from pathlib import Path
+
+from exam2pdf.metrics import Metrics, NO_METRICS
+
+
+def test_metrics_nested_stages():
+    """GIVEN a stage nested in another
+    THEN the outer stage self time excludes the inner one
+    """
+    calls = []
+    metrics = Metrics(callback=lambda name, seconds: calls.append(name))
+
+    with metrics.stage("outer"):
+        for _ in range(2):
+            with metrics.stage("inner"):
+                sum(range(10000))
+
+    outer, inner = metrics.stages["outer"], metrics.stages["inner"]
+    assert calls == ["inner", "inner", "outer"]
+    assert inner["calls"] == 2
+    assert outer["self_seconds"] <= outer["seconds"] - inner["seconds"] + 1e-9
+    assert inner["self_seconds"] == inner["seconds"]
+
+
+def test_metrics_save(tmp_path):
+    metrics = Metrics()
+    with metrics.stage("stage"):
+        pass
+    metrics.add_file(Path("file.pdf"), 100, [2, 3])
+    file_path = tmp_path / "report.json"
+
+    metrics.save(file_path)
+    report = json.loads(file_path.read_text())
+
+    assert report["stages"]["stage"]["calls"] == 1
+    assert report["files"] == [{"name": "file.pdf", "bytes": 100, "pages": [2, 3]}]
+
+
+def test_no_metrics():
+    with NO_METRICS.stage("stage"):
+        pass
+    NO_METRICS.add_file(Path("file.pdf"), 100)
+
+    assert NO_METRICS.stages == {}
+    assert NO_METRICS.files == []
+
+
+def test_metrics_threads():
+    """GIVEN stages nested in many threads at once
+    THEN every thread nests its own, and all of them are counted
+    """
+    metrics = Metrics()
+
+    def work():
+        for _ in range(100):
+            with metrics.stage("outer"):
+                with metrics.stage("inner"):
+                    pass
+            metrics.add_file(Path("file.pdf"), 1)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert metrics.stages["outer"]["calls"] == metrics.stages["inner"]["calls"] == 400
+    assert len(metrics.files) == 400
+    assert metrics.stages["inner"]["seconds"] <= metrics.stages["outer"]["seconds"]
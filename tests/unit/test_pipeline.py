@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from exam2pdf.pipeline import BackgroundWriter, background
+
+
+def test_background():
+    """GIVEN an iterable
+    WHEN iterated in background
+    THEN items come in order, produced in another thread, and no more
+    than depth ahead of the consumer
+    """
+    produced = []
+
+    def numbers():
+        for number in range(10):
+            produced.append((number, threading.current_thread()))
+            yield number
+
+    consumed = []
+    for number in background(numbers(), depth=2):
+        time.sleep(0.01)
+        # the one taken, up to depth in the queue, one waiting to be put
+        assert len(produced) <= number + 4
+        consumed.append(number)
+
+    assert consumed == list(range(10))
+    assert all(thread is not threading.current_thread() for _, thread in produced)
+
+
+def test_background_error():
+    def numbers():
+        yield 1
+        raise ValueError("broken")
+
+    iterator = background(numbers())
+
+    assert next(iterator) == 1
+    with pytest.raises(ValueError):
+        next(iterator)
+
+
+def test_background_stop():
+    """GIVEN an endless iterable in background
+    WHEN the consumer stops
+    THEN the producer thread stops too
+    """
+
+    def endless():
+        while True:
+            yield 0
+
+    iterator = background(endless())
+    next(iterator)
+
+    iterator.close()
+
+    assert not any(
+        thread.name == "exam2pdf-producer" for thread in threading.enumerate()
+    )
+
+
+def test_background_writer():
+    """GIVEN functions submitted to a writer
+    THEN they run in order, in another thread, all of them before close
+    returns
+    """
+    calls = []
+    with BackgroundWriter(depth=1) as writer:
+        for number in range(5):
+            writer.submit(lambda number=number: calls.append(number))
+
+    assert calls == list(range(5))
+
+
+def test_background_writer_error():
+    """GIVEN a function that fails
+    THEN the error is raised by the writer, and later functions are not run
+    """
+    calls = []
+    writer = BackgroundWriter()
+    writer.submit(lambda: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        for _ in range(10):
+            writer.submit(lambda: calls.append(1))
+            time.sleep(0.01)
+        writer.close()
+
+    assert calls == []
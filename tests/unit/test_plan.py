@@ -0,0 +1,204 @@
+from pathlib import Path
+import random
+
+import pytest
+
+import exam2pdf
+from exam2pdf.exam import SerializeExam
+from exam2pdf.plan import load_plan, merge_plans, save_plan
+from exam2pdf.synthetic import load_bank, write_bank
+from exam2pdf.utility import Exam2pdfException
+
+
+@pytest.fixture
+def bank_exam(tmp_path):
+    return load_bank(write_bank(tmp_path / "bank.csv", 30, seed=3))
+
+
+@pytest.mark.parametrize(
+    "questions_shuffle, answers_shuffle", [(True, True), (True, False), (False, True)]
+)
+def test_plan_as_serialize(
+    mix_dummy_exam, bank_exam, questions_shuffle, answers_shuffle
+):
+    """GIVEN exams with True/False and multiple choice questions
+    WHEN planned with a seed
+    THEN every answer key is the one SerializeExam shuffles
+    """
+    for exam in (mix_dummy_exam, bank_exam):
+        serial = SerializeExam(
+            exam, shuffle_item=questions_shuffle, shuffle_sub=answers_shuffle, seed=5
+        )
+        for _ in range(10):
+            serial.assignment()
+
+        plan = exam.plan(Path("exam.pdf"), 10, 5, questions_shuffle, answers_shuffle)
+
+        assert tuple(plan.keys.values()) == serial.answer_keys
+
+
+def test_plan_global_random(bank_exam):
+    random.seed(1)
+    serial = SerializeExam(bank_exam, shuffle_item=True, shuffle_sub=True)
+    for _ in range(3):
+        serial.assignment()
+    random.seed(1)
+
+    plan = bank_exam.plan(Path("exam.pdf"), 3, None, True, True)
+
+    assert tuple(plan.keys.values()) == serial.answer_keys
+
+
+def test_plan_slice(bank_exam):
+    """GIVEN a seed
+    WHEN a slice of the copies is planned
+    THEN it is the same slice of the full plan
+    """
+    full = bank_exam.plan(Path("exam.pdf"), 6, 2, True, True)
+
+    plan = bank_exam.plan(Path("exam.pdf"), 6, 2, True, True, copies=range(3, 5))
+
+    assert plan.keys == {3: full.keys[3], 4: full.keys[4]}
+    with pytest.raises(Exam2pdfException):
+        bank_exam.plan(Path("exam.pdf"), 6, 2, copies=[7])
+
+
+def test_save_load_plan(tmp_path, bank_exam):
+    plan = bank_exam.plan(Path("exam.pdf"), 4, 2, True, True)
+    file_path = tmp_path / "plan.jsonl"
+
+    save_plan(plan, file_path)
+
+    assert load_plan(file_path) == plan
+    assert load_plan(file_path, range(2, 4)).keys == {
+        2: plan.keys[2],
+        3: plan.keys[3],
+    }
+    (tmp_path / "bad.jsonl").write_text("{}\n")
+    with pytest.raises(Exam2pdfException):
+        load_plan(tmp_path / "bad.jsonl")
+
+
+def test_print_plan(tmp_path, bank_exam):
+    """GIVEN a plan saved, then loaded in full and as a slice
+    WHEN printed
+    THEN the files are the ones print makes with the same seed, and the
+    correction of the slice has its copies, numbered as planned
+    """
+    options = dict(qr_code=True, invariant=True)
+    expected = exam2pdf.MemorySink()
+    bank_exam.print(
+        Path("exam.pdf"),
+        n_copies=4,
+        seed=2,
+        questions_shuffle=True,
+        answers_shuffle=True,
+        sink=expected,
+        **options
+    )
+    save_plan(bank_exam.plan(Path("exam.pdf"), 4, 2, True, True), tmp_path / "plan")
+    full = exam2pdf.MemorySink()
+    part = exam2pdf.MemorySink()
+
+    bank_exam.print(
+        Path("exam.pdf"), plan=load_plan(tmp_path / "plan"), sink=full, **options
+    )
+    bank_exam.print(
+        Path("exam.pdf"),
+        plan=load_plan(tmp_path / "plan", range(2, 4)),
+        sink=part,
+        correction_file_name=Path("correction.pdf"),
+        correction_layout="table",
+        **options
+    )
+
+    assert full.files == expected.files
+    assert set(part.files) == {
+        Path("exam_2_4.pdf"),
+        Path("exam_3_4.pdf"),
+        Path("correction.pdf"),
+    }
+    assert part.files[Path("exam_2_4.pdf")] == expected.files[Path("exam_2_4.pdf")]
+
+
+def test_serialize_apply(bank_exam):
+    """GIVEN answer keys of copies 2 and 3 of 4
+    WHEN applied
+    THEN the items are the shuffled ones, and the correction counts the
+    copies out of 4
+    """
+    serial = SerializeExam(bank_exam, shuffle_item=True, shuffle_sub=True, seed=2)
+    shuffled = [list(serial.assignment()) for _ in range(3)]
+    applied = SerializeExam(bank_exam, total_copies=4)
+
+    items = [list(applied.apply(serial.answer_keys[n - 1], n)) for n in (2, 3)]
+
+    assert items == shuffled[1:]
+    assert applied.copy_numbers == (2, 3)
+    assert [row[0] for row in applied.correction_rows()] == ["2/4", "3/4"]
+
+
+def test_print_plan_other_questions(bank_exam, mix_dummy_exam):
+    plan = bank_exam.plan(Path("exam.pdf"), 2)
+
+    with pytest.raises(Exam2pdfException):
+        mix_dummy_exam.print(Path("exam.pdf"), plan=plan, sink=exam2pdf.MemorySink())
+
+
+def test_merge_plans(bank_exam):
+    """GIVEN slices of a plan
+    WHEN merged
+    THEN they are the whole plan, and slices of another plan are refused
+    """
+    full = bank_exam.plan(Path("exam.pdf"), 6, 2, True, True)
+    slices = [
+        bank_exam.plan(Path("exam.pdf"), 6, 2, True, True, copies=range(4, 7)),
+        bank_exam.plan(Path("exam.pdf"), 6, 2, True, True, copies=range(1, 4)),
+    ]
+
+    assert merge_plans(slices) == full
+    other = bank_exam.plan(Path("exam.pdf"), 6, 3, True, True, copies=range(1, 2))
+    with pytest.raises(Exam2pdfException):
+        merge_plans(slices + [other])
+    with pytest.raises(Exam2pdfException):
+        merge_plans(slices + [other._replace(seed=2)])
+
+
+def test_print_plan_other_correct_answer(bank_exam):
+    """GIVEN a plan
+    WHEN the correct answer of a question changes
+    THEN the plan is refused: its answer keys record the old one
+    """
+    plan = bank_exam.plan(Path("exam.pdf"), 2, 1, True, True)
+    question = bank_exam.questions[0]
+    question.correct_index = (question.correct_index + 1) % len(question.answers)
+
+    with pytest.raises(Exam2pdfException):
+        bank_exam.print(Path("exam.pdf"), plan=plan, sink=exam2pdf.MemorySink())
+
+
+def test_print_plan_other_true_false():
+    """GIVEN a plan of an exam with a True/False question
+    WHEN its correct answer changes
+    THEN the plan is refused
+    """
+    question = exam2pdf.TrueFalseQuest("true or false")
+    question.add_answer(exam2pdf.TrueFalseAnswer(True))
+    question.add_answer(exam2pdf.TrueFalseAnswer(False))
+    exam = exam2pdf.Exam(question)
+    plan = exam.plan(Path("exam.pdf"), 2, 1, True, True)
+    question.correct_answer = question.answers[1]
+
+    with pytest.raises(Exam2pdfException):
+        exam.print(Path("exam.pdf"), plan=plan, sink=exam2pdf.MemorySink())
+
+
+def test_print_plan_other_file(bank_exam):
+    """GIVEN a plan of exam.pdf
+    WHEN printed as other.pdf
+    THEN it is refused: the plan records the files of the copies
+    """
+    plan = bank_exam.plan(Path("exam.pdf"), 2, 1, True, True)
+
+    with pytest.raises(Exam2pdfException):
+        bank_exam.print(Path("other.pdf"), plan=plan, sink=exam2pdf.MemorySink())
@@ -0,0 +1,108 @@
+from pathlib import Path
+import pstats
+import tracemalloc
+
+import pytest
+
+from exam2pdf.metrics import Metrics
+from exam2pdf.profiling import Profiler, PROFILE_ENV
+from exam2pdf.utility import Exam2pdfException
+
+
+def outer_work():
+    return [str(number) for number in range(20000)]
+
+
+def inner_work():
+    return [float(number) for number in range(20000)]
+
+
+def test_profiler_nested_stages(tmp_path):
+    """GIVEN a stage nested in another
+    WHEN profiled
+    THEN every stage has its profile, without the nested stage calls,
+    and its allocations
+    """
+    profiler = Profiler(tmp_path / "profile")
+    with profiler.stage("outer"):
+        kept = outer_work()
+        with profiler.stage("inner"):
+            kept.extend(inner_work())
+    profiler.close()
+
+    outer = pstats.Stats(str(tmp_path / "profile" / "outer.pstats"))
+    inner = pstats.Stats(str(tmp_path / "profile" / "inner.pstats"))
+    outer_functions = {function for _1, _2, function in outer.stats}
+    inner_functions = {function for _1, _2, function in inner.stats}
+    assert "outer_work" in outer_functions
+    assert "inner_work" not in outer_functions
+    assert "inner_work" in inner_functions
+    assert "test_profiling.py" in (tmp_path / "profile" / "inner.txt").read_text()
+    assert profiler.stages["outer"]["calls"] == 1
+
+
+def test_print_profile_env(tmp_path, monkeypatch, dummy_exam_with_img):
+    """GIVEN EXAM2PDF_PROFILE set to a directory
+    WHEN an Exam is printed
+    THEN profiles of the stages are written in it
+    """
+    profile_dir = tmp_path / "profile"
+    monkeypatch.setenv(PROFILE_ENV, str(profile_dir))
+
+    dummy_exam_with_img.print(Path("Exam.pdf"), destination=tmp_path)
+
+    names = {file_path.name for file_path in profile_dir.iterdir()}
+    assert {"layout.pstats", "flowables.pstats", "writing.txt"} <= names
+
+
+def test_print_profile_and_metrics(tmp_path, dummy_exam_with_img):
+    with pytest.raises(Exam2pdfException):
+        dummy_exam_with_img.print(
+            Path("Exam.pdf"),
+            destination=tmp_path,
+            metrics=Metrics(),
+            profile_dir=tmp_path,
+        )
+
+
+def test_profiler_snapshots_once(tmp_path, monkeypatch):
+    """GIVEN stages called many times
+    WHEN profiled
+    THEN memory snapshots are taken on their first call only, and
+    the memory of every call is counted
+    """
+    snapshots = []
+    take_snapshot = tracemalloc.take_snapshot
+
+    def counted():
+        snapshots.append(None)
+        return take_snapshot()
+
+    monkeypatch.setattr(tracemalloc, "take_snapshot", counted)
+    profiler = Profiler(tmp_path / "profile")
+    kept = []
+    for _ in range(10):
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                kept.append(inner_work())
+    profiler.close()
+
+    assert len(snapshots) == 4
+    summary = (tmp_path / "profile" / "inner.txt").read_text().splitlines()[0]
+    size, largest = (float(word) for word in summary.split() if word[0].isdigit())
+    assert size >= 5 * largest > 0
+
+
+def test_print_profile_env_and_metrics(tmp_path, monkeypatch, dummy_exam_with_img):
+    """GIVEN EXAM2PDF_PROFILE set to a directory
+    WHEN an Exam is printed with metrics
+    THEN stages are timed in metrics, and not profiled
+    """
+    profile_dir = tmp_path / "profile"
+    monkeypatch.setenv(PROFILE_ENV, str(profile_dir))
+    metrics = Metrics()
+
+    dummy_exam_with_img.print(Path("Exam.pdf"), destination=tmp_path, metrics=metrics)
+
+    assert "layout" in metrics.stages
+    assert not profile_dir.exists()
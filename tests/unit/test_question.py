@@ -673,6 +673,24 @@ def test_question_shuffle_more_answers():
     assert q.correct_option == "D"
 
 
+def test_question_shuffle_random_generator():
+    """Test shuffle with a given random generator: global random is unused
+    """
+    q = exam2pdf.Question("Who are you?")
+    answers = tuple(exam2pdf.Answer(f"answer {n}") for n in range(6))
+    q.answers = answers
+    expected = list(answers)
+    random.Random(3).shuffle(expected)
+    random.seed(1)
+    state = random.getstate()
+    q.shuffle(random.Random(3))
+
+    assert q.answers == tuple(expected)
+    assert q.correct_answer == answers[0]
+    assert q.correct_option == chr(ord("A") + expected.index(answers[0]))
+    assert random.getstate() == state
+
+
 def test_question_load_two_answers():
     """load question and two answers.
     """
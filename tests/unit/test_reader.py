@@ -0,0 +1,119 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+from exam2pdf.grading import BLANK, INVALID, load_responses, save_responses
+from exam2pdf.reader import read_folder, read_sheet
+from exam2pdf.sheet import SheetLayout
+from exam2pdf.utility import Exam2pdfException
+
+DPI = 100
+
+
+def draw_scan(layout, copy_number, choices, shift=(0, 0), angle=0.0):
+    """A synthetic scan of a filled in sheet: marks, bubble outlines and
+    the filled bubbles, drawn from the layout, then moved and rotated
+    like a sheet fed askew.
+    """
+    scale = DPI / 72
+    width, height = layout.page_size
+    image = Image.new("L", (round(width * scale), round(height * scale)), 255)
+    draw = ImageDraw.Draw(image)
+
+    def box(x, y, half):
+        return [
+            (x - half) * scale,
+            (height - y - half) * scale,
+            (x + half) * scale,
+            (height - y + half) * scale,
+        ]
+
+    for x, y in layout.marks:
+        draw.rectangle(box(x, y, layout.mark_size / 2), fill=0)
+    radius = layout.bubble_radius
+    filled = [
+        layout.id_bubbles[position][digit]
+        for position, digit in enumerate(layout.copy_digits(copy_number))
+    ]
+    for question, options in enumerate(choices):
+        filled.extend(layout.question_bubbles[question][option] for option in options)
+    for group in layout.id_bubbles + layout.question_bubbles:
+        for x, y in group:
+            draw.ellipse(box(x, y, radius), outline=0)
+    for x, y in filled:
+        draw.ellipse(box(x, y, radius), fill=0)
+
+    image = image.rotate(angle, fillcolor=255, translate=shift)
+    return image
+
+
+@pytest.fixture
+def layout():
+    return SheetLayout(n_questions=8, n_answers=4, id_digits=2)
+
+
+@pytest.mark.parametrize("shift, angle", [[(0, 0), 0.0], [(12, -9), 0.8]])
+def test_read_sheet(tmp_path, layout, shift, angle):
+    """GIVEN a scan, straight or askew, with a blank and a double marked
+    question
+    THEN copy number and choices are read back
+    """
+    choices = [[0], [3], [], [1, 2], [2], [1], [0], [3]]
+    file_path = tmp_path / "scan.png"
+    draw_scan(layout, 37, choices, shift, angle).save(file_path)
+
+    copy_number, read_choices = read_sheet(file_path, layout)
+
+    assert copy_number == 37
+    assert read_choices.tolist() == [0, 3, BLANK, INVALID, 2, 1, 0, 3]
+
+
+def test_read_sheet_without_marks(tmp_path, layout):
+    file_path = tmp_path / "blank.png"
+    Image.new("L", (200, 300), 255).save(file_path)
+
+    with pytest.raises(Exam2pdfException):
+        read_sheet(file_path, layout)
+
+
+def test_read_sheet_copy_not_readable(tmp_path, layout):
+    file_path = tmp_path / "scan.png"
+    image = draw_scan(layout, 5, [])
+    draw = ImageDraw.Draw(image)
+    # the first digit, 0, erased
+    x, y = layout.id_bubbles[0][0]
+    scale = DPI / 72
+    half = layout.bubble_radius * scale
+    centre = x * scale, (layout.page_size[1] - y) * scale
+    draw.rectangle(
+        [centre[0] - half, centre[1] - half, centre[0] + half, centre[1] + half],
+        fill=255,
+    )
+    image.save(file_path)
+
+    with pytest.raises(Exam2pdfException):
+        read_sheet(file_path, layout)
+
+
+def test_read_folder(tmp_path, layout):
+    """GIVEN a folder of png and jpeg scans
+    WHEN it is read and the responses saved
+    THEN responses are in name order and are loaded back as read
+    """
+    draw_scan(layout, 2, [[1]] * 8).save(tmp_path / "bob.jpg", quality=90)
+    draw_scan(layout, 11, [[0]] * 8).save(tmp_path / "ann.png")
+    (tmp_path / "notes.txt").write_text("not a scan")
+    responses_file = tmp_path / "responses.csv"
+
+    responses = read_folder(tmp_path, layout, max_workers=2)
+    save_responses(responses, responses_file)
+    loaded = load_responses(responses_file)
+
+    assert responses.students == ["ann", "bob"]
+    assert responses.copies.tolist() == [11, 2]
+    assert responses.choices.tolist() == [[0] * 8, [1] * 8]
+    assert loaded.students == responses.students
+    assert np.array_equal(loaded.copies, responses.copies)
+    assert np.array_equal(loaded.choices, responses.choices)
@@ -0,0 +1,186 @@
+from array import array
+import os
+from pathlib import Path
+import shutil
+import threading
+
+import pytest
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+
+from exam2pdf import rlwrapper
+from exam2pdf.export import RLInterface
+from exam2pdf.rlwrapper import (
+    PDFDoc,
+    get_std_aspect_image,
+    prefetched,
+    qr_code_widget,
+)
+from exam2pdf.utility import AnswerKey, Item, ItemLevel, encode_answer_key
+
+RESOURCES = Path(__file__).parent / "resources"
+
+
+@pytest.fixture
+def decodings(monkeypatch):
+    """File names decoded, and the thread that decoded each, in order.
+    """
+    decoded = []
+
+    class Reader(rlwrapper._DecodedImageReader):
+        def __init__(self, file_name):
+            decoded.append((Path(file_name).name, threading.current_thread().name))
+            super().__init__(file_name)
+
+    monkeypatch.setattr(rlwrapper, "_DecodedImageReader", Reader)
+    return decoded
+
+
+def image_items(tmp_path, count):
+    items = []
+    for number in range(count):
+        file_name = tmp_path / f"{number}.png"
+        shutil.copy(RESOURCES / "a.png", file_name)
+        items.append(Item(ItemLevel.top, f"question {number}", file_name))
+    return items
+
+
+@pytest.mark.parametrize("name", ["a.png", "t1.jpg"])
+def test_prefetched(tmp_path, decodings, name):
+    """GIVEN an image in the items
+    WHEN it is laid out, twice
+    THEN it was decoded once, on the prefetch thread pool
+    """
+    file_name = tmp_path / name
+    shutil.copy(RESOURCES / name, file_name)
+
+    for _ in prefetched([Item(ItemLevel.top, "question", file_name)]):
+        first = get_std_aspect_image(file_name, width=80)
+    second = get_std_aspect_image(file_name, width=80)
+
+    assert len(decodings) == 1
+    assert decodings[0][1].startswith("exam2pdf-image")
+    assert first._img is second._img
+    assert first.drawHeight == second.drawHeight > 0
+
+
+def test_prefetched_window(tmp_path, decodings):
+    """GIVEN many items with images
+    WHEN they are iterated
+    THEN no more than the window of them are read ahead
+    """
+    items = image_items(tmp_path, 10)
+    iterator = prefetched(iter(items), window=3)
+
+    assert next(iterator) == items[0]
+    assert len(decodings) <= 4
+
+
+def test_prefetched_bytes_bound(tmp_path, monkeypatch, decodings):
+    """GIVEN a bank with more images than the cache holds
+    WHEN a copy is laid out
+    THEN every image is decoded once, and the cache keeps no more bytes
+    than its bound
+    """
+    items = image_items(tmp_path, 40)
+    nbytes = rlwrapper._DecodedImageReader(str(items[0].image)).nbytes
+    decodings.clear()
+    monkeypatch.setattr(rlwrapper, "IMAGES_CACHED_BYTES", 5 * nbytes)
+
+    RLInterface(iter(items), tmp_path / "exam.pdf").build()
+
+    assert sorted(name for name, _ in decodings) == sorted(
+        item.image.name for item in items
+    )
+    assert sum(rlwrapper._images_nbytes.values()) <= 5 * nbytes
+
+
+def test_running_not_evicted(tmp_path, monkeypatch):
+    """GIVEN a decoding still running
+    WHEN the cache is over its bound
+    THEN the running decoding is kept
+    """
+    running = rlwrapper.Future()
+    key = ("running.png", 0)
+    monkeypatch.setattr(rlwrapper, "IMAGES_CACHED_BYTES", 0)
+    monkeypatch.setitem(rlwrapper._images, key, running)
+
+    get_std_aspect_image(image_items(tmp_path, 1)[0].image)
+
+    assert rlwrapper._images.get(key) is running
+
+
+def test_image_changed(tmp_path):
+    """GIVEN an image laid out
+    WHEN its file changes
+    THEN it is decoded again
+    """
+    file_name = tmp_path / "image.png"
+    shutil.copy(RESOURCES / "a.png", file_name)
+    first = get_std_aspect_image(file_name)
+
+    shutil.copy(RESOURCES / "t2.png", file_name)
+    os.utime(file_name, ns=(0, file_name.stat().st_mtime_ns + 10 ** 9))
+    second = get_std_aspect_image(file_name)
+
+    assert first._img is not second._img
+
+
+def test_image_missing(tmp_path):
+    """GIVEN an image file that does not exist
+    WHEN prefetched
+    THEN nothing is raised until it is laid out
+    """
+    file_name = tmp_path / "missing.png"
+
+    assert list(prefetched([Item(ItemLevel.top, "question", file_name)]))
+
+    with pytest.raises(OSError):
+        get_std_aspect_image(file_name)
+
+
+@pytest.mark.parametrize("length", [10, 2000])
+def test_qr_code_widget(length):
+    """GIVEN a QR code of more or less data
+    WHEN sized
+    THEN it is QR_CODE_SIZE at least, with modules QR_MODULE_SIZE wide at least
+    """
+    widget = qr_code_widget("x" * length)
+
+    modules = widget.qr.getModuleCount() + 2 * widget.barBorder
+    assert widget.barWidth == widget.barHeight >= rlwrapper.QR_CODE_SIZE
+    assert widget.barWidth / modules >= rlwrapper.QR_MODULE_SIZE - 1e-9
+    assert (widget.barWidth > rlwrapper.QR_CODE_SIZE) == (length > 10)
+
+
+def test_qr_code_above_frame(tmp_path, monkeypatch):
+    """GIVEN the QR code of the answer key of a 100 questions copy
+    WHEN laid out
+    THEN it stays in the top margin, above the heading and questions
+    """
+    answer_key = AnswerKey(
+        array("I", range(100)), array("B", [0, 1, 2, 3] * 100), array("b", [0] * 100)
+    )
+    qr_code = encode_answer_key(1, answer_key)
+    size = qr_code_widget(qr_code).barWidth
+    assert size > inch
+    boxes, frame_tops = [], []
+
+    def do_form(self, name):
+        x, y = self._currentMatrix[4:]
+        boxes.append((y, y + size))
+
+    def draw_qr_code(pdf_doc, actual_canvas, doc):
+        frame_tops.append(doc.bottomMargin + doc.height)
+        draw(pdf_doc, actual_canvas, doc)
+
+    draw = PDFDoc._draw_qr_code
+    monkeypatch.setattr(rlwrapper.NumberedCanvas, "doForm", do_form)
+    monkeypatch.setattr(PDFDoc, "_draw_qr_code", draw_qr_code)
+    pdf_doc = PDFDoc(tmp_path / "exam.pdf", qr_code=qr_code)
+    pdf_doc.add_item(Item(ItemLevel.top, "question", Path(".")))
+    pdf_doc.build()
+
+    assert boxes and len(boxes) == len(frame_tops)
+    for (bottom, top), frame_top in zip(boxes, frame_tops):
+        assert frame_top < bottom and top < A4[1]
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from exam2pdf.service import RenderService, ServiceMetrics, render
+from exam2pdf.synthetic import bank_fields, write_bank
+from exam2pdf.utility import Exam2pdfException
+
+
+@pytest.fixture
+def bank_exam(tmp_path):
+    write_bank(tmp_path / "bank.csv", 10, seed=1)
+    return {"bank": "bank.csv", "selector": list(bank_fields(5)), "seed": 1}
+
+
+def test_render_pdf(tmp_path, bank_exam):
+    """GIVEN an exam printing one file
+    WHEN rendered
+    THEN the answer is the pdf, and nothing is written
+    """
+    content_type, data, files = render(bank_exam, tmp_path)
+
+    assert content_type == "application/pdf"
+    assert data.startswith(b"%PDF")
+    assert files == 1
+    assert [file_path.name for file_path in tmp_path.iterdir()] == ["bank.csv"]
+
+
+def test_render_zip(tmp_path, bank_exam):
+    """GIVEN an exam printing more files
+    WHEN rendered
+    THEN the answer is a zip of them
+    """
+    exam = dict(bank_exam, n_copies=2, correction_file="correction.pdf")
+
+    content_type, data, files = render(exam, tmp_path)
+
+    assert content_type == "application/zip"
+    assert data.startswith(b"PK")
+    assert files == 3
+
+
+def test_render_excluded_option(tmp_path, bank_exam):
+    with pytest.raises(Exam2pdfException):
+        render(dict(bank_exam, destination="/tmp"), tmp_path)
+
+
+@pytest.mark.parametrize("bank", ["../bank.csv", "link/bank.csv", "{}/bank.csv"])
+def test_render_bank_outside_root(tmp_path, bank_exam, bank):
+    """GIVEN a bank out of the service root: absolute, up or behind a link
+    WHEN rendered
+    THEN it is refused
+    """
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "link").symlink_to(tmp_path)
+    exam = dict(bank_exam, bank=bank.format(tmp_path))
+
+    with pytest.raises(Exam2pdfException):
+        render(exam, root)
+
+
+def test_service_metrics():
+    metrics = ServiceMetrics()
+    for seconds in (0.1, 0.2, 0.3):
+        metrics.begin()
+        metrics.end(seconds, files=2)
+    metrics.begin()
+    metrics.end(1.0, error=True)
+
+    snapshot = metrics.snapshot()
+
+    assert snapshot["requests"] == 4
+    assert snapshot["errors"] == 1
+    assert snapshot["files"] == 6
+    assert snapshot["in_flight"] == 0
+    assert snapshot["latency"]["p50"] == 0.3
+    assert snapshot["latency"]["max"] == 1.0
+
+
+def test_service(tmp_path, bank_exam):
+    """GIVEN a service running on threads
+    WHEN exams are posted
+    THEN pdfs are answered, bad requests rejected, and metrics updated
+    """
+    with ThreadPoolExecutor(2) as executor:
+        server = RenderService(("127.0.0.1", 0), tmp_path, executor)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urlopen(f"{url}/render", json.dumps(bank_exam).encode()) as answer:
+                assert answer.headers["Content-Type"] == "application/pdf"
+                assert answer.read().startswith(b"%PDF")
+            with pytest.raises(HTTPError) as error:
+                urlopen(f"{url}/render", json.dumps({"bank": "missing.csv"}).encode())
+            assert error.value.code == 400
+            with urlopen(f"{url}/metrics") as answer:
+                metrics = json.loads(answer.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    assert metrics["requests"] == 2
+    assert metrics["errors"] == 1
+    assert metrics["files"] == 1
@@ -0,0 +1,165 @@
+import json
+import os
+
+import pytest
+
+from exam2pdf.cli import load_bank, make_job
+from exam2pdf.exam import Exam
+from exam2pdf.plan import load_plan
+from exam2pdf.shard import claim, main, merge, requeue, shard_ranges, submit, work
+from exam2pdf.synthetic import bank_fields, write_bank
+from exam2pdf.utility import Exam2pdfException
+
+
+@pytest.fixture
+def exam(tmp_path):
+    write_bank(tmp_path / "bank.csv", 10, seed=1)
+    return {
+        "bank": "bank.csv",
+        "selector": list(bank_fields(5)),
+        "destination": "out",
+        "exam_file": "exam.pdf",
+        "correction_file": "correction.pdf",
+        "answer_key_file": "keys.csv",
+        "n_copies": 7,
+        "seed": 3,
+        "questions_shuffle": True,
+        "answers_shuffle": True,
+        "invariant": True,
+    }
+
+
+@pytest.mark.parametrize("n_copies, shards", [(7, 3), (6, 6), (2, 5), (1, 1)])
+def test_shard_ranges(n_copies, shards):
+    ranges = shard_ranges(n_copies, shards)
+
+    numbers = [number for copies in ranges for number in copies]
+    assert numbers == list(range(1, n_copies + 1))
+    assert max(map(len, ranges)) - min(map(len, ranges)) <= 1
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_run(tmp_path, exam, workers):
+    """GIVEN an exam with a seed, split in shards
+    WHEN printed by local workers, then merged
+    THEN copies and correction are the bytes of a print in one go
+    """
+    (tmp_path / "exam.json").write_text(json.dumps(exam))
+    queue = tmp_path
+
+    result = main(
+        ["run", str(queue), str(tmp_path / "exam.json")]
+        + ["--shards", "3", "--workers", workers]
+    )
+
+    assert result == 0
+    job = make_job(dict(exam, destination="direct"), tmp_path)
+    job["options"]["destination"].mkdir()
+    load_bank(job["bank"]).print(**job["options"])
+    direct = sorted(path.name for path in (tmp_path / "direct").iterdir())
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == direct
+    for name in direct:
+        assert (tmp_path / "out" / name).read_bytes() == (
+            tmp_path / "direct" / name
+        ).read_bytes()
+    assert len(os.listdir(tmp_path / "done")) == 3
+    assert len(load_plan(tmp_path / "plan.jsonl").keys) == 7
+
+
+def test_merge_missing_shard(tmp_path, exam):
+    """GIVEN a queue with a shard not printed yet
+    WHEN merged
+    THEN it raises, and merges once the shard is printed
+    """
+    del exam["seed"]
+    exam["answer_key_file"] = "keys.jsonl"
+    submit(tmp_path, exam, 2)
+    assert work(tmp_path, max_shards=1) == (1, 0)
+
+    with pytest.raises(Exam2pdfException):
+        merge(tmp_path)
+
+    assert work(tmp_path) == (1, 0)
+    plan = merge(tmp_path)
+    assert sorted(plan.keys) == list(range(1, 8))
+    lines = (tmp_path / "out" / "keys.jsonl").read_text().splitlines()
+    assert [json.loads(line)["copy"] for line in lines] == list(range(1, 8))
+
+
+def test_submit_again(tmp_path, exam):
+    """GIVEN a queue with a shard done and one claimed
+    WHEN the same exam is submitted again
+    THEN only the remaining shard is queued
+    """
+    submit(tmp_path, exam, 3)
+    work(tmp_path, max_shards=1)
+    next(claim(tmp_path))
+
+    assert submit(tmp_path, exam, 3) == 3
+
+    assert os.listdir(tmp_path / "todo") == ["3.json"]
+
+
+def test_submit_different_exam(tmp_path, exam):
+    submit(tmp_path, exam, 3)
+
+    with pytest.raises(Exam2pdfException):
+        submit(tmp_path, dict(exam, seed=4), 3)
+
+
+def test_submit_other_shards(tmp_path, exam):
+    """GIVEN a queue of an exam in 3 shards, one printed
+    WHEN the same exam is submitted in 5 shards
+    THEN it is refused, and no copy is queued twice
+    """
+    submit(tmp_path, exam, 3)
+    work(tmp_path, max_shards=1)
+
+    with pytest.raises(Exam2pdfException):
+        submit(tmp_path, exam, 5)
+
+    assert sorted(os.listdir(tmp_path / "todo")) == ["2.json", "3.json"]
+
+
+def test_submit_excluded(tmp_path, exam):
+    with pytest.raises(Exam2pdfException):
+        submit(tmp_path, dict(exam, merge=True), 3)
+
+    assert not (tmp_path / "todo").exists()
+
+
+def test_requeue(tmp_path, exam):
+    """GIVEN a shard claimed by a worker that stopped, and a failed one
+    WHEN requeued
+    THEN they are printed again
+    """
+    submit(tmp_path, exam, 3)
+    next(claim(tmp_path))
+    (tmp_path / "bank.csv").rename(tmp_path / "moved.csv")
+    assert work(tmp_path, max_shards=1) == (0, 1)
+    (tmp_path / "moved.csv").rename(tmp_path / "bank.csv")
+
+    assert requeue(tmp_path) == 1
+    assert requeue(tmp_path, failed=True) == 1
+
+    assert work(tmp_path) == (3, 0)
+    assert len(merge(tmp_path).keys) == 7
+
+
+def test_work_unexpected_error(tmp_path, monkeypatch, exam):
+    """GIVEN shards failing with errors other than Exam2pdfException
+    WHEN worked
+    THEN every shard goes to failed, with its error
+    """
+
+    def broken_print(self, *args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Exam, "print", broken_print)
+    submit(tmp_path, exam, 3)
+
+    assert work(tmp_path) == (0, 3)
+
+    assert not os.listdir(tmp_path / "claimed")
+    for shard_file in (tmp_path / "failed").iterdir():
+        assert json.loads(shard_file.read_text())["error"] == "OSError: disk full"
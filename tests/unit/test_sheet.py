@@ -0,0 +1,47 @@
+import pytest
+
+from exam2pdf.sheet import SheetLayout, A4_SIZE
+from exam2pdf.utility import Exam2pdfException
+
+
+def test_layout_inside_page():
+    """GIVEN a layout
+    THEN every bubble is inside the page margins, away from the marks
+    """
+    layout = SheetLayout(n_questions=90, n_answers=5, id_digits=3)
+    width, height = A4_SIZE
+    bubbles = [
+        bubble
+        for group in layout.id_bubbles + layout.question_bubbles
+        for bubble in group
+    ]
+
+    assert len(layout.question_bubbles) == 90
+    assert all(len(group) == 5 for group in layout.question_bubbles)
+    assert len(layout.id_bubbles) == 3
+    for x, y in bubbles:
+        assert layout.margin <= x <= width - layout.margin
+        assert layout.margin <= y <= height - layout.margin
+    assert len(set(bubbles)) == len(bubbles)
+
+
+def test_layout_too_many_questions():
+    with pytest.raises(Exam2pdfException):
+        SheetLayout(n_questions=300, n_answers=5)
+
+
+@pytest.mark.parametrize(
+    "copy_number, expected", [[7, (0, 0, 7)], [120, (1, 2, 0)], [999, (9, 9, 9)]]
+)
+def test_copy_digits(copy_number, expected):
+    layout = SheetLayout(n_questions=1, n_answers=2, id_digits=3)
+
+    assert layout.copy_digits(copy_number) == expected
+
+
+@pytest.mark.parametrize("copy_number", [1000, -1])
+def test_copy_digits_error(copy_number):
+    layout = SheetLayout(n_questions=1, n_answers=2, id_digits=3)
+
+    with pytest.raises(Exam2pdfException):
+        layout.copy_digits(copy_number)
@@ -0,0 +1,51 @@
+import pytest
+
+import exam2pdf
+from exam2pdf.synthetic import ENCODINGS, load_bank, write_bank
+from exam2pdf.utility import Exam2pdfException
+
+
+def test_write_bank_deterministic(tmp_path):
+    """GIVEN two banks with the same seed and one with another
+    THEN the first two are the same
+    """
+    first = write_bank(tmp_path / "first.csv", 200, seed=4, images=0.3)
+    second = write_bank(tmp_path / "second.csv", 200, seed=4, images=0.3)
+    other = write_bank(tmp_path / "other.csv", 200, seed=5, images=0.3)
+
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_load_bank(tmp_path, encoding):
+    """GIVEN a bank in a given encoding
+    THEN it is loaded with the given mix of questions and answers
+    """
+    file_path = write_bank(
+        tmp_path / "bank.csv",
+        300,
+        seed=1,
+        true_false=0.25,
+        answers={2: 1, 5: 1},
+        empty_answers=0.5,
+        images=0.2,
+        answer_images=0.1,
+        encoding=encoding,
+    )
+
+    exam = load_bank(file_path)
+
+    questions = exam.questions
+    true_false = [q for q in questions if isinstance(q, exam2pdf.TrueFalseQuest)]
+    assert len(questions) == 300
+    assert 40 < len(true_false) < 110
+    assert {len(q.answers) for q in questions} == {2, 5}
+    assert any("città" in q.text or "€" in q.text for q in questions)
+    assert any(q.image.is_file() for q in questions)
+    exam._check_images()
+
+
+def test_write_bank_invalid_answers(tmp_path):
+    with pytest.raises(Exam2pdfException):
+        write_bank(tmp_path / "bank.csv", 10, answers={0: 1})
@@ -1,5 +1,14 @@
+import base64
 import pytest
-from exam2pdf.utility import safe_int
+from array import array
+
+from exam2pdf.utility import (
+    AnswerKey,
+    Exam2pdfException,
+    safe_int,
+    encode_answer_key,
+    decode_answer_key,
+)
 
 
 @pytest.mark.parametrize("number, expected", [["1", 1], ["1.2", 0], ["1a", 0]])
@@ -7,3 +16,45 @@ def test_safe_int(number, expected):
     result = safe_int(number)
 
     assert result == expected
+
+
+@pytest.mark.parametrize("seed", [None, 2 ** 63])
+def test_answer_key_encoding(seed):
+    answer_key = AnswerKey(
+        array("I", [2, 0, 1]), array("B", [1, 0, 2, 0, 1]), array("b", [0, -1, 2]), seed
+    )
+
+    copy_number, decoded = decode_answer_key(encode_answer_key(7, answer_key))
+
+    assert copy_number == 7
+    assert decoded == answer_key
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "E2P|1|",
+        "XYZ|1||AA|AA|AA",
+        "E2P|x||AA|AA|AA",
+        "E2P|1||AAAA|AA==|AA==",  # 3 bytes of order for 1 question
+    ],
+)
+def test_answer_key_decoding_error(text):
+    with pytest.raises(Exam2pdfException):
+        decode_answer_key(text)
+
+
+@pytest.mark.parametrize("largest, width", [(255, 1), (256, 2), (70000, 4)])
+def test_answer_key_encoding_width(largest, width):
+    """GIVEN a copy whose largest question index needs width bytes
+    WHEN its answer key is encoded
+    THEN every question index takes width bytes, and is decoded back
+    """
+    order = array("I", [largest, 0, 1])
+    answer_key = AnswerKey(order, array("B", [0, 1, 0]), array("b", [0, 1, 0]), 1)
+
+    text = encode_answer_key(1, answer_key)
+
+    assert len(base64.urlsafe_b64decode(text.split("|")[3])) == 3 * width
+    assert decode_answer_key(text)[1] == answer_key